@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+
+from daemon_models import DesktopView, InternalAppView
+
+
+class Compositor:
+    """Renders desktop and internal-app views on its own thread.
+
+    ``submit`` only records the view and returns; the thread renders the
+    newest one, so a burst of requests (rapid clicks, keyboard auto-repeat)
+    costs a single render. Views are immutable snapshots, so drawing, RGB565
+    conversion and the SPI push all run without the daemon state lock.
+    ``on_rendered(view)`` is called on the thread after each push; both run
+    under ``present_lock`` so they are ordered with other panel pushes.
+    A view for which ``is_current(view)`` is false by the time the lock is
+    held is dropped: focus moved on after it was requested, and pushing it
+    would cover what the new foreground shows.
+    """
+
+    def __init__(self, renderer, on_rendered=None, present_lock=None, is_current=None):
+        self.renderer = renderer
+        self.on_rendered = on_rendered
+        self.present_lock = present_lock or threading.Lock()
+        self.is_current = is_current
+        self.rendered = 0
+        self.coalesced = 0
+        self.stale = 0
+        self._cond = threading.Condition()
+        self._pending = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="whisplay-compositor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def submit(self, view: DesktopView | InternalAppView):
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = view
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                view, self._pending = self._pending, None
+            try:
+                with self.present_lock:
+                    if self.is_current is not None and not self.is_current(view):
+                        self.stale += 1
+                        continue
+                    self._render(view)
+            except Exception as exc:
+                print(f"[WhisplayDaemon] Render failed: {exc}")
+
+    def _render(self, view: DesktopView | InternalAppView):
+        if isinstance(view, InternalAppView):
+            self.renderer.render_internal_app(view.view_model)
+        else:
+            self.renderer.render(
+                view.apps,
+                view.selected_index,
+                view.pending_app_id,
+                view.running_app_id,
+                view.wifi_signal_level,
+                view.battery_level,
+            )
+        self.rendered += 1
+        if self.on_rendered is not None:
+            self.on_rendered(view)
@@ -3,15 +3,29 @@ from __future__ import annotations
 import json
 import threading
 
+from whisplay_protocol import encode_event, topic_matches
+
+# Events that only report the latest state: a subscriber that falls behind
+# gets the newest one of each group instead of the whole history.
+COALESCED_EVENTS = {
+    "button_pressed": "button",
+    "button_released": "button",
+    "display_sleep": "display",
+    "display_wake": "display",
+}
+
 
 class EventBroadcaster:
     def __init__(self):
         self._global_subscribers = set()
         self._app_subscribers: dict[str, set] = {}
+        # conn -> (topic filter or None, framed); framed connections speak v2.
+        self._options: dict = {}
         self._lock = threading.Lock()
 
-    def add(self, conn, app_id: str | None):
+    def add(self, conn, app_id: str | None, topics=None, framed: bool = False):
         with self._lock:
+            self._options[conn] = (frozenset(topics) if topics is not None else None, framed)
             if app_id:
                 self._app_subscribers.setdefault(app_id, set()).add(conn)
             else:
@@ -19,6 +33,7 @@ class EventBroadcaster:
 
     def remove(self, conn):
         with self._lock:
+            self._options.pop(conn, None)
             self._global_subscribers.discard(conn)
             for subscribers in self._app_subscribers.values():
                 subscribers.discard(conn)
@@ -33,20 +48,27 @@ class EventBroadcaster:
         payload: dict | None = None,
         app_id: str | None = None,
     ):
-        message = {"event": event}
-        if payload:
-            message["payload"] = payload
-        wire = (json.dumps(message) + "\n").encode("utf-8")
         with self._lock:
             targets = list(self._global_subscribers)
             if app_id:
                 targets.extend(list(self._app_subscribers.get(app_id, set())))
-        for conn in targets:
-            try:
-                conn.sendall(wire)
-            except Exception:
-                self.remove(conn)
-                try:
-                    conn.close()
-                except Exception:
-                    pass
+            options = [self._options.get(conn, (None, False)) for conn in targets]
+        # Each encoding is built at most once, and only if someone wants it.
+        wires = {}
+        group = COALESCED_EVENTS.get(event)
+        coalesce_key = (group, (payload or {}).get("app_id")) if group else None
+        for conn, (topics, framed) in zip(targets, options):
+            if not topic_matches(topics, event):
+                continue
+            wire = wires.get(framed)
+            if wire is None:
+                if framed:
+                    wire = encode_event(event, payload)
+                else:
+                    message = {"event": event}
+                    if payload:
+                        message["payload"] = payload
+                    wire = (json.dumps(message) + "\n").encode("utf-8")
+                wires[framed] = wire
+            # Queued per subscriber; never blocks the caller.
+            conn.send_event(wire, coalesce_key)
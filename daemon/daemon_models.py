@@ -2,11 +2,39 @@ from __future__ import annotations
 
 import mmap
 import subprocess
+from collections import deque
 from dataclasses import dataclass, field
 
 from daemon_shared import EXIT_GESTURE_QUAD_CLICK
 
 
+@dataclass
+class FrameStats:
+    """Frame timing of an app on the panel."""
+
+    frames: int = 0
+    dropped: int = 0
+    push_time: float = 0.0
+    # Push times of the last second's frames, for the achieved rate.
+    recent: deque = field(default_factory=lambda: deque(maxlen=240))
+
+    def record(self, now: float, push_time: float, dropped: int = 0):
+        self.frames += 1
+        self.dropped += dropped
+        self.push_time = push_time
+        self.recent.append(now)
+
+    def as_dict(self, now: float) -> dict:
+        while self.recent and now - self.recent[0] > 1.0:
+            self.recent.popleft()
+        return {
+            "fps": len(self.recent),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "push_ms": round(self.push_time * 1000.0, 2),
+        }
+
+
 @dataclass
 class AppRecord:
     app_id: str
@@ -20,13 +48,68 @@ class AppRecord:
     use_daemon_default_log: bool = False
     persist: bool = False
     disable_esc_exit_key: bool = False
+    # Frames per second the app asked for; 0 leaves the rate to the daemon.
+    target_fps: float = 0.0
+    frame_stats: FrameStats = field(default_factory=FrameStats)
     process: subprocess.Popen | None = None
     process_log_handle = None
     subscribers: set = field(default_factory=set)
     session_token: str | None = None
+    # Focus was granted from the queue and the app has not yet used the
+    # session; see WhisplayDaemon._cmd_app_focus_release.
+    focus_unclaimed: bool = False
     framebuffer_path: str | None = None
     framebuffer_file = None
+    framebuffer_fd: int | None = None
     framebuffer_mmap: mmap.mmap | None = None
+    framebuffer_header = None
 
     def is_running(self) -> bool:
         return self.process is not None and self.process.poll() is None
+
+
+@dataclass
+class FocusWaiter:
+    """An app blocked in app.focus.acquire until focus is free."""
+
+    app_id: str
+    priority: int
+    order: int
+    deadline: float
+    buffers: int = 1
+    pass_fd: bool = True
+
+    def sort_key(self) -> tuple[int, int]:
+        return -self.priority, self.order
+
+
+@dataclass(frozen=True)
+class AppSnapshot:
+    """What the desktop shows of an app, frozen when a render is requested."""
+
+    app_id: str
+    display_name: str
+    running: bool
+
+    def is_running(self) -> bool:
+        return self.running
+
+
+@dataclass(frozen=True)
+class DesktopView:
+    apps: tuple[AppSnapshot, ...]
+    selected_index: int
+    pending_app_id: str | None
+    running_app_id: str | None
+    wifi_signal_level: int | None
+    battery_level: int | None
+    # Focus generation the view was requested in; see Compositor.
+    focus_generation: int = 0
+
+
+@dataclass(frozen=True)
+class InternalAppView:
+    app_id: str
+    # Built fresh by the internal app for this render; never mutated.
+    view_model: dict
+    focus_generation: int = 0
@@ -13,6 +13,9 @@ TITLE_FONT_SIZE = 17
 LIST_ITEM_ROW_HEIGHT = 40
 LIST_ITEM_META_OFFSET = 20
 LIST_VISIBLE_COUNT = 3
+LIST_SCROLL_STEPS = 5
+LIST_SCROLL_FRAME_SEC = 1 / 60
+LIST_CARD_RADIUS = 12
 WIFI_ICON_SCALE = 1.6
 WIFI_LEVEL_ICON_FILES = {
     1: "wifi-weak.png",
@@ -31,6 +34,8 @@ class DesktopRenderer:
         self.battery_font = self._load_font(13)
         self.icon_dir = os.path.join(script_dir, "img")
         self._icon_cache: dict[tuple[str, int], Image.Image | None] = {}
+        # (title, item titles, start index, frame) of the list page on screen
+        self._list_page: tuple[str, tuple[str, ...], int, bytes] | None = None
         self.zoom_sizes = {
             -2: self._load_font(12),
             -1: self._load_font(14),
@@ -204,6 +209,7 @@ class DesktopRenderer:
         wifi_signal_level: int | None = None,
         battery_level: int | None = None,
     ):
+        self._list_page = None
         image = Image.new("RGB", (SCREEN_WIDTH, SCREEN_HEIGHT), (7, 11, 18))
         draw = ImageDraw.Draw(image)
         self._draw_status_icons(draw, wifi_signal_level, battery_level)
@@ -216,7 +222,7 @@ class DesktopRenderer:
         if not apps:
             draw.text((left, top_margin + 48), "No apps registered", fill=(255, 200, 120), font=self.body_font)
             frame = image_to_rgb565_bytes(image)
-            self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
+            self.board.present(frame)
             return
 
         selected = apps[selected_index % len(apps)]
@@ -268,7 +274,7 @@ class DesktopRenderer:
             draw.text((modal_x + modal_w - 22, modal_y + 12), spinner, fill=(120, 220, 255), font=self.body_font)
 
         frame = image_to_rgb565_bytes(image)
-        self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
+        self.board.present(frame)
 
     def render_internal_app(self, view_model: dict):
         kind = view_model.get("kind")
@@ -316,7 +322,10 @@ class DesktopRenderer:
 
         card_y = 68
         card_h = LIST_VISIBLE_COUNT * LIST_ITEM_ROW_HEIGHT + 16
-        draw.rounded_rectangle((10, card_y, SCREEN_WIDTH - 10, card_y + card_h), radius=12, fill=(15, 24, 36))
+        draw.rounded_rectangle(
+            (10, card_y, SCREEN_WIDTH - 10, card_y + card_h), radius=LIST_CARD_RADIUS, fill=(15, 24, 36)
+        )
+        start_index = 0
         if not items:
             draw.text((left, card_y + 20), "No items", fill=(255, 200, 120), font=self.body_font)
         else:
@@ -362,9 +371,51 @@ class DesktopRenderer:
         else:
             draw.text((left, status_y + 20), status[:30], fill=status_fill, font=self.small_font)
         frame = image_to_rgb565_bytes(image)
-        self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
+
+        item_titles = tuple(str(item.get("title") or "") for item in items)
+        previous = self._list_page
+        self._list_page = (title, item_titles, start_index, frame)
+        if previous is not None and previous[:2] == (title, item_titles) and abs(start_index - previous[2]) == 1:
+            # Straight part of the card, so the rounded corners never scroll.
+            area_top = card_y + LIST_CARD_RADIUS
+            area_height = card_h - 2 * LIST_CARD_RADIUS
+            self._scroll_list(previous[3], frame, start_index - previous[2], area_top, area_height)
+            return
+        self.board.present(frame)
+
+    def _scroll_list(self, old_frame: bytes, new_frame: bytes, direction: int, area_top: int, area_height: int):
+        """Animate the list rows by one item with hardware scrolling.
+
+        Each step moves the panel's scroll offset and presents a frame made of
+        the old rows shifted by the scroll plus the new rows scrolling in, so
+        only the exposed rows go over SPI.
+        """
+        stride = SCREEN_WIDTH * 2
+        start = area_top * stride
+        end = start + area_height * stride
+        old_area = old_frame[start:end]
+        new_area = new_frame[start:end]
+        distance = LIST_ITEM_ROW_HEIGHT
+        self.board.set_scroll_area(area_top, area_height)
+        shifted = 0
+        for step in range(1, LIST_SCROLL_STEPS + 1):
+            step_started = time.monotonic()
+            rows = distance * step // LIST_SCROLL_STEPS
+            if step == LIST_SCROLL_STEPS:
+                frame = new_frame
+            elif direction > 0:
+                exposed = new_area[(area_height - distance) * stride:(area_height - distance + rows) * stride]
+                frame = new_frame[:start] + old_area[rows * stride:] + exposed + new_frame[end:]
+            else:
+                exposed = new_area[(distance - rows) * stride:distance * stride]
+                frame = new_frame[:start] + exposed + old_area[:(area_height - rows) * stride] + new_frame[end:]
+            self.board.scroll(direction * (rows - shifted), frame)
+            shifted = rows
+            if step < LIST_SCROLL_STEPS:
+                time.sleep(max(0.0, LIST_SCROLL_FRAME_SEC - (time.monotonic() - step_started)))
 
     def _render_keyboard(self, view_model: dict):
+        self._list_page = None
         image = Image.new("RGB", (SCREEN_WIDTH, SCREEN_HEIGHT), (11, 16, 26))
         draw = ImageDraw.Draw(image)
 
@@ -394,4 +445,4 @@ class DesktopRenderer:
         draw.text((left, 258), "Backspace delete", fill=(90, 106, 124), font=self.small_font)
 
         frame = image_to_rgb565_bytes(image)
-        self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
+        self.board.present(frame)
@@ -0,0 +1,442 @@
+from __future__ import annotations
+
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from whisplay_protocol import (
+    FLAG_NOREPLY,
+    KIND_REQUEST,
+    PROTOCOL_VERSION,
+    UPGRADE_COMMAND,
+    decode_request,
+    encode_response,
+    split_frame,
+)
+
+RECV_SIZE = 65536
+# Stop reading a client whose unprocessed input grows past this, and drop
+# one that sends a single JSON line longer than it.
+MAX_PENDING_INPUT = 1 << 20
+# Events held for a subscriber that is not keeping up, and how long it may
+# stay at that limit before it is dropped.
+EVENT_QUEUE_LIMIT = 64
+EVENT_OVERFLOW_GRACE_SEC = 5.0
+
+
+class ClientConnection:
+    """One accepted socket.
+
+    The DaemonServer loop owns the selector registration and all reads.
+    Requests run one at a time, in order, on a command worker that keeps
+    the connection until its buffered input is drained, which also makes
+    the v1 -> v2 switch after protocol.upgrade exact. ``send`` and ``close``
+    may be called from any thread; ``lock`` guards the buffers and flags.
+    """
+
+    def __init__(self, server: DaemonServer, sock: socket.socket):
+        self.server = server
+        self.sock = sock
+        self.events = selectors.EVENT_READ
+        self.lock = threading.Lock()
+        self.inbox = bytearray()
+        self.outbox: deque[list] = deque()
+        self.framed = False
+        self.subscribed = False
+        self.busy = False
+        self.closed = False
+        # When the event queue first hit its limit; None while it has room.
+        self.overflow_since = None
+
+    def on_ready(self, _sock, events: int):
+        self.server.ready(self, events)
+
+    def send(self, data: bytes, fds=()):
+        self.server.queue_output(self, data, fds)
+
+    def send_event(self, data: bytes, coalesce_key=None):
+        self.server.queue_output(self, data, event=True, coalesce_key=coalesce_key)
+
+    def close(self):
+        self.server.post(self.server.close_connection, self)
+
+    def next_request(self):
+        """Take the next request off the input buffer; caller holds ``lock``.
+
+        Returns ``(request, request_id, noreply, error)``; ``error`` is a
+        response to send instead of running anything. None when no full
+        request is buffered.
+        """
+        while True:
+            if self.framed:
+                try:
+                    split = split_frame(self.inbox)
+                except ValueError as exc:
+                    raise ConnectionError(str(exc)) from exc
+                if split is None:
+                    return None
+                (kind, opcode, flags, request_id, body), used = split
+                del self.inbox[:used]
+                noreply = bool(flags & FLAG_NOREPLY)
+                try:
+                    if kind != KIND_REQUEST:
+                        raise ValueError(f"unexpected frame kind: {kind}")
+                    cmd, payload = decode_request(opcode, body)
+                except ValueError as exc:
+                    return None, request_id, noreply, {"ok": False, "error": str(exc)}
+                request = {"version": PROTOCOL_VERSION, "cmd": cmd, "payload": payload}
+                return request, request_id, noreply, None
+            end = self.inbox.find(b"\n")
+            if end < 0:
+                if len(self.inbox) > MAX_PENDING_INPUT:
+                    raise ConnectionError("request line too long")
+                return None
+            line = bytes(self.inbox[:end])
+            del self.inbox[:end + 1]
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                return None, None, False, {"ok": False, "error": "invalid json"}
+            if not isinstance(request, dict):
+                return None, None, False, {"ok": False, "error": "request must be an object"}
+            return request, request.get("id"), bool(request.get("noreply")), None
+
+
+class DaemonServer:
+    """Unix socket server running every client on one selector loop.
+
+    The loop accepts, reads and finishes writes the socket could not take
+    at once; it never runs a command. ``run_command(request, conn,
+    protocol)`` is called on a small executor, since commands take the
+    daemon state lock and may block on SPI, GPIO or subprocesses. Thread
+    count therefore stays at one loop plus ``workers`` however many apps
+    connect or subscribe. ``on_close(conn)`` runs on the loop when a
+    client goes away.
+
+    Events queue up to ``event_queue_limit`` messages per subscriber; past
+    that new ones are dropped, and a subscriber that stays full for
+    ``overflow_grace_sec`` is disconnected.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        run_command,
+        on_close=None,
+        workers: int = 4,
+        event_queue_limit: int = EVENT_QUEUE_LIMIT,
+        overflow_grace_sec: float = EVENT_OVERFLOW_GRACE_SEC,
+    ):
+        self.socket_path = socket_path
+        self.run_command = run_command
+        self.on_close = on_close
+        self.event_queue_limit = event_queue_limit
+        self.overflow_grace_sec = overflow_grace_sec
+        self.running = False
+        self._selector = selectors.DefaultSelector()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisplay-cmd")
+        self._listener = None
+        self._connections: set[ClientConnection] = set()
+        self._posted: deque = deque()
+        self._wakeup_pending = False
+        self._wakeup_lock = threading.Lock()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+
+    def listen(self, backlog: int = 64):
+        socket_dir = os.path.dirname(self.socket_path) or "."
+        os.makedirs(socket_dir, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o666)
+        listener.listen(backlog)
+        listener.setblocking(False)
+        self._listener = listener
+        self._selector.register(listener, selectors.EVENT_READ, self._accept)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, self._drain_wakeup)
+        self.running = True
+
+    def serve_forever(self):
+        try:
+            while self.running:
+                for key, mask in self._selector.select(timeout=1.0):
+                    key.data(key.fileobj, mask)
+                self._run_posted()
+        finally:
+            self._shutdown()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+
+    # ----- cross-thread hand-off -----
+    def post(self, callback, *args):
+        """Run ``callback(*args)`` on the loop thread."""
+        self._posted.append((callback, args))
+        self._wake()
+
+    def _wake(self):
+        with self._wakeup_lock:
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        try:
+            self._wakeup_writer.send(b"\0")
+        except OSError:
+            pass
+
+    def _drain_wakeup(self, sock, mask):
+        try:
+            while sock.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._wakeup_lock:
+            self._wakeup_pending = False
+
+    def _run_posted(self):
+        while self._posted:
+            callback, args = self._posted.popleft()
+            try:
+                callback(*args)
+            except Exception as exc:
+                print(f"[WhisplayDaemon] Server callback error: {exc}")
+
+    # ----- loop thread -----
+    def _accept(self, listener, mask):
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            sock.setblocking(False)
+            conn = ClientConnection(self, sock)
+            self._connections.add(conn)
+            self._selector.register(sock, selectors.EVENT_READ, conn.on_ready)
+
+    def ready(self, conn: ClientConnection, events: int):
+        if events & selectors.EVENT_WRITE:
+            self._flush(conn)
+        if events & selectors.EVENT_READ and not conn.closed:
+            self._read(conn)
+
+    def _read(self, conn: ClientConnection):
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.close_connection(conn)
+            return
+        with conn.lock:
+            if conn.subscribed:
+                # Subscribers only listen; anything they send is ignored.
+                return
+            conn.inbox += data
+            start = not conn.busy
+            conn.busy = True
+        if start:
+            self._executor.submit(self._work, conn)
+        else:
+            self.update_interest(conn)
+
+    def _flush(self, conn: ClientConnection):
+        with conn.lock:
+            failed = self._write_locked(conn)
+        if failed:
+            self.close_connection(conn)
+        else:
+            self.update_interest(conn)
+
+    def update_interest(self, conn: ClientConnection):
+        with conn.lock:
+            if conn.closed:
+                return
+            # Stop reading while a backlog of requests is already buffered;
+            # _work re-arms the connection once it has drained.
+            reading = conn.subscribed or len(conn.inbox) <= MAX_PENDING_INPUT
+            events = selectors.EVENT_READ if reading else 0
+            if conn.outbox:
+                events |= selectors.EVENT_WRITE
+        if events == conn.events:
+            return
+        if not events:
+            self._selector.unregister(conn.sock)
+        elif not conn.events:
+            self._selector.register(conn.sock, events, conn.on_ready)
+        else:
+            self._selector.modify(conn.sock, events, conn.on_ready)
+        conn.events = events
+
+    def close_connection(self, conn: ClientConnection):
+        with conn.lock:
+            if conn.closed:
+                return
+            conn.closed = True
+            conn.outbox.clear()
+        self._connections.discard(conn)
+        if conn.events:
+            try:
+                self._selector.unregister(conn.sock)
+            except (KeyError, ValueError):
+                pass
+            conn.events = 0
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+        if self.on_close is not None:
+            self.on_close(conn)
+
+    def _shutdown(self):
+        self._run_posted()
+        for conn in list(self._connections):
+            with conn.lock:
+                self._write_locked(conn)
+            self.close_connection(conn)
+        for sock in (self._listener, self._wakeup_reader, self._wakeup_writer):
+            if sock is None:
+                continue
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._selector.close()
+        self._executor.shutdown(wait=False)
+        try:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    # ----- any thread -----
+    def queue_output(self, conn: ClientConnection, data: bytes, fds=(), event: bool = False, coalesce_key=None):
+        """Write ``data`` now if the socket takes it, else leave the rest
+        for the loop; never blocks the caller. ``event`` output is bounded
+        per subscriber (see ``_admit_event``)."""
+        with conn.lock:
+            if conn.closed:
+                return
+            if event and not self._admit_event(conn, coalesce_key):
+                return
+            idle = not conn.outbox
+            conn.outbox.append([memoryview(data), list(fds), coalesce_key])
+            if not idle:
+                return
+            failed = self._write_locked(conn)
+            blocked = bool(conn.outbox)
+        if failed:
+            self.post(self.close_connection, conn)
+        elif blocked:
+            self.post(self.update_interest, conn)
+
+    def _admit_event(self, conn: ClientConnection, coalesce_key) -> bool:
+        """Make room for one more event; caller holds ``conn.lock``.
+
+        A queued event with the same ``coalesce_key`` that has not started
+        going out is superseded. False drops the event.
+        """
+        if coalesce_key is not None:
+            # The head may be partly written already; leave it be.
+            for index in range(1, len(conn.outbox)):
+                if conn.outbox[index][2] == coalesce_key:
+                    del conn.outbox[index]
+                    break
+        if len(conn.outbox) < self.event_queue_limit:
+            conn.overflow_since = None
+            return True
+        now = time.monotonic()
+        if conn.overflow_since is None:
+            conn.overflow_since = now
+            print("[WhisplayDaemon] Subscriber is not reading; dropping events")
+        elif now - conn.overflow_since >= self.overflow_grace_sec:
+            print("[WhisplayDaemon] Disconnecting subscriber after sustained event overflow")
+            self.post(self.close_connection, conn)
+        return False
+
+    def _write_locked(self, conn: ClientConnection) -> bool:
+        """Send queued output until the socket would block; caller holds
+        ``conn.lock``. Returns True when the connection failed."""
+        while conn.outbox:
+            entry = conn.outbox[0]
+            view, fds = entry[0], entry[1]
+            try:
+                if fds:
+                    # The descriptors travel with the first byte sent.
+                    sent = socket.send_fds(conn.sock, [view], fds)
+                    entry[1] = []
+                else:
+                    sent = conn.sock.send(view)
+            except (BlockingIOError, InterruptedError):
+                return False
+            except OSError:
+                return True
+            if sent < len(view):
+                entry[0] = view[sent:]
+                return False
+            conn.outbox.popleft()
+        return False
+
+    # ----- command workers -----
+    def _work(self, conn: ClientConnection):
+        """Run the connection's buffered requests in order."""
+        while True:
+            with conn.lock:
+                try:
+                    parsed = None if conn.closed or conn.subscribed else conn.next_request()
+                except ConnectionError as exc:
+                    print(f"[WhisplayDaemon] Client error: {exc}")
+                    self.post(self.close_connection, conn)
+                    parsed = None
+                if parsed is None:
+                    conn.busy = False
+                    break
+            request, request_id, noreply, response = parsed
+            cmd = None
+            keep_open = False
+            if response is None:
+                cmd = request.get("cmd")
+                protocol = PROTOCOL_VERSION if conn.framed else 1
+                try:
+                    response, keep_open = self.run_command(request, conn, protocol)
+                except Exception as exc:
+                    response = {"ok": False, "error": str(exc)}
+            upgraded = cmd == UPGRADE_COMMAND and response.get("ok") and not conn.framed
+            self._reply(conn, response, request_id, noreply and not keep_open and not upgraded, cmd)
+            if upgraded or keep_open:
+                with conn.lock:
+                    conn.framed = conn.framed or bool(upgraded)
+                    if keep_open:
+                        conn.subscribed = True
+                        conn.inbox.clear()
+        self.post(self.update_interest, conn)
+
+    def _reply(self, conn: ClientConnection, response: dict, request_id, noreply: bool, cmd):
+        if noreply:
+            if not response.get("ok"):
+                print(f"[WhisplayDaemon] {cmd} failed: {response.get('error')}")
+            return
+        fds = response.pop("_fds", ())
+        if conn.framed:
+            data = encode_response(response, request_id or 0)
+        else:
+            if request_id is not None:
+                response["id"] = request_id
+            data = (json.dumps(response) + "\n").encode("utf-8")
+        self.queue_output(conn, data, fds)
@@ -11,11 +11,17 @@ PIXEL_FORMAT = "RGB565"
 BYTES_PER_PIXEL = 2
 FRAMEBUFFER_STRIDE = SCREEN_WIDTH * BYTES_PER_PIXEL
 FRAMEBUFFER_SIZE = FRAMEBUFFER_STRIDE * SCREEN_HEIGHT
+MAX_FRAMEBUFFER_BUFFERS = 3
 BUTTON_LONG_PRESS_SEC = 0.7
 QUAD_CLICK_WINDOW_SEC = 3.0
 EXIT_REQUEST_TIMEOUT_SEC = 1.5
 RENDER_FPS = 20
+# Upper bound on the target_fps an app may declare in app.register.
+MAX_TARGET_FPS = 60
 PENDING_LAUNCH_TIMEOUT_SEC = 8.0
+FOCUS_WAIT_TIMEOUT_SEC = 30.0
+# Threads running client commands; connections themselves cost none.
+COMMAND_WORKERS = 4
 EXIT_GESTURE_QUAD_CLICK = "quad_click"
 EXIT_GESTURE_LONG_PRESS = "long_press"
 EXIT_GESTURE_NONE = "none"
@@ -31,6 +37,12 @@ DEFAULT_SOCKET_PATH = "/tmp/whisplay-daemon.sock"
 DEFAULT_APP_LOG_PATH = os.path.join(DEFAULT_DAEMON_HOME, "daemon-app.log")
 STATUS_POLL_INTERVAL_SEC = 5.0
 DEFAULT_PISUGAR_HOME_BUTTON = "single"
+DEFAULT_IDLE_TIMEOUT_SEC = 0.0
+SLEEP_MONITOR_INTERVAL_SEC = 1.0
+# Requests that only poll state and do not count as user activity
+PASSIVE_COMMANDS = {"health.ping", "button.get_state", "app.list", "protocol.upgrade"}
+# Commands that change how the connection itself is served.
+BATCH_EXCLUDED_COMMANDS = {"batch", "events.subscribe", "protocol.upgrade"}
 VALID_PISUGAR_HOME_BUTTONS = {"single", "double", "long", "none"}
 
 
@@ -86,6 +98,13 @@ def resolve_runtime_config(args):
     if stored_settings.get("pisugar_home_button") != pisugar_home_button:
         stored_settings["pisugar_home_button"] = pisugar_home_button
         changed = True
+    try:
+        idle_timeout_sec = max(0.0, float(stored_settings.get("idle_timeout_sec", DEFAULT_IDLE_TIMEOUT_SEC)))
+    except (TypeError, ValueError):
+        idle_timeout_sec = DEFAULT_IDLE_TIMEOUT_SEC
+    if stored_settings.get("idle_timeout_sec") != idle_timeout_sec:
+        stored_settings["idle_timeout_sec"] = idle_timeout_sec
+        changed = True
     if not os.path.exists(settings_path) or changed:
         write_json_file(settings_path, stored_settings)
     return {
@@ -93,6 +112,7 @@ def resolve_runtime_config(args):
         "socket_path": DEFAULT_SOCKET_PATH,
         "apps_dir": apps_dir,
         "pisugar_home_button": pisugar_home_button,
+        "idle_timeout_sec": idle_timeout_sec,
     }
 
 
@@ -5,7 +5,6 @@ import mmap
 import os
 import re
 import signal
-import socket
 import subprocess
 import sys
 import threading
@@ -17,26 +16,36 @@ RUNTIME_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "runtime"))
 if RUNTIME_DIR not in sys.path:
     sys.path.append(RUNTIME_DIR)
 
+from daemon_compositor import Compositor
 from daemon_events import EventBroadcaster
-from daemon_models import AppRecord
+from daemon_models import AppRecord, AppSnapshot, DesktopView, FocusWaiter, FrameStats, InternalAppView
 from daemon_pisugar import PiSugarManager
 from daemon_renderer import DesktopRenderer
+from daemon_server import DaemonServer
 from daemon_shared import (
+    BATCH_EXCLUDED_COMMANDS,
     BUTTON_LONG_PRESS_SEC,
+    COMMAND_WORKERS,
     DEFAULT_APP_LOG_PATH,
     DEFAULT_DAEMON_HOME,
+    DEFAULT_IDLE_TIMEOUT_SEC,
     DEFAULT_PISUGAR_HOME_BUTTON,
     EXIT_GESTURE_LONG_PRESS,
     EXIT_GESTURE_QUAD_CLICK,
     EXIT_REQUEST_TIMEOUT_SEC,
+    FOCUS_WAIT_TIMEOUT_SEC,
     FRAMEBUFFER_SIZE,
     FRAMEBUFFER_STRIDE,
+    MAX_FRAMEBUFFER_BUFFERS,
+    MAX_TARGET_FPS,
+    PASSIVE_COMMANDS,
     PENDING_LAUNCH_TIMEOUT_SEC,
     PIXEL_FORMAT,
     QUAD_CLICK_WINDOW_SEC,
     RENDER_FPS,
     SCREEN_HEIGHT,
     SCREEN_WIDTH,
+    SLEEP_MONITOR_INTERVAL_SEC,
     STATUS_POLL_INTERVAL_SEC,
     VALID_EXIT_GESTURES,
     VALID_PISUGAR_HOME_BUTTONS,
@@ -45,7 +54,15 @@ from daemon_shared import (
 )
 from internal_apps import ExternalKeyboardReader, InternalAppManager
 from daemon_status import StatusPoller
-from whisplay import WhisplayBoard
+from whisplay import LEDEffect, WhisplayBoard
+from whisplay_ipc import (
+    FLAG_COMMIT,
+    FRAME_HEADER_SIZE,
+    FrameHeader,
+    create_memfd,
+    mapping_size,
+)
+from whisplay_protocol import PROTOCOL_VERSION, SUPPORTED_VERSIONS, UPGRADE_COMMAND
 
 
 class WhisplayDaemon:
@@ -55,17 +72,32 @@ class WhisplayDaemon:
         apps_dir: str,
         settings_path: str,
         pisugar_home_button: str = DEFAULT_PISUGAR_HOME_BUTTON,
+        idle_timeout_sec: float = DEFAULT_IDLE_TIMEOUT_SEC,
     ):
         self.socket_path = socket_path
-        self.socket_dir = os.path.dirname(socket_path) or "."
         self.apps_dir = os.path.abspath(os.path.expanduser(apps_dir))
         self.settings_path = os.path.abspath(os.path.expanduser(settings_path))
-        self.server_socket = None
         self.running = True
         self.state_lock = threading.RLock()
         self.event_broadcaster = EventBroadcaster()
-        self.board = WhisplayBoard()
+        self.server = DaemonServer(
+            socket_path,
+            self._run_command,
+            on_close=self.event_broadcaster.remove,
+            workers=COMMAND_WORKERS,
+        )
+        self.board = WhisplayBoard(async_flush=True)
         self.desktop = DesktopRenderer(self.board, SCRIPT_DIR)
+        # Held around every panel push that runs outside state_lock (render
+        # loop and compositor), so a push checked against the current focus
+        # cannot land after one made for a newer focus.
+        self._present_lock = threading.Lock()
+        self.compositor = Compositor(
+            self.desktop,
+            on_rendered=self._on_view_rendered,
+            present_lock=self._present_lock,
+            is_current=self._view_is_current,
+        )
         self.pisugar = PiSugarManager()
         self.status_poller = StatusPoller(self.pisugar)
         self.internal_apps = InternalAppManager()
@@ -74,20 +106,57 @@ class WhisplayDaemon:
         self.apps: dict[str, AppRecord] = {}
         self.selected_app_index = 0
         self.foreground_app_id: str | None = None
+        # Bumped with every foreground change; compositor views carry the
+        # generation they were requested in.
+        self._focus_generation = 0
         self.pending_launch_app_id: str | None = None
         self.pending_launch_started_at = 0.0
         self.exit_request = None
+        # Apps blocked in app.focus.acquire, best priority first.
+        self._focus_waiters: list[FocusWaiter] = []
+        self._focus_wait_order = 0
         self.last_frame = None
+        self._last_frame_key = None
+        self._frame_ready = threading.Event()
         self._button_press_started_at = 0.0
+        self._button_press_event_at: float | None = None
         self._recent_release_times: list[float] = []
         self._foreground_long_press_fired = False
+        self._long_press_blinking = False
         self._last_status_poll_at = 0.0
+        self.idle_timeout_sec = max(0.0, float(idle_timeout_sec))
+        self.sleep_reason: str | None = None
+        self._awake = threading.Event()
+        self._awake.set()
+        self._last_activity_at = time.monotonic()
+        self._render_pending = False
+        self._swallow_button_release = False
         self._render_thread = threading.Thread(target=self._render_loop, daemon=True)
         self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._commands = {
+            "health.ping": self._cmd_health_ping,
+            UPGRADE_COMMAND: self._cmd_protocol_upgrade,
+            "app.register": self._cmd_app_register,
+            "app.list": self._cmd_app_list,
+            "app.launch": self._cmd_app_launch,
+            "app.focus.acquire": self._cmd_app_focus_acquire,
+            "app.focus.release": self._cmd_app_focus_release,
+            "app.exit.request": self._cmd_app_exit_request,
+            "framebuffer.acquire": self._cmd_framebuffer_acquire,
+            "framebuffer.present": self._cmd_framebuffer_present,
+            "backlight.set": self._cmd_backlight_set,
+            "display.color_mode": self._cmd_display_color_mode,
+            "led.set": self._cmd_led_set,
+            "led.fade": self._cmd_led_fade,
+            "led.effect": self._cmd_led_effect,
+            "batch": self._cmd_batch,
+            "button.get_state": self._cmd_button_get_state,
+            "events.subscribe": self._cmd_events_subscribe,
+        }
         self._load_apps()
         self._register_internal_apps()
-        self.board.on_button_press(self._on_button_pressed)
-        self.board.on_button_release(self._on_button_released)
+        self.board.on_button_press(self._on_button_pressed, with_timestamp=True)
+        self.board.on_button_release(self._on_button_released, with_timestamp=True)
 
     def _move_desktop_selection(self, delta: int):
         apps = self._app_list()
@@ -99,6 +168,10 @@ class WhisplayDaemon:
 
     def _handle_keyboard_action(self, action: str):
         with self.state_lock:
+            if self.sleep_reason == "idle":
+                self._wake_display("keyboard")
+                return
+            self._last_activity_at = time.monotonic()
             if self.foreground_app_id and self.internal_apps.text_input_active():
                 self.internal_apps.handle_keyboard_action(self.foreground_app_id, action)
                 if self.internal_apps.consume_dirty():
@@ -145,6 +218,15 @@ class WhisplayDaemon:
         except Exception:
             return 0
 
+    def _normalize_target_fps(self, value) -> float:
+        try:
+            fps = float(value)
+        except Exception:
+            return 0.0
+        if fps != fps or fps <= 0:
+            return 0.0
+        return min(fps, float(MAX_TARGET_FPS))
+
     def _normalize_exit_gesture(self, value) -> str:
         text = str(value or EXIT_GESTURE_QUAD_CLICK).strip().lower()
         if text not in VALID_EXIT_GESTURES:
@@ -177,6 +259,7 @@ class WhisplayDaemon:
             "use_daemon_default_log": app.use_daemon_default_log,
             "persist": app.persist,
             "disable_esc_exit_key": app.disable_esc_exit_key,
+            "target_fps": app.target_fps,
         }
 
     def _load_apps(self):
@@ -212,6 +295,7 @@ class WhisplayDaemon:
                 use_daemon_default_log=bool(item.get("use_daemon_default_log", False)),
                 persist=bool(item.get("persist", False)),
                 disable_esc_exit_key=bool(item.get("disable_esc_exit_key", False)),
+                target_fps=self._normalize_target_fps(item.get("target_fps", 0)),
             )
 
     def _register_internal_apps(self):
@@ -247,55 +331,105 @@ class WhisplayDaemon:
         return apps[self.selected_app_index]
 
     def _render_desktop(self):
-        self.last_frame = None
+        """Queue a desktop render of the current state; see Compositor."""
+        if self.foreground_app_id:
+            # Hidden behind the foreground app; its release renders it.
+            return
+        if self.sleep_reason is not None:
+            self._render_pending = True
+            return
+        apps = self._app_list()
         running_app_id = None
-        if not self.foreground_app_id:
-            for app in self._app_list():
-                if app.is_running():
-                    running_app_id = app.app_id
-                    break
-        self.desktop.render(
-            self._app_list(),
-            self.selected_app_index,
-            self.pending_launch_app_id,
-            running_app_id,
-            self.status_poller.wifi_signal_level,
-            self.status_poller.battery_level,
+        for app in apps:
+            if app.is_running():
+                running_app_id = app.app_id
+                break
+        self.compositor.submit(
+            DesktopView(
+                apps=tuple(AppSnapshot(app.app_id, app.display_name, app.is_running()) for app in apps),
+                selected_index=self.selected_app_index,
+                pending_app_id=self.pending_launch_app_id,
+                running_app_id=running_app_id,
+                wifi_signal_level=self.status_poller.wifi_signal_level,
+                battery_level=self.status_poller.battery_level,
+                focus_generation=self._focus_generation,
+            )
         )
 
     def _render_internal_app(self):
         if not self.internal_apps.is_internal_app(self.foreground_app_id):
             return
-        self.last_frame = None
+        if self.sleep_reason is not None:
+            self._render_pending = True
+            return
         view_model = self.internal_apps.get_view_model(self.foreground_app_id)
-        self.desktop.render_internal_app(view_model)
-
-    def _allocate_framebuffer(self, app: AppRecord):
-        framebuffer_path = f"/tmp/whisplay-fb-{app.app_id}-{uuid.uuid4().hex}.bin"
-        framebuffer_file = open(framebuffer_path, "w+b")
-        framebuffer_file.truncate(FRAMEBUFFER_SIZE)
-        framebuffer_map = mmap.mmap(framebuffer_file.fileno(), FRAMEBUFFER_SIZE)
-        framebuffer_map.write(b"\x00" * FRAMEBUFFER_SIZE)
-        framebuffer_map.flush()
-        framebuffer_map.seek(0)
-        app.framebuffer_path = framebuffer_path
-        app.framebuffer_file = framebuffer_file
+        self.compositor.submit(InternalAppView(self.foreground_app_id, view_model, self._focus_generation))
+
+    def _set_foreground(self, app_id: str | None):
+        self.foreground_app_id = app_id
+        self._focus_generation += 1
+        # The color mode belongs to the app that set it.
+        if self.board.color_bits != 16:
+            self.board.set_color_mode(16)
+
+    def _view_is_current(self, view) -> bool:
+        """Whether a compositor view still belongs to the foreground; runs
+        under _present_lock, so a newer foreground's frames push after it."""
+        return view.focus_generation == self._focus_generation
+
+    def _on_view_rendered(self, view):
+        # The panel no longer shows the app frame the render loop last
+        # pushed, so its next frame must be pushed in full.
+        with self.state_lock:
+            self.last_frame = None
+            self._last_frame_key = None
+        self._frame_ready.set()
+
+    def _allocate_framebuffer(self, app: AppRecord, buffer_count: int = 1, memfd: bool = True):
+        """Map a zeroed framebuffer for ``app``.
+
+        A sealed memfd is preferred: it never reaches the SD card and needs
+        no cleanup after a crash. Clients receive it over the socket, while
+        ``framebuffer_path`` points at it through /proc for the rest. Without
+        memfd support (or for clients that cannot take descriptors) a /tmp
+        file is used instead; truncating it already zero-fills it.
+        """
+        size = mapping_size(FRAMEBUFFER_SIZE, buffer_count)
+        fd = create_memfd(f"whisplay-fb-{app.app_id}", size) if memfd else None
+        if fd is not None:
+            framebuffer_map = mmap.mmap(fd, size)
+            app.framebuffer_fd = fd
+            app.framebuffer_path = f"/proc/{os.getpid()}/fd/{fd}"
+        else:
+            framebuffer_path = f"/tmp/whisplay-fb-{app.app_id}-{uuid.uuid4().hex}.bin"
+            framebuffer_file = open(framebuffer_path, "w+b")
+            framebuffer_file.truncate(size)
+            framebuffer_map = mmap.mmap(framebuffer_file.fileno(), size)
+            app.framebuffer_path = framebuffer_path
+            app.framebuffer_file = framebuffer_file
         app.framebuffer_mmap = framebuffer_map
+        app.framebuffer_header = FrameHeader.create(framebuffer_map, FRAMEBUFFER_SIZE, buffer_count)
 
     def _teardown_framebuffer(self, app: AppRecord):
+        app.framebuffer_header = None
         if app.framebuffer_mmap is not None:
             try:
                 app.framebuffer_mmap.close()
             except Exception:
                 pass
             app.framebuffer_mmap = None
+        if app.framebuffer_fd is not None:
+            try:
+                os.close(app.framebuffer_fd)
+            except OSError:
+                pass
+            app.framebuffer_fd = None
         if app.framebuffer_file is not None:
             try:
                 app.framebuffer_file.close()
             except Exception:
                 pass
             app.framebuffer_file = None
-        if app.framebuffer_path:
             try:
                 os.unlink(app.framebuffer_path)
             except Exception:
@@ -310,25 +444,92 @@ class WhisplayDaemon:
                 pass
             app.process_log_handle = None
 
-    def _grant_focus(self, app: AppRecord):
+    def _grant_focus(self, app: AppRecord, buffer_count: int = 1, pass_fd: bool = True):
         if self.foreground_app_id and self.foreground_app_id != app.app_id:
             raise RuntimeError("another app is already foreground")
+        self._drop_focus_waiter(app.app_id)
         app.session_token = uuid.uuid4().hex
+        app.focus_unclaimed = False
+        app.frame_stats = FrameStats()
         self._teardown_framebuffer(app)
-        self._allocate_framebuffer(app)
-        self.foreground_app_id = app.app_id
+        self._allocate_framebuffer(app, buffer_count, memfd=pass_fd)
+        self._set_foreground(app.app_id)
         self.pending_launch_app_id = None
         self.pending_launch_started_at = 0.0
         self.exit_request = None
+        self._last_frame_key = None
+        self._frame_ready.set()
         self.event_broadcaster.broadcast(
             "app_foreground_acquired",
             {
                 "app_id": app.app_id,
                 "session_token": app.session_token,
+                "framebuffer": self._framebuffer_payload(app),
             },
             app_id=app.app_id,
         )
 
+    def _framebuffer_payload(self, app: AppRecord) -> dict:
+        buffer_count = app.framebuffer_header.buffer_count
+        return {
+            "app_id": app.app_id,
+            "session_token": app.session_token,
+            "width": SCREEN_WIDTH,
+            "height": SCREEN_HEIGHT,
+            "stride": FRAMEBUFFER_STRIDE,
+            "pixel_format": PIXEL_FORMAT,
+            "buffer_handle": app.framebuffer_path,
+            "header_offset": FRAMEBUFFER_SIZE * buffer_count,
+            "header_size": FRAME_HEADER_SIZE,
+            "buffers": buffer_count,
+            "buffer_fd": app.framebuffer_fd is not None,
+        }
+
+    def _queue_focus_waiter(self, app: AppRecord, payload: dict) -> int:
+        """Queue ``app`` for focus; returns its 1-based queue position."""
+        try:
+            timeout_sec = float(payload.get("timeout_ms", FOCUS_WAIT_TIMEOUT_SEC * 1000)) / 1000.0
+        except (TypeError, ValueError) as exc:
+            raise RuntimeError("timeout_ms must be a number") from exc
+        self._drop_focus_waiter(app.app_id)
+        self._focus_wait_order += 1
+        waiter = FocusWaiter(
+            app_id=app.app_id,
+            priority=app.priority,
+            order=self._focus_wait_order,
+            deadline=time.monotonic() + max(0.0, min(timeout_sec, FOCUS_WAIT_TIMEOUT_SEC)),
+            buffers=self._requested_buffers(payload),
+            pass_fd=bool(payload.get("pass_fd", True)),
+        )
+        self._focus_waiters.append(waiter)
+        self._focus_waiters.sort(key=FocusWaiter.sort_key)
+        return self._focus_waiters.index(waiter) + 1
+
+    def _drop_focus_waiter(self, app_id: str) -> bool:
+        count = len(self._focus_waiters)
+        self._focus_waiters = [waiter for waiter in self._focus_waiters if waiter.app_id != app_id]
+        return len(self._focus_waiters) != count
+
+    def _service_focus_queue(self):
+        """Hand free focus to the best waiter that can hear the grant."""
+        if not self._focus_waiters:
+            return
+        now = time.monotonic()
+        self._focus_waiters = [
+            waiter for waiter in self._focus_waiters
+            if waiter.deadline > now and waiter.app_id in self.apps
+        ]
+        if self.foreground_app_id or self.pending_launch_app_id:
+            return
+        for waiter in self._focus_waiters:
+            # The grant is only delivered as an event; an app whose
+            # subscription is not up yet keeps its place.
+            if self.event_broadcaster.has_app_subscribers(waiter.app_id):
+                app = self.apps[waiter.app_id]
+                self._grant_focus(app, waiter.buffers, waiter.pass_fd)
+                app.focus_unclaimed = True
+                return
+
     def _release_focus(self, app: AppRecord, reason: str):
         self.event_broadcaster.broadcast(
             "app_focus_revoked",
@@ -337,13 +538,15 @@ class WhisplayDaemon:
         )
         app.session_token = None
         self._teardown_framebuffer(app)
-        self.foreground_app_id = None
+        self._set_foreground(None)
         self.exit_request = None
         self._foreground_long_press_fired = False
         self.pending_launch_app_id = None
         self.pending_launch_started_at = 0.0
+        self._frame_ready.set()
         self._render_desktop()
         self.event_broadcaster.broadcast("desktop_entered", {"reason": reason})
+        self._service_focus_queue()
 
     def _request_exit(self, app: AppRecord, reason: str):
         print(f"[WhisplayDaemon] Exit requested for {app.app_id}: {reason}")
@@ -415,7 +618,7 @@ class WhisplayDaemon:
 
     def _launch_app(self, app: AppRecord):
         if self.internal_apps.is_internal_app(app.app_id):
-            self.foreground_app_id = app.app_id
+            self._set_foreground(app.app_id)
             self.pending_launch_app_id = None
             self.pending_launch_started_at = 0.0
             self.exit_request = None
@@ -463,10 +666,18 @@ class WhisplayDaemon:
         self.pending_launch_started_at = time.time()
         self._render_desktop()
 
-    def _on_button_pressed(self):
+    def _on_button_pressed(self, event_at: float | None = None):
         with self.state_lock:
+            if self.sleep_reason == "idle":
+                # The waking press (and its release) only turns the screen on.
+                self._swallow_button_release = True
+                self._wake_display("button")
+                return
+            self._last_activity_at = time.monotonic()
             self._button_press_started_at = time.time()
+            self._button_press_event_at = event_at
             self._foreground_long_press_fired = False
+            self._long_press_blinking = False
             if not self.foreground_app_id or self.internal_apps.is_internal_app(self.foreground_app_id):
                 self.board.set_rgb(0, 0, 255)
             if self.foreground_app_id and not self.internal_apps.is_internal_app(self.foreground_app_id):
@@ -476,13 +687,23 @@ class WhisplayDaemon:
                     app_id=self.foreground_app_id,
                 )
 
-    def _on_button_released(self):
+    def _on_button_released(self, event_at: float | None = None):
         with self.state_lock:
+            if self._swallow_button_release:
+                self._swallow_button_release = False
+                return
+            self._last_activity_at = time.monotonic()
             if not self.foreground_app_id or self.internal_apps.is_internal_app(self.foreground_app_id):
                 self.board.set_rgb(0, 0, 0)
             now = time.time()
-            press_duration = now - self._button_press_started_at if self._button_press_started_at else 0
+            if event_at is not None and self._button_press_event_at is not None:
+                # Kernel edge timestamps: immune to callback scheduling delays.
+                press_duration = event_at - self._button_press_event_at
+            else:
+                press_duration = now - self._button_press_started_at if self._button_press_started_at else 0
             self._button_press_started_at = 0.0
+            self._button_press_event_at = None
+            self._long_press_blinking = False
 
             if self.foreground_app_id:
                 app = self.apps.get(self.foreground_app_id)
@@ -536,20 +757,155 @@ class WhisplayDaemon:
                 self._render_desktop()
 
     def _render_loop(self):
-        interval = 1.0 / RENDER_FPS
+        retry_delay = 1.0 / RENDER_FPS / 10
+        next_frame_at = 0.0
         while self.running:
+            if not self._awake.is_set():
+                # Parked while the display sleeps; wake restores it. Panel
+                # power changes happen on this thread, off state_lock, since
+                # leaving sleep waits out the SLPOUT settle time.
+                if not self.board.sleeping:
+                    # backlight.set 0 only darkens the screen; the LED keeps
+                    # showing whatever an app set.
+                    self.board.sleep(led_off=self.sleep_reason != "backlight_off")
+                self._awake.wait()
+                continue
+            if self.board.sleeping:
+                self.board.wake()
             frame = None
+            frame_key = None
+            damage = None
+            scanout = None
+            committed = False
+            polled = False
+            shown = None
+            dropped = 0
+            interval = 0.0
+            # Cleared before reading the header so a present that lands
+            # after the read still wakes the wait below.
+            self._frame_ready.clear()
             with self.state_lock:
                 app_id = self.foreground_app_id
                 app = self.apps.get(app_id) if app_id else None
+                token = app.session_token if app else None
                 framebuffer = app.framebuffer_mmap if app else None
-                if framebuffer is not None:
+                header = app.framebuffer_header if app else None
+                if header is not None and header.buffer_count > 1:
+                    # Swap chain: claim the flipped buffer here and push it
+                    # below, outside the lock. The app never writes the
+                    # scanout buffer, so it is read straight from the mapping.
+                    committed = True
+                    frame_key = (app.session_token, header.frame)
+                    if frame_key != self._last_frame_key:
+                        taken, index, damage = header.take()
+                        dropped = self._skipped_frames(app, taken)
+                        if not self._continues_frame(app):
+                            damage = None
+                        # Viewed under the lock: teardown cannot close a
+                        # mapping with a live view, so it stays valid.
+                        scanout = header.buffer_view(index)
+                        frame_key = (app.session_token, taken)
+                        self._last_frame_key = frame_key
+                        self._last_activity_at = time.monotonic()
+                elif framebuffer is not None and header is not None and (header.flags & FLAG_COMMIT or header.seq):
+                    # Committing apps are read once per present; apps that
+                    # only bump the write sequence are read when it moves.
+                    committed = bool(header.flags & FLAG_COMMIT)
+                    polled = not committed
+                    frame_key = (app.session_token, header.frame if committed else header.seq)
+                    if frame_key != self._last_frame_key or self.last_frame is None:
+                        frame, _ = header.read_pixels()
+                        if frame is not None and committed:
+                            dropped = self._skipped_frames(app, frame_key[1])
+                            # Damage is read after the pixels, so it covers
+                            # at least every change they contain.
+                            damage = header.read_damage() if self._continues_frame(app) else None
+                            header.acknowledge(frame_key[1])
+                elif framebuffer is not None:
+                    polled = True
                     framebuffer.seek(0)
                     frame = framebuffer.read(FRAMEBUFFER_SIZE)
-            if frame is not None and frame != self.last_frame:
-                self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
-                self.last_frame = frame
-            time.sleep(interval)
+                if app is not None:
+                    interval = self._frame_interval(app, polled)
+            if scanout is not None:
+                with scanout, self._present_lock:
+                    # Dropped if focus moved on meanwhile.
+                    if self._shows(app, token):
+                        if self._last_frame_key != frame_key:
+                            # A compositor push landed since the take.
+                            damage = None
+                        self.board.present_direct(scanout, damage)
+                        self._last_frame_key = frame_key
+                        shown = app
+            elif frame is not None and damage is not None:
+                with self._present_lock:
+                    if self._shows(app, token):
+                        if self._continues_frame(app):
+                            self.board.update_regions(frame, damage)
+                        else:
+                            # A compositor push landed since the read.
+                            self.board.present(frame)
+                        self._last_frame_key = frame_key
+                        self.last_frame = frame
+                        self._last_activity_at = time.monotonic()
+                        shown = app
+            elif frame is not None:
+                self._last_frame_key = frame_key
+                if frame != self.last_frame:
+                    with self._present_lock:
+                        if self._shows(app, token):
+                            self.board.present(frame)
+                            self.last_frame = frame
+                            self._last_activity_at = time.monotonic()
+                            shown = app
+            if shown is not None:
+                now = time.monotonic()
+                shown.frame_stats.record(now, self.board.push_time, dropped)
+                next_frame_at = now + interval
+            if polled:
+                # Nothing tells the daemon when these apps draw.
+                time.sleep(interval)
+                continue
+            if committed and frame_key != self._last_frame_key:
+                # The app was mid-write; retry shortly instead of waiting
+                # for the next present.
+                time.sleep(retry_delay)
+                continue
+            # Static until the next present or focus change, both of which
+            # set _frame_ready, so an idle panel costs no wakeups.
+            self._frame_ready.wait()
+            # Presents that land before the next slot are coalesced.
+            delay = next_frame_at - time.monotonic()
+            if delay > 0 and self.running:
+                time.sleep(delay)
+
+    def _shows(self, app: AppRecord, token) -> bool:
+        """Whether a frame read from ``app`` during focus session ``token``
+        may still be pushed; caller holds _present_lock."""
+        return self.foreground_app_id == app.app_id and app.session_token == token
+
+    def _frame_interval(self, app: AppRecord, polled: bool) -> float:
+        """Seconds between frames for ``app``.
+
+        The app's target_fps, else RENDER_FPS for apps that must be polled
+        and no limit for apps that present, never faster than the SPI bus
+        has been pushing frames.
+        """
+        fps = app.target_fps or (RENDER_FPS if polled else 0.0)
+        return max(1.0 / fps if fps else 0.0, self.board.push_time)
+
+    def _skipped_frames(self, app: AppRecord, frame: int) -> int:
+        """Frames ``app`` presented since the last one shown that never
+        reached the panel."""
+        if not self._continues_frame(app) or not isinstance(self._last_frame_key[1], int):
+            return 0
+        skipped = (frame - self._last_frame_key[1] - 1) & 0xFFFFFFFF
+        return skipped if skipped < 0x80000000 else 0
+
+    def _continues_frame(self, app: AppRecord) -> bool:
+        """True when the panel still shows ``app``'s last frame, so its
+        damage rectangles describe every change."""
+        return self._last_frame_key is not None and self._last_frame_key[0] == app.session_token
 
     def _monitor_loop(self):
         while self.running:
@@ -572,6 +928,7 @@ class WhisplayDaemon:
                             self._render_desktop()
                 if self.pending_launch_app_id and not self.foreground_app_id:
                     self._render_desktop()
+                self._service_focus_queue()
                 if self.foreground_app_id and self.internal_apps.is_internal_app(self.foreground_app_id):
                     self.internal_apps.tick(self.foreground_app_id)
                     if self.internal_apps.consume_dirty():
@@ -596,14 +953,13 @@ class WhisplayDaemon:
                             if app and app.exit_gesture == EXIT_GESTURE_LONG_PRESS and not self._foreground_long_press_fired:
                                 self._request_exit(app, "long_press_exit")
                             elif self.internal_apps.is_internal_app(self.foreground_app_id):
-                                flash_on = int(time.time() * 5) % 2 == 0
-                                self.board.set_rgb(0, 255, 0) if flash_on else self.board.set_rgb(0, 0, 0)
+                                self._start_long_press_blink()
                         else:
-                            flash_on = int(time.time() * 5) % 2 == 0
-                            self.board.set_rgb(0, 255, 0) if flash_on else self.board.set_rgb(0, 0, 0)
+                            self._start_long_press_blink()
                     else:
                         self._button_press_started_at = 0.0
                         self._foreground_long_press_fired = False
+                        self._long_press_blinking = False
                         if not self.foreground_app_id or self.internal_apps.is_internal_app(self.foreground_app_id):
                             self.board.set_rgb(0, 0, 0)
                 if self.exit_request is not None and time.time() >= self.exit_request["deadline"]:
@@ -613,7 +969,57 @@ class WhisplayDaemon:
                 if self.pisugar.poll_home_trigger():
                     self._request_exit_from_pisugar()
                 self._refresh_status_icons()
-            time.sleep(0.1)
+                if (
+                    self.idle_timeout_sec > 0
+                    and self.sleep_reason is None
+                    and not self.pending_launch_app_id
+                    and time.monotonic() - self._last_activity_at >= self.idle_timeout_sec
+                ):
+                    self._sleep_display("idle")
+            if self.sleep_reason is not None:
+                self._awake.wait(SLEEP_MONITOR_INTERVAL_SEC)
+            else:
+                time.sleep(0.1)
+
+    def _sleep_display(self, reason: str):
+        """Park the render thread, which puts the panel to sleep."""
+        if self.sleep_reason is not None:
+            self.sleep_reason = reason
+            return
+        print(f"[WhisplayDaemon] Display sleep: {reason}")
+        self.sleep_reason = reason
+        self._awake.clear()
+        self._frame_ready.set()
+        self.event_broadcaster.broadcast(
+            "display_sleep",
+            {"reason": reason},
+            app_id=self.foreground_app_id,
+        )
+
+    def _wake_display(self, reason: str):
+        if self.sleep_reason is None:
+            return
+        print(f"[WhisplayDaemon] Display wake: {reason}")
+        self.sleep_reason = None
+        self._last_activity_at = time.monotonic()
+        self._awake.set()
+        self._frame_ready.set()
+        if self._render_pending:
+            self._render_pending = False
+            if not self.foreground_app_id:
+                self._render_desktop()
+            elif self.internal_apps.is_internal_app(self.foreground_app_id):
+                self._render_internal_app()
+        self.event_broadcaster.broadcast(
+            "display_wake",
+            {"reason": reason},
+            app_id=self.foreground_app_id,
+        )
+
+    def _start_long_press_blink(self):
+        if not self._long_press_blinking:
+            self._long_press_blinking = True
+            self.board.play_led_effect(LEDEffect.blink((0, 255, 0), on_ms=200, off_ms=200))
 
     def _register_app(self, payload: dict) -> dict:
         app_id = str(payload.get("app_id", "")).strip()
@@ -644,6 +1050,8 @@ class WhisplayDaemon:
             record.persist = bool(payload.get("persist"))
         if payload.get("disable_esc_exit_key") is not None:
             record.disable_esc_exit_key = bool(payload.get("disable_esc_exit_key"))
+        if payload.get("target_fps") is not None:
+            record.target_fps = self._normalize_target_fps(payload.get("target_fps"))
         self._save_app(record)
         self._render_desktop()
         return {
@@ -654,11 +1062,13 @@ class WhisplayDaemon:
             "priority": record.priority,
             "use_daemon_default_log": record.use_daemon_default_log,
             "disable_esc_exit_key": record.disable_esc_exit_key,
+            "target_fps": record.target_fps,
             "running": record.is_running(),
         }
 
     def _list_apps_payload(self) -> list[dict]:
         selected = self._current_selected_app()
+        now = time.monotonic()
         return [
             {
                 "app_id": app.app_id,
@@ -668,184 +1078,255 @@ class WhisplayDaemon:
                 "priority": app.priority,
                 "use_daemon_default_log": app.use_daemon_default_log,
                 "disable_esc_exit_key": app.disable_esc_exit_key,
+                "target_fps": app.target_fps,
                 "running": app.is_running(),
                 "selected": selected is not None and selected.app_id == app.app_id,
                 "foreground": self.foreground_app_id == app.app_id,
+                "frame_stats": app.frame_stats.as_dict(now),
             }
             for app in self._app_list()
         ]
 
-    def handle_command(self, request: dict, conn) -> tuple[dict, bool]:
-        version = request.get("version", 1)
-        if version != 1:
-            return {"ok": False, "error": f"unsupported version: {version}"}, False
+    def _requested_buffers(self, payload: dict) -> int:
+        try:
+            buffer_count = int(payload.get("buffers", 1))
+        except (TypeError, ValueError) as exc:
+            raise RuntimeError("buffers must be an integer") from exc
+        return max(1, min(MAX_FRAMEBUFFER_BUFFERS, buffer_count))
 
-        cmd = str(request.get("cmd", "")).strip()
-        payload = request.get("payload") or {}
-        if not isinstance(payload, dict):
-            payload = {}
+    def _foreground_session(self, payload: dict) -> AppRecord:
+        app_id = str(payload.get("app_id", "")).strip()
+        session_token = str(payload.get("session_token", "")).strip()
+        app = self.apps.get(app_id)
+        if app is None or app.session_token != session_token or self.foreground_app_id != app_id:
+            raise RuntimeError("invalid foreground session")
+        app.focus_unclaimed = False
+        return app
+
+    def _cmd_health_ping(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        return {
+            "ok": True,
+            "payload": {
+                "service": "whisplay-daemon",
+                "screen": {
+                    "width": SCREEN_WIDTH,
+                    "height": SCREEN_HEIGHT,
+                    "stride": FRAMEBUFFER_STRIDE,
+                    "pixel_format": PIXEL_FORMAT,
+                },
+                "foreground_app_id": self.foreground_app_id,
+                "sleeping": self.sleep_reason is not None,
+            },
+        }, False
 
-        with self.state_lock:
-            if cmd == "health.ping":
-                return {
-                    "ok": True,
-                    "payload": {
-                        "service": "whisplay-daemon",
-                        "screen": {
-                            "width": SCREEN_WIDTH,
-                            "height": SCREEN_HEIGHT,
-                            "stride": FRAMEBUFFER_STRIDE,
-                            "pixel_format": PIXEL_FORMAT,
-                        },
-                        "foreground_app_id": self.foreground_app_id,
-                    },
-                }, False
-
-            if cmd == "app.register":
-                return {"ok": True, "payload": self._register_app(payload)}, False
-
-            if cmd == "app.list":
-                return {"ok": True, "payload": {"apps": self._list_apps_payload()}}, False
-
-            if cmd == "app.launch":
-                app_id = str(payload.get("app_id", "")).strip()
-                app = self.apps.get(app_id)
-                if app is None:
-                    raise RuntimeError(f"unknown app: {app_id}")
-                if self.foreground_app_id and self.foreground_app_id != app_id:
-                    raise RuntimeError("cannot launch while another app is foreground")
-                self._launch_app(app)
-                return {"ok": True, "payload": {"app_id": app_id, "pending": True}}, False
-
-            if cmd == "app.focus.acquire":
-                app_id = str(payload.get("app_id", "")).strip()
-                app = self.apps.get(app_id)
-                if app is None:
-                    raise RuntimeError(f"unknown app: {app_id}")
-                if self.pending_launch_app_id and self.pending_launch_app_id != app_id and self.foreground_app_id != app_id:
-                    raise RuntimeError("another app is pending foreground")
-                self._grant_focus(app)
-                return {
-                    "ok": True,
-                    "payload": {
-                        "app_id": app.app_id,
-                        "session_token": app.session_token,
-                    },
-                }, False
-
-            if cmd == "framebuffer.acquire":
-                app_id = str(payload.get("app_id", "")).strip()
-                session_token = str(payload.get("session_token", "")).strip()
-                app = self.apps.get(app_id)
-                if app is None or app.session_token != session_token or self.foreground_app_id != app_id:
-                    raise RuntimeError("invalid foreground session")
-                return {
-                    "ok": True,
-                    "payload": {
-                        "app_id": app.app_id,
-                        "session_token": app.session_token,
-                        "width": SCREEN_WIDTH,
-                        "height": SCREEN_HEIGHT,
-                        "stride": FRAMEBUFFER_STRIDE,
-                        "pixel_format": PIXEL_FORMAT,
-                        "buffer_handle": app.framebuffer_path,
-                    },
-                }, False
-
-            if cmd == "app.focus.release":
-                app_id = str(payload.get("app_id", "")).strip()
-                session_token = str(payload.get("session_token", "")).strip()
-                app = self.apps.get(app_id)
-                if app is None or app.session_token != session_token:
-                    raise RuntimeError("invalid session")
-                if self.foreground_app_id == app_id:
-                    self._release_focus(app, "app_release")
-                return {"ok": True}, False
+    def _cmd_protocol_upgrade(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        # handle_client switches the connection to frames after replying.
+        return {"ok": True, "payload": {"version": PROTOCOL_VERSION}}, False
 
-            if cmd == "app.exit.request":
-                app_id = str(payload.get("app_id", "")).strip()
-                app = self.apps.get(app_id)
-                if app is None:
-                    raise RuntimeError(f"unknown app: {app_id}")
-                self._request_exit(app, "remote_request")
-                return {"ok": True}, False
+    def _cmd_app_register(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        return {"ok": True, "payload": self._register_app(payload)}, False
 
-            if cmd == "backlight.set":
-                self.board.set_backlight(int(payload.get("brightness", 0)))
-                return {"ok": True}, False
+    def _cmd_app_list(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        return {"ok": True, "payload": {"apps": self._list_apps_payload()}}, False
 
-            if cmd == "led.set":
-                self.board.set_rgb(
-                    int(payload.get("r", 0)),
-                    int(payload.get("g", 0)),
-                    int(payload.get("b", 0)),
-                )
-                return {"ok": True}, False
+    def _cmd_app_launch(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app_id = str(payload.get("app_id", "")).strip()
+        app = self.apps.get(app_id)
+        if app is None:
+            raise RuntimeError(f"unknown app: {app_id}")
+        if self.foreground_app_id and self.foreground_app_id != app_id:
+            raise RuntimeError("cannot launch while another app is foreground")
+        self._launch_app(app)
+        return {"ok": True, "payload": {"app_id": app_id, "pending": True}}, False
 
-            if cmd == "led.fade":
-                self.board.set_rgb_fade(
-                    int(payload.get("r", 0)),
-                    int(payload.get("g", 0)),
-                    int(payload.get("b", 0)),
-                    int(payload.get("duration_ms", 100)),
-                )
+    def _cmd_app_focus_acquire(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app_id = str(payload.get("app_id", "")).strip()
+        app = self.apps.get(app_id)
+        if app is None:
+            raise RuntimeError(f"unknown app: {app_id}")
+        if self.foreground_app_id and self.foreground_app_id != app_id:
+            busy = "another app is already foreground"
+        elif self.pending_launch_app_id and self.pending_launch_app_id != app_id and self.foreground_app_id != app_id:
+            busy = "another app is pending foreground"
+        else:
+            busy = None
+        if busy and not payload.get("wait"):
+            raise RuntimeError(busy)
+        if busy:
+            # Granted later through app_foreground_acquired.
+            position = self._queue_focus_waiter(app, payload)
+            return {"ok": True, "payload": {"app_id": app_id, "queued": True, "position": position}}, False
+        self._grant_focus(app, self._requested_buffers(payload), bool(payload.get("pass_fd", True)))
+        return {
+            "ok": True,
+            "payload": {
+                "app_id": app.app_id,
+                "session_token": app.session_token,
+            },
+        }, False
+
+    def _cmd_framebuffer_acquire(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app = self._foreground_session(payload)
+        buffer_count = self._requested_buffers(payload)
+        # Clients that cannot receive a descriptor get a file they
+        # can open by path.
+        pass_fd = bool(payload.get("pass_fd"))
+        header = app.framebuffer_header
+        if (
+            header is None
+            or header.buffer_count != buffer_count
+            or (not pass_fd and app.framebuffer_fd is not None)
+        ):
+            self._teardown_framebuffer(app)
+            self._allocate_framebuffer(app, buffer_count, memfd=pass_fd)
+            self._last_frame_key = None
+            self._frame_ready.set()
+        response = {"ok": True, "payload": self._framebuffer_payload(app)}
+        response["payload"]["buffer_fd"] = pass_fd and app.framebuffer_fd is not None
+        if response["payload"]["buffer_fd"]:
+            # Sent as SCM_RIGHTS with the response, not serialized.
+            response["_fds"] = [app.framebuffer_fd]
+        return response, False
+
+    def _cmd_framebuffer_present(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app = self._foreground_session(payload)
+        header = app.framebuffer_header
+        if self.sleep_reason is not None and header is not None and header.buffer_count > 1:
+            # Nothing is scanned out while asleep; retire the flip so
+            # the app gets its buffer back, and show it on wake.
+            header.take()
+            self._last_frame_key = None
+        self._frame_ready.set()
+        return {"ok": True}, False
+
+    def _cmd_app_focus_release(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app_id = str(payload.get("app_id", "")).strip()
+        session_token = str(payload.get("session_token", "")).strip()
+        app = self.apps.get(app_id)
+        waiting = self._drop_focus_waiter(app_id)
+        if app is None or app.session_token != session_token:
+            if waiting:
+                return {"ok": True}, False
+            if not session_token and app is not None and app.focus_unclaimed and self.foreground_app_id == app_id:
+                # The app gave up waiting just as the queue granted it
+                # focus, so it never saw the token.
+                self._release_focus(app, "app_release")
                 return {"ok": True}, False
+            raise RuntimeError("invalid session")
+        if self.foreground_app_id == app_id:
+            self._release_focus(app, "app_release")
+        return {"ok": True}, False
 
-            if cmd == "button.get_state":
-                return {"ok": True, "payload": {"pressed": self.board.button_pressed()}}, False
+    def _cmd_app_exit_request(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app_id = str(payload.get("app_id", "")).strip()
+        app = self.apps.get(app_id)
+        if app is None:
+            raise RuntimeError(f"unknown app: {app_id}")
+        self._request_exit(app, "remote_request")
+        return {"ok": True}, False
+
+    def _cmd_backlight_set(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        brightness = int(payload.get("brightness", 0))
+        if brightness > 0:
+            self._wake_display("backlight")
+        self.board.set_backlight(brightness)
+        if brightness <= 0:
+            self._sleep_display("backlight_off")
+        return {"ok": True}, False
+
+    def _cmd_display_color_mode(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        self._foreground_session(payload)
+        self.board.set_color_mode(int(payload.get("bits", 16)))
+        return {"ok": True, "payload": {"bits": self.board.color_bits}}, False
+
+    def _cmd_led_set(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        self.board.set_rgb(
+            int(payload.get("r", 0)),
+            int(payload.get("g", 0)),
+            int(payload.get("b", 0)),
+        )
+        return {"ok": True}, False
+
+    def _cmd_led_fade(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        self.board.set_rgb_fade(
+            int(payload.get("r", 0)),
+            int(payload.get("g", 0)),
+            int(payload.get("b", 0)),
+            int(payload.get("duration_ms", 100)),
+            wait=False,
+        )
+        return {"ok": True}, False
 
-            if cmd == "events.subscribe":
-                app_id = str(payload.get("app_id", "")).strip() or None
-                self.event_broadcaster.add(conn, app_id)
-                return {"ok": True, "payload": {"subscribed": True, "app_id": app_id}}, True
+    def _cmd_led_effect(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        effect = payload.get("effect")
+        if effect:
+            self.board.play_led_effect(LEDEffect.from_spec(effect))
+        else:
+            self.board.stop_led_effect()
+        return {"ok": True}, False
+
+    def _cmd_batch(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        results = []
+        fds = []
+        for entry in payload.get("commands") or []:
+            if not isinstance(entry, dict) or entry.get("cmd") in BATCH_EXCLUDED_COMMANDS:
+                results.append({"ok": False, "error": "command not allowed in batch"})
+                continue
+            entry = dict(entry, version=PROTOCOL_VERSION)
+            result = self._run_command(entry, conn, protocol)[0]
+            fds.extend(result.pop("_fds", ()))
+            results.append(result)
+        response = {"ok": True, "payload": {"results": results}}
+        if fds:
+            response["_fds"] = fds
+        return response, False
+
+    def _cmd_button_get_state(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        return {"ok": True, "payload": {"pressed": self.board.button_pressed()}}, False
+
+    def _cmd_events_subscribe(self, payload: dict, conn, protocol: int) -> tuple[dict, bool]:
+        app_id = str(payload.get("app_id", "")).strip() or None
+        topics = payload.get("topics")
+        if topics is not None:
+            if not isinstance(topics, list) or not all(isinstance(topic, str) for topic in topics):
+                raise RuntimeError("topics must be a list of event names")
+        self.event_broadcaster.add(conn, app_id, topics, framed=protocol >= 2)
+        return {"ok": True, "payload": {"subscribed": True, "app_id": app_id, "topics": topics}}, True
+
+    def handle_command(self, request: dict, conn, protocol: int = 1) -> tuple[dict, bool]:
+        """Run one request; ``protocol`` is the framing of the connection
+        it arrived on (1 for JSON lines, 2 for frames)."""
+        version = request.get("version", 1)
+        if version not in SUPPORTED_VERSIONS:
+            return {"ok": False, "error": f"unsupported version: {version}"}, False
 
-        return {"ok": False, "error": f"unknown command: {cmd}"}, False
+        cmd = str(request.get("cmd", "")).strip()
+        payload = request.get("payload") or {}
+        if not isinstance(payload, dict):
+            payload = {}
 
-    def handle_client(self, conn):
-        keep_open = False
+        with self.state_lock:
+            if cmd not in PASSIVE_COMMANDS:
+                self._last_activity_at = time.monotonic()
+                if self.sleep_reason == "idle" and cmd != "backlight.set":
+                    self._wake_display("client")
+            handler = self._commands.get(cmd)
+            if handler is None:
+                return {"ok": False, "error": f"unknown command: {cmd}"}, False
+            return handler(payload, conn, protocol)
+
+    def _run_command(self, request: dict, conn, protocol: int = 1) -> tuple[dict, bool]:
         try:
-            reader = conn.makefile("r")
-            while self.running:
-                line = reader.readline()
-                if not line:
-                    break
-                if not line.strip():
-                    continue
-                try:
-                    request = json.loads(line)
-                except json.JSONDecodeError:
-                    conn.sendall(b'{"ok": false, "error": "invalid json"}\n')
-                    continue
-                try:
-                    response, keep_open = self.handle_command(request, conn)
-                except Exception as exc:
-                    response, keep_open = {"ok": False, "error": str(exc)}, False
-                conn.sendall((json.dumps(response) + "\n").encode("utf-8"))
-                if keep_open:
-                    while self.running:
-                        time.sleep(1)
-                    break
+            return self.handle_command(request, conn, protocol)
         except Exception as exc:
-            print(f"[WhisplayDaemon] Client error: {exc}")
-        finally:
-            if keep_open:
-                self.event_broadcaster.remove(conn)
-            try:
-                conn.close()
-            except Exception:
-                pass
+            return {"ok": False, "error": str(exc)}, False
 
     def start(self):
-        os.makedirs(self.socket_dir, exist_ok=True)
-        if os.path.exists(self.socket_path):
-            os.unlink(self.socket_path)
-        self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.server_socket.bind(self.socket_path)
-        os.chmod(self.socket_path, 0o666)
-        self.server_socket.listen(8)
+        self.server.listen()
         self.board.set_rgb(0, 0, 0)
         self.board.set_backlight(100)
         self._refresh_status_icons(force=True)
+        self.compositor.start()
         self._render_desktop()
         self._init_pisugar_integration()
         self.internal_apps.start()
@@ -853,29 +1334,23 @@ class WhisplayDaemon:
         self._render_thread.start()
         self._monitor_thread.start()
         print(f"[WhisplayDaemon] Listening on {self.socket_path}")
-        while self.running:
-            try:
-                conn, _ = self.server_socket.accept()
-            except OSError:
-                break
-            thread = threading.Thread(target=self.handle_client, args=(conn,), daemon=True)
-            thread.start()
+        self.server.serve_forever()
 
     def stop(self):
         self.running = False
-        try:
-            if self.server_socket is not None:
-                self.server_socket.close()
-        except Exception:
-            pass
+        self._awake.set()
+        self._frame_ready.set()
+        # Queued before the loop stops, so subscribers still receive it.
         self.event_broadcaster.broadcast("daemon_stopping")
+        self.server.stop()
+        self.compositor.stop()
         self.internal_apps.stop()
         self.keyboard_reader.stop()
         with self.state_lock:
             for app in self.apps.values():
                 self._teardown_framebuffer(app)
                 self._close_process_log(app)
-            self.foreground_app_id = None
+            self._set_foreground(None)
         self.board.cleanup()
         try:
             if os.path.exists(self.socket_path):
@@ -902,6 +1377,7 @@ if __name__ == "__main__":
         runtime_config["socket_path"],
         runtime_config["apps_dir"],
         runtime_config["settings_path"],
+        idle_timeout_sec=runtime_config["idle_timeout_sec"],
     )
     signal.signal(signal.SIGTERM, cleanup_and_exit)
     signal.signal(signal.SIGINT, cleanup_and_exit)
@@ -459,6 +459,8 @@ class FlappyBirdGame:
             icon="F",
             exit_gesture="long_press",
             use_daemon_default_log=True,
+            framebuffer_buffers=2,
+            target_fps=TARGET_FPS,
         )
         self.board.set_backlight(100)
         self.running = True
@@ -587,12 +589,8 @@ class FlappyBirdGame:
         self.sounds.play("hit")
 
     def _blit_frame(self, frame: bytearray):
-        if hasattr(self.board, "_mmap") and self.board._mmap is not None:
-            self.board._mmap.seek(0)
-            self.board._mmap.write(frame)
-            self.board._mmap.seek(0)
-        else:
-            self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
+        # Flips to the daemon's swap chain, or diffs straight to the panel.
+        self.board.present(frame)
 
     def render(self):
         frame = self.renderer.new_frame()
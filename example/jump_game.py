@@ -492,6 +492,7 @@ class JumpGame:
             exit_gesture="quad_click",
             priority=25,
             use_daemon_default_log=True,
+            framebuffer_buffers=2,
         )
         self.board.set_backlight(100)
         self.running = True
@@ -706,12 +707,8 @@ class JumpGame:
             self.renderer.blit_sprite(frame, overlay, 0, 0)
 
     def _blit_frame(self, frame: bytearray):
-        if hasattr(self.board, "_mmap") and self.board._mmap is not None:
-            self.board._mmap.seek(0)
-            self.board._mmap.write(frame)
-            self.board._mmap.seek(0)
-        else:
-            self.board.draw_image(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, frame)
+        # Flips to the daemon's swap chain, or diffs straight to the panel.
+        self.board.present(frame)
 
     def render(self):
         frame = self.renderer.new_frame()
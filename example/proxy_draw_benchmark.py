@@ -0,0 +1,80 @@
+"""Measure the per-frame cost of WhisplayDaemonProxy.draw_image.
+
+The proxy is pointed at an anonymous mmap, so no daemon is needed:
+
+    python3 proxy_draw_benchmark.py --frames 500
+"""
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+runtime_dir = os.path.abspath(os.path.join(current_dir, "..", "runtime"))
+if runtime_dir not in sys.path:
+    sys.path.append(runtime_dir)
+
+from whisplay_client import WhisplayDaemonProxy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WIDTH = WhisplayDaemonProxy.LCD_WIDTH
+HEIGHT = WhisplayDaemonProxy.LCD_HEIGHT
+STRIDE = WIDTH * 2
+
+
+def legacy_draw_image(proxy, x, y, width, height, pixel_data):
+    """The previous implementation: copy to bytes, then copy row slices."""
+    frame_bytes = bytes(pixel_data if not isinstance(pixel_data, bytes) else pixel_data)
+    row_bytes = width * 2
+    for row in range(height):
+        src = row * row_bytes
+        dst = ((y + row) * proxy._framebuffer.stride) + (x * 2)
+        proxy._mmap[dst:dst + row_bytes] = frame_bytes[src:src + row_bytes]
+
+
+def make_proxy():
+    proxy = WhisplayDaemonProxy(socket_path="/nonexistent")
+    proxy._framebuffer.mmap = mmap.mmap(-1, STRIDE * HEIGHT)
+    return proxy
+
+
+def cases():
+    full = bytearray(os.urandom(STRIDE * HEIGHT))
+    sub = bytes(os.urandom(120 * 140 * 2))
+    yield "bytes full", (0, 0, WIDTH, HEIGHT, bytes(full))
+    yield "bytearray full", (0, 0, WIDTH, HEIGHT, full)
+    yield "memoryview full", (0, 0, WIDTH, HEIGHT, memoryview(full))
+    if np is not None:
+        array = np.frombuffer(bytes(full), dtype=">u2").reshape(HEIGHT, WIDTH)
+        yield "ndarray full", (0, 0, WIDTH, HEIGHT, array)
+    yield "bytes 120x140", (60, 70, 120, 140, sub)
+
+
+def measure(func, proxy, args, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        func(proxy, *args)
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+    proxy = make_proxy()
+    print(f"{'input':<16} {'legacy us':>10} {'fast us':>10}")
+    for name, draw_args in cases():
+        legacy = measure(legacy_draw_image, proxy, draw_args, args.frames)
+        fast = measure(WhisplayDaemonProxy.draw_image, proxy, draw_args, args.frames)
+        print(f"{name:<16} {legacy:>10.1f} {fast:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare CPU usage of per-channel SoftPWM threads and the PWMScheduler.
+
+Both implementations drive mock line handles, so no GPIO access is needed:
+
+    python3 pwm_benchmark.py --seconds 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+runtime_dir = os.path.abspath(os.path.join(current_dir, "..", "runtime"))
+if runtime_dir not in sys.path:
+    sys.path.append(runtime_dir)
+
+from whisplay import PWMScheduler, SoftPWM
+
+
+# (frequency, duty) for backlight + RGB, as WhisplayBoard configures them
+SCENARIOS = {
+    "idle": [(1000, 0), (100, 100), (100, 100), (100, 100)],
+    "rgb-active": [(1000, 0), (100, 30), (100, 60), (100, 90)],
+    "all-active": [(1000, 50), (100, 30), (100, 60), (100, 90)],
+}
+
+
+class MockLine:
+    bank = None
+    bank_offset = None
+
+    def __init__(self):
+        self.writes = 0
+
+    def set_value(self, _value):
+        self.writes += 1
+
+
+def run_softpwm(channels, seconds):
+    lines = [MockLine() for _ in channels]
+    pwms = [SoftPWM(line.set_value, frequency) for line, (frequency, _) in zip(lines, channels)]
+    for pwm, (_, duty) in zip(pwms, channels):
+        pwm.start(duty)
+    cpu, wall = measure(seconds)
+    for pwm in pwms:
+        pwm.stop()
+    return cpu, wall, sum(line.writes for line in lines)
+
+
+def run_scheduler(channels, seconds):
+    scheduler = PWMScheduler()
+    lines = [MockLine() for _ in channels]
+    pwms = [scheduler.add_channel(line, frequency) for line, (frequency, _) in zip(lines, channels)]
+    for pwm, (_, duty) in zip(pwms, channels):
+        pwm.start(duty)
+    cpu, wall = measure(seconds)
+    scheduler.stop()
+    return cpu, wall, sum(line.writes for line in lines)
+
+
+def measure(seconds):
+    time.sleep(0.2)  # let threads settle
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    time.sleep(seconds)
+    return time.process_time() - cpu_start, time.monotonic() - wall_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    print(f"{'scenario':<12} {'impl':<10} {'cpu %':>7} {'writes/s':>10}")
+    for name, channels in SCENARIOS.items():
+        for impl, runner in (("SoftPWM", run_softpwm), ("scheduler", run_scheduler)):
+            cpu, wall, writes = runner(channels, args.seconds)
+            print(f"{name:<12} {impl:<10} {100.0 * cpu / wall:>6.1f}% {writes / wall:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Check hardware scrolling against a model of the ST7789 frame memory.
+
+A WhisplayBoard subclass sends its SPI byte stream into a frame memory model
+instead of a device. The model decodes CASET/RASET/RAMWR/MADCTL/VSCRDEF/VSCSAD
+and works out what the panel would show. After every drawing call the check
+asserts that this matches the frame the caller meant to show. It covers the
+list-page animation of the daemon renderer, including two animations in a row
+on the same scroll area. No display hardware is needed:
+
+    python3 scroll_command_check.py
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import types
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+runtime_dir = os.path.abspath(os.path.join(current_dir, "..", "runtime"))
+daemon_dir = os.path.abspath(os.path.join(current_dir, "..", "daemon"))
+for path in (runtime_dir, daemon_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+# whisplay imports the hardware bindings at module level. The mock board
+# never calls into them, so empty modules do when they are not installed.
+for name in ("spidev", "gpiod"):
+    try:
+        __import__(name)
+    except ImportError:
+        sys.modules[name] = types.ModuleType(name)
+
+import whisplay
+from whisplay import PWMScheduler, WhisplayBoard
+
+
+WIDTH = WhisplayBoard.LCD_WIDTH
+HEIGHT = WhisplayBoard.LCD_HEIGHT
+STRIDE = WIDTH * 2
+FRAME_BYTES = STRIDE * HEIGHT
+
+
+class FrameMemory:
+    """ST7789 frame memory with the window, MADCTL and scroll registers.
+
+    Column mirroring (MX) applies to writes and scan-out alike, so columns
+    are stored as addressed; only the row direction (MY) is modelled.
+    """
+
+    def __init__(self):
+        self.rows = WhisplayBoard.GRAM_ROWS
+        self.memory = bytearray(self.rows * STRIDE)
+        self.madctl = 0
+        self.columns = (0, WIDTH - 1)
+        self.window_rows = (0, self.rows - 1)
+        self.tfa, self.vsa, self.vsp = 0, self.rows, 0
+        self.command = None
+        self.params = bytearray()
+        self.dc = 0
+        self.pixel_bytes = 0
+
+    def write(self, data):
+        if self.dc == 0:
+            for opcode in data:
+                self._finish_command()
+                self.command = opcode
+                if opcode == 0x2C:
+                    self.cursor = [self.columns[0], self.window_rows[0]]
+                    self.pending = b""
+        elif self.command == 0x2C:
+            self.pixel_bytes += len(data)
+            self._write_pixels(bytes(data))
+        else:
+            self.params += data
+
+    def _finish_command(self):
+        p = self.params
+        if self.command == 0x2A:
+            self.columns = (p[0] << 8 | p[1], p[2] << 8 | p[3])
+        elif self.command == 0x2B:
+            self.window_rows = (p[0] << 8 | p[1], p[2] << 8 | p[3])
+        elif self.command == 0x36:
+            self.madctl = p[0]
+        elif self.command == 0x33:
+            self.tfa, self.vsa = p[0] << 8 | p[1], p[2] << 8 | p[3]
+        elif self.command == 0x37:
+            self.vsp = p[0] << 8 | p[1]
+        self.command = None
+        self.params = bytearray()
+
+    def _memory_row(self, row):
+        return self.rows - 1 - row if self.madctl & 0x80 else row
+
+    def _write_pixels(self, data):
+        data = self.pending + data
+        x0, x1 = self.columns
+        offset = 0
+        while len(data) - offset >= 2:
+            x, row = self.cursor
+            count = min(x1 - x + 1, (len(data) - offset) // 2)
+            start = self._memory_row(row) * STRIDE + x * 2
+            self.memory[start:start + count * 2] = data[offset:offset + count * 2]
+            offset += count * 2
+            x += count
+            if x > x1:
+                x, row = x0, row + 1
+            self.cursor = [x, row]
+        self.pending = data[offset:]
+
+    def visible(self) -> bytes:
+        """Return the RGB565 frame the panel scans out."""
+        out = bytearray()
+        for y in range(HEIGHT):
+            line = self._memory_row(y + WhisplayBoard.PANEL_ROW_OFFSET)
+            if self.tfa <= line < self.tfa + self.vsa:
+                line = self.tfa + (self.vsp - self.tfa + line - self.tfa) % self.vsa
+            out += self.memory[line * STRIDE:(line + 1) * STRIDE]
+        return bytes(out)
+
+
+class MockLine:
+    bank = None
+    bank_offset = None
+
+    def __init__(self, on_write=None):
+        self.value = 0
+        self.on_write = on_write
+
+    def set_value(self, value):
+        self.value = value
+        if self.on_write is not None:
+            self.on_write(value)
+
+    def get_value(self):
+        return self.value
+
+    def release(self):
+        pass
+
+
+class MockSpi:
+    def __init__(self, memory):
+        self.memory = memory
+
+    def writebytes2(self, data):
+        self.memory.write(data)
+
+    def close(self):
+        pass
+
+
+class MockPanelBoard(WhisplayBoard):
+    """WhisplayBoard whose DC line and SPI bus drive a FrameMemory."""
+
+    def __init__(self):
+        self.gram = FrameMemory()
+        super().__init__(warm_attach=False)
+
+    def _init_gpio(self):
+        self._gpio_chips = {}
+        self._gpio_banks = []
+        self._gpio_lines = {
+            pin: MockLine()
+            for pin in (self.RST_PIN, self.LED_PIN, self.RED_PIN,
+                        self.GREEN_PIN, self.BLUE_PIN, self.BUTTON_PIN)
+        }
+        self._gpio_lines[self.DC_PIN] = MockLine(lambda value: setattr(self.gram, "dc", value))
+        self._pwm = PWMScheduler()
+        self.red_pwm = self._pwm.add_channel(self._gpio_lines[self.RED_PIN], 100, stop_value=1)
+        self.green_pwm = self._pwm.add_channel(self._gpio_lines[self.GREEN_PIN], 100, stop_value=1)
+        self.blue_pwm = self._pwm.add_channel(self._gpio_lines[self.BLUE_PIN], 100, stop_value=1)
+        self._btn_thread_running = False
+        self._btn_thread = None
+
+    def _init_spi(self):
+        self.spi = MockSpi(self.gram)
+
+    def _detect_hardware_version(self):
+        self.backlight_mode = False
+
+    def _detect_wm8960(self):
+        return False
+
+    def _reset_lcd(self):
+        self._invalidate_window()
+
+    def _load_panel_state(self):
+        return None
+
+    def _save_panel_state(self, config=None, **extra):
+        pass
+
+
+def random_frame(rng) -> bytes:
+    return rng.randbytes(FRAME_BYTES)
+
+
+def check(board, expected, label):
+    if board.gram.visible() != bytes(expected):
+        raise AssertionError(f"{label}: panel does not show the expected frame")
+    print(f"ok  {label}")
+
+
+def check_drawing(board, rng):
+    frame = random_frame(rng)
+    board.present(frame)
+    check(board, frame, "present")
+
+    top, height = 30, 200
+    board.set_scroll_area(top, height)
+    for delta in (12, 37, -25, height - 1):
+        start, end = top * STRIDE, (top + height) * STRIDE
+        shift = (delta % height) * STRIDE
+        area = frame[start:end]
+        frame = bytearray(frame[:start] + area[shift:] + area[:shift] + frame[end:])
+        # Refresh the rows that wrapped around, as a scrolling caller would.
+        exposed = range(top + height - delta, top + height) if delta > 0 else range(top, top - delta)
+        for y in exposed:
+            frame[y * STRIDE:(y + 1) * STRIDE] = rng.randbytes(STRIDE)
+        board.scroll(delta, frame)
+        check(board, frame, f"scroll {delta:+d}")
+
+    frame = bytearray(random_frame(rng))
+    board.present(frame)
+    check(board, frame, "present while scrolled")
+
+    x, y, width, rows = 17, 20, 90, 150
+    patch = rng.randbytes(width * rows * 2)
+    board.draw_image(x, y, width, rows, patch)
+    for row in range(rows):
+        offset = (y + row) * STRIDE + x * 2
+        frame[offset:offset + width * 2] = patch[row * width * 2:(row + 1) * width * 2]
+    check(board, frame, "draw_image across the wrap")
+
+    for x, y in ((0, 0), (120, top), (239, top + height - 1), (5, 279)):
+        board.draw_pixel(x, y, 0xF81F)
+        frame[y * STRIDE + x * 2:y * STRIDE + x * 2 + 2] = b"\xf8\x1f"
+        check(board, frame, f"draw_pixel ({x}, {y})")
+
+    board.reset_scroll()
+    board.present(frame)
+    check(board, frame, "present after reset_scroll")
+
+
+def check_list_animations(board):
+    import daemon_renderer
+    from daemon_renderer import DesktopRenderer
+
+    renderer = DesktopRenderer(board, daemon_dir)
+    items = [{"title": f"Item {i}", "meta": f"meta {i}"} for i in range(10)]
+
+    def view_model(selected):
+        return {"title": "Wi-Fi", "items": items, "selected_index": selected, "status": "ok"}
+
+    renderer._render_list_page(view_model(0))
+    check(board, renderer._list_page[3], "list page")
+
+    steps = []
+    scroll = board.scroll
+
+    def checked_scroll(delta, frame=None):
+        before = board.gram.pixel_bytes
+        scroll(delta, frame)
+        steps.append(board.gram.pixel_bytes - before)
+        check(board, frame, f"animation step {len(steps)}")
+
+    board.scroll = checked_scroll
+    # Walk the selection down past the visible rows twice, then back up,
+    # so the list scrolls several times in a row in both directions.
+    for selected in (1, 2, 3, 4, 5, 6, 7, 6, 5, 4, 3, 2, 1, 0):
+        steps.clear()
+        renderer._render_list_page(view_model(selected))
+        check(board, renderer._list_page[3], f"selection {selected}")
+        if steps:
+            # An intermediate step uploads at most the rows it exposes. The
+            # last step also repaints the selection highlight, so it is not
+            # bounded here.
+            step_rows = daemon_renderer.LIST_ITEM_ROW_HEIGHT // daemon_renderer.LIST_SCROLL_STEPS
+            budget = 2 * step_rows * STRIDE
+            print(f"    pixel bytes per step: {steps}")
+            if max(steps[:-1]) > budget:
+                raise AssertionError(f"selection {selected}: a step uploaded {max(steps[:-1])} B")
+    board.scroll = scroll
+
+
+def main():
+    whisplay.PLATFORM = "rpi"
+    board = MockPanelBoard()
+    try:
+        check(board, bytes(FRAME_BYTES), "fill_screen")
+        check_drawing(board, random.Random(7))
+        check_list_animations(board)
+    finally:
+        board.cleanup()
+    print("All scroll checks passed.")
+
+
+if __name__ == "__main__":
+    main()
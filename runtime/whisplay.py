@@ -3,14 +3,20 @@ from __future__ import annotations
 import spidev
 import time
 import os
+import json
 import threading
 import gpiod
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Detect gpiod API version: v1 has LINE_REQ_DIR_OUT; v2 has LineSettings
 _GPIOD_V2 = hasattr(gpiod, 'LineSettings')
 
 if _GPIOD_V2:
-    from gpiod.line import Direction, Value, Bias
+    from gpiod.line import Direction, Value, Bias, Edge
 
 
 # ==================== Platform Detection ====================
@@ -41,6 +47,18 @@ def _detect_platform():
 
 PLATFORM, PLATFORM_MODEL = _detect_platform()
 
+# Last applied panel configuration, used for warm attach. /run is a tmpfs,
+# so the file disappears on reboot and the first start is always cold.
+PANEL_STATE_PATH = os.getenv("WHISPLAY_PANEL_STATE_PATH", "/run/whisplay/panel-state.json")
+
+
+def _read_boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as f:
+            return f.read().strip()
+    except Exception:
+        return None
+
 
 # ==================== Pin Mappings ====================
 # Physical 40-pin header pin number -> (gpiochip number, line offset)
@@ -110,13 +128,17 @@ class _LineHandle:
     """Unified thin wrapper that exposes set_value(int) / get_value()->int
     regardless of whether the underlying library is gpiod v1 or v2."""
 
-    def __init__(self, v2_request=None, v2_offset=None, v1_line=None):
+    def __init__(self, v2_request=None, v2_offset=None, v1_line=None, bank=None, bank_offset=None):
         self._v2_req = v2_request
         self._v2_off = v2_offset
         self._v1 = v1_line
+        self.bank = bank
+        self.bank_offset = bank_offset
 
     def set_value(self, val):
-        if self._v2_req is not None:
+        if self.bank is not None:
+            self.bank.set_values({self.bank_offset: val})
+        elif self._v2_req is not None:
             self._v2_req.set_value(
                 self._v2_off, Value.ACTIVE if val else Value.INACTIVE
             )
@@ -128,7 +150,39 @@ class _LineHandle:
             return 1 if self._v2_req.get_value(self._v2_off) == Value.ACTIVE else 0
         return self._v1.get_value()
 
+    def wait_edge_events(self, timeout):
+        """Wait up to ``timeout`` seconds for edge events on a line requested
+        with edge detection. Returns [(rising, timestamp_ns), ...] on the
+        time.monotonic_ns() clock."""
+        if self._v2_req is not None:
+            if not self._v2_req.wait_edge_events(timeout):
+                return []
+            return [
+                (event.event_type == gpiod.EdgeEvent.Type.RISING_EDGE, event.timestamp_ns)
+                for event in self._v2_req.read_edge_events()
+            ]
+        sec = int(timeout)
+        if not self._v1.event_wait(sec=sec, nsec=int((timeout - sec) * 1_000_000_000)):
+            return []
+        try:
+            events = self._v1.event_read_multiple()
+        except AttributeError:
+            events = [self._v1.event_read()]
+        # Kernels before 5.7 stamp v1 events with CLOCK_REALTIME; move those
+        # onto the monotonic clock the settle path and callers use.
+        mono_ns = time.monotonic_ns()
+        offset_ns = time.time_ns() - mono_ns
+        stamped = []
+        for event in events:
+            timestamp_ns = event.sec * 1_000_000_000 + event.nsec
+            if abs(timestamp_ns - offset_ns - mono_ns) < abs(timestamp_ns - mono_ns):
+                timestamp_ns -= offset_ns
+            stamped.append((event.type == gpiod.LineEvent.RISING_EDGE, timestamp_ns))
+        return stamped
+
     def release(self):
+        if self.bank is not None:
+            return  # released together with its bank
         try:
             if self._v2_req is not None:
                 self._v2_req.release()
@@ -138,41 +192,100 @@ class _LineHandle:
             pass
 
 
-def _request_output(chip, line_offset, consumer='whisplay'):
-    """Request a single GPIO line as output (LOW initial)."""
+class _LineBank:
+    """Several output lines of one chip requested together, so that lines
+    changing at the same instant can be driven with one set_values call."""
+
+    def __init__(self, offsets, v2_request=None, v1_bulk=None):
+        self.offsets = list(offsets)
+        self._v2_req = v2_request
+        self._v1_bulk = v1_bulk
+        self._values = {offset: 0 for offset in self.offsets}
+        # The PWM thread and direct line writes share the bank; a v1 write
+        # of a stale vector would revert another thread's line.
+        self._lock = threading.Lock()
+
+    def set_values(self, values):
+        """Set {offset: 0/1} for any subset of the bank's lines."""
+        with self._lock:
+            if self._v2_req is not None:
+                self._v2_req.set_values({
+                    offset: Value.ACTIVE if val else Value.INACTIVE
+                    for offset, val in values.items()
+                })
+                self._values.update(values)
+            else:
+                # v1 bulk requests always write every line of the bulk.
+                self._values.update(values)
+                self._v1_bulk.set_values([1 if self._values[o] else 0 for o in self.offsets])
+
+    def release(self):
+        try:
+            if self._v2_req is not None:
+                self._v2_req.release()
+            else:
+                self._v1_bulk.release()
+        except Exception:
+            pass
+
+
+def _request_output(chip, line_offset, consumer='whisplay', value=0):
+    """Request a single GPIO line as output (LOW initial unless ``value``)."""
     if _GPIOD_V2:
         settings = gpiod.LineSettings(
-            direction=Direction.OUTPUT, output_value=Value.INACTIVE
+            direction=Direction.OUTPUT,
+            output_value=Value.ACTIVE if value else Value.INACTIVE,
         )
         req = chip.request_lines(consumer=consumer, config={line_offset: settings})
         return _LineHandle(v2_request=req, v2_offset=line_offset)
     else:
         line = chip.get_line(line_offset)
-        line.request(consumer=consumer, type=gpiod.LINE_REQ_DIR_OUT, default_val=0)
+        line.request(consumer=consumer, type=gpiod.LINE_REQ_DIR_OUT, default_val=1 if value else 0)
         return _LineHandle(v1_line=line)
 
 
-def _request_input(chip, line_offset, consumer='whisplay-btn'):
-    """Request a single GPIO line as input with bias disabled."""
+def _request_outputs(chip, line_offsets, consumer='whisplay'):
+    """Request several GPIO lines of one chip as outputs (LOW initial).
+    Returns (bank, {offset: _LineHandle})."""
+    offsets = list(line_offsets)
+    if _GPIOD_V2:
+        settings = gpiod.LineSettings(
+            direction=Direction.OUTPUT, output_value=Value.INACTIVE
+        )
+        req = chip.request_lines(consumer=consumer, config={tuple(offsets): settings})
+        bank = _LineBank(offsets, v2_request=req)
+    else:
+        bulk = chip.get_lines(offsets)
+        bulk.request(consumer=consumer, type=gpiod.LINE_REQ_DIR_OUT, default_vals=[0] * len(offsets))
+        bank = _LineBank(offsets, v1_bulk=bulk)
+    handles = {offset: _LineHandle(bank=bank, bank_offset=offset) for offset in offsets}
+    return bank, handles
+
+
+def _request_input(chip, line_offset, consumer='whisplay-btn', edge_events=False):
+    """Request a single GPIO line as input with bias disabled, optionally
+    with both-edge event detection."""
     if _GPIOD_V2:
+        edge = {"edge_detection": Edge.BOTH} if edge_events else {}
         try:
             settings = gpiod.LineSettings(
-                direction=Direction.INPUT, bias=Bias.DISABLED
+                direction=Direction.INPUT, bias=Bias.DISABLED, **edge
             )
         except Exception:
-            settings = gpiod.LineSettings(direction=Direction.INPUT)
+            settings = gpiod.LineSettings(direction=Direction.INPUT, **edge)
         req = chip.request_lines(consumer=consumer, config={line_offset: settings})
         return _LineHandle(v2_request=req, v2_offset=line_offset)
     else:
         line = chip.get_line(line_offset)
+        req_type = gpiod.LINE_REQ_EV_BOTH_EDGES if edge_events else gpiod.LINE_REQ_DIR_IN
         try:
             line.request(
                 consumer=consumer,
-                type=gpiod.LINE_REQ_DIR_IN,
+                type=req_type,
                 flags=gpiod.LINE_REQ_FLAG_BIAS_DISABLE
             )
         except Exception:
-            line.request(consumer=consumer, type=gpiod.LINE_REQ_DIR_IN)
+            line.request(consumer=consumer, type=req_type)
         return _LineHandle(v1_line=line)
 
 
@@ -225,13 +338,674 @@ class SoftPWM:
                 time.sleep(off_time)
 
 
+class PWMChannel:
+    """One output driven by a PWMScheduler; same API as SoftPWM."""
+
+    def __init__(self, scheduler, line, frequency=100, stop_value=0):
+        self._scheduler = scheduler
+        self._line = line
+        self._bank = getattr(line, "bank", None)
+        self._bank_offset = getattr(line, "bank_offset", None)
+        self.frequency = frequency
+        self.stop_value = stop_value
+        self.duty_cycle = 0.0
+        self._active = False
+        self._dirty = False
+        self._level = None
+        self._cycle_start = 0.0
+        self._next_edge = None
+
+    def start(self, duty_cycle=0):
+        with self._scheduler._cond:
+            self.duty_cycle = max(0.0, min(100.0, float(duty_cycle)))
+            self._active = True
+            self._scheduler._mark_dirty(self)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        duty_cycle = max(0.0, min(100.0, float(duty_cycle)))
+        with self._scheduler._cond:
+            if duty_cycle == self.duty_cycle:
+                return
+            self.duty_cycle = duty_cycle
+            if self._active:
+                self._scheduler._mark_dirty(self)
+
+    def stop(self):
+        with self._scheduler._cond:
+            self._active = False
+            self._dirty = False
+            self._next_edge = None
+            try:
+                self._line.set_value(self.stop_value)
+                self._level = self.stop_value
+            except Exception:
+                pass
+
+
+class PWMScheduler:
+    """Single-thread software PWM for several channels.
+
+    Channel edges are kept on one timeline; rising edges of channels that
+    share a frequency are aligned to a common grid, and all edges falling
+    within EDGE_COALESCE_SEC of each other are written together (one
+    set_values call per line bank). When every channel sits at a static 0%
+    or 100% duty the thread sleeps until a duty cycle changes.
+    """
+
+    EDGE_COALESCE_SEC = 0.0002
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._channels: list[PWMChannel] = []
+        self._running = False
+        self._thread = None
+        self._epoch = time.monotonic()
+        self.wakeups = 0
+
+    def add_channel(self, line, frequency=100, stop_value=0) -> PWMChannel:
+        channel = PWMChannel(self, line, frequency, stop_value)
+        with self._cond:
+            self._channels.append(channel)
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return channel
+
+    def remove_channel(self, channel: PWMChannel):
+        channel.stop()
+        with self._cond:
+            if channel in self._channels:
+                self._channels.remove(channel)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _mark_dirty(self, channel: PWMChannel):
+        channel._dirty = True
+        self._cond.notify_all()
+
+    def _next_grid(self, period, now):
+        """First multiple of ``period`` (since the epoch) at or after ``now``."""
+        cycles = -(-(now - self._epoch) // period)
+        return self._epoch + cycles * period
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                self.wakeups += 1
+                now = time.monotonic()
+                writes = []
+                for channel in self._channels:
+                    if not channel._active:
+                        continue
+                    duty = channel.duty_cycle
+                    period = 1.0 / channel.frequency
+                    if channel._dirty:
+                        channel._dirty = False
+                        if duty <= 0 or duty >= 100:
+                            channel._next_edge = None
+                            writes.append((channel, 1 if duty >= 100 else 0))
+                            continue
+                        if channel._next_edge is None:
+                            channel._next_edge = self._next_grid(period, now)
+                            writes.append((channel, 0))
+                            continue
+                    edge = channel._next_edge
+                    if edge is None or edge > now + self.EDGE_COALESCE_SEC:
+                        continue
+                    if channel._level == 1:
+                        channel._next_edge = channel._cycle_start + period
+                        writes.append((channel, 0))
+                    else:
+                        # Resynchronize to the grid if we fell a cycle behind.
+                        start = edge if now - edge < period else self._next_grid(period, now) - period
+                        channel._cycle_start = start
+                        channel._next_edge = start + period * duty / 100.0
+                        writes.append((channel, 1))
+                if writes:
+                    self._apply(writes)
+                next_edge = None
+                for channel in self._channels:
+                    edge = channel._next_edge
+                    if channel._active and edge is not None and (next_edge is None or edge < next_edge):
+                        next_edge = edge
+                if next_edge is None:
+                    # Every channel is static: sleep until a duty cycle changes.
+                    self._cond.wait()
+                    continue
+            # Duty changes on running channels are picked up at the next edge,
+            # so a plain sleep (cheaper than a timed Condition.wait) is enough.
+            timeout = next_edge - time.monotonic()
+            if timeout > 0:
+                time.sleep(timeout)
+
+    def _apply(self, writes):
+        banks = {}
+        for channel, level in writes:
+            if channel._level == level:
+                continue
+            channel._level = level
+            if channel._bank is not None:
+                banks.setdefault(channel._bank, {})[channel._bank_offset] = level
+            else:
+                try:
+                    channel._line.set_value(level)
+                except Exception:
+                    pass
+        for bank, values in banks.items():
+            try:
+                bank.set_values(values)
+            except Exception:
+                pass
+
+
+# ==================== LED Effects ====================
+class LEDEffect:
+    """Declarative RGB LED animation.
+
+    An effect is a list of ``((r, g, b), duration_ms, fade)`` steps played
+    ``repeat`` times (``None`` loops until cancelled). A fading step
+    interpolates from the previous color to its target; a holding step
+    jumps to its target and stays there for its duration.
+    """
+
+    def __init__(self, steps, repeat=1):
+        self.steps = [
+            (tuple(max(0, min(255, int(v))) for v in color), max(0, int(duration_ms)), bool(fade))
+            for color, duration_ms, fade in steps
+        ]
+        self.repeat = None if repeat is None else max(1, int(repeat))
+        self.cycle_ms = sum(duration_ms for _, duration_ms, _ in self.steps)
+
+    @classmethod
+    def fade(cls, color, duration_ms=100):
+        return cls([(color, duration_ms, True)])
+
+    @classmethod
+    def breathe(cls, color, period_ms=2000, repeat=None, low_color=(0, 0, 0)):
+        half = max(1, int(period_ms) // 2)
+        return cls([(color, half, True), (low_color, half, True)], repeat)
+
+    @classmethod
+    def blink(cls, color, on_ms=200, off_ms=200, repeat=None, off_color=(0, 0, 0)):
+        return cls([(color, on_ms, False), (off_color, off_ms, False)], repeat)
+
+    @classmethod
+    def sequence(cls, steps, repeat=1):
+        """``steps`` are ``(r, g, b, duration_ms[, fade])`` tuples."""
+        return cls(
+            [((r, g, b), duration_ms, bool(rest[0]) if rest else False) for r, g, b, duration_ms, *rest in steps],
+            repeat,
+        )
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> LEDEffect:
+        """Build an effect from a JSON-friendly dict, e.g.
+        ``{"kind": "blink", "color": [0, 255, 0], "on_ms": 200}``."""
+        kind = str(spec.get("kind", "")).strip()
+        color = tuple(spec.get("color") or (255, 255, 255))
+        repeat = spec.get("repeat")
+        if kind == "fade":
+            return cls.fade(color, spec.get("duration_ms", 100))
+        if kind == "breathe":
+            return cls.breathe(color, spec.get("period_ms", 2000), repeat, tuple(spec.get("low_color") or (0, 0, 0)))
+        if kind == "blink":
+            return cls.blink(
+                color,
+                spec.get("on_ms", 200),
+                spec.get("off_ms", 200),
+                repeat,
+                tuple(spec.get("off_color") or (0, 0, 0)),
+            )
+        if kind == "sequence":
+            return cls.sequence(spec.get("steps") or [], spec.get("repeat", 1))
+        raise ValueError(f"Unknown LED effect: {kind}")
+
+    def to_spec(self) -> dict:
+        return {
+            "kind": "sequence",
+            "steps": [[*color, duration_ms, fade] for color, duration_ms, fade in self.steps],
+            "repeat": self.repeat,
+        }
+
+    def sample(self, elapsed_ms, start_color):
+        """Return ``(color, hold_ms, done)`` at ``elapsed_ms`` into the effect.
+
+        ``hold_ms`` is how long the color stays valid: the time left in a
+        holding step, or 0 inside a fade.
+        """
+        if not self.steps or self.cycle_ms == 0:
+            return (self.steps[-1][0] if self.steps else start_color), 0, True
+        cycle, offset = divmod(elapsed_ms, self.cycle_ms)
+        if self.repeat is not None and cycle >= self.repeat:
+            return self.steps[-1][0], 0, True
+        previous = start_color if cycle == 0 else self.steps[-1][0]
+        for color, duration_ms, fade in self.steps:
+            if offset < duration_ms:
+                if not fade:
+                    return color, duration_ms - offset, False
+                t = offset / duration_ms
+                mixed = tuple(int(a + (b - a) * t) for a, b in zip(previous, color))
+                return mixed, 0, False
+            offset -= duration_ms
+            previous = color
+        return previous, 0, False
+
+
+class LEDAnimator:
+    """Plays LEDEffects on one timer thread.
+
+    Starting an effect preempts the running one; the thread only wakes at
+    FRAME_SEC intervals during fades and sleeps through holds and idle time.
+    """
+
+    FRAME_SEC = 0.02
+
+    def __init__(self, apply_color, current_color=(0, 0, 0)):
+        self._apply_color = apply_color
+        self._cond = threading.Condition()
+        self._effect = None
+        self._start_color = tuple(current_color)
+        self._started_at = 0.0
+        self._generation = 0
+        self._running = False
+        self._thread = None
+
+    def play(self, effect: LEDEffect, start_color) -> int:
+        """Start ``effect`` from ``start_color``; returns its generation."""
+        with self._cond:
+            self._generation += 1
+            self._effect = effect
+            self._start_color = tuple(start_color)
+            self._started_at = time.monotonic()
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return self._generation
+
+    def cancel(self):
+        """Stop the running effect; the LED keeps its current color."""
+        with self._cond:
+            if self._effect is not None:
+                self._effect = None
+                self._generation += 1
+                self._cond.notify_all()
+
+    @property
+    def active(self) -> bool:
+        with self._cond:
+            return self._effect is not None
+
+    def wait(self, generation=None, timeout=None) -> bool:
+        """Block until the effect ``generation`` (default: current) ends."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if generation is None:
+                generation = self._generation
+            while self._effect is not None and self._generation == generation:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._effect = None
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                effect = self._effect
+                if effect is None:
+                    self._cond.wait()
+                    continue
+                elapsed_ms = (time.monotonic() - self._started_at) * 1000.0
+                color, hold_ms, done = effect.sample(elapsed_ms, self._start_color)
+                try:
+                    self._apply_color(*color)
+                except Exception as e:
+                    print(f"LED effect failed: {e}")
+                    done = True
+                if done:
+                    self._effect = None
+                    self._cond.notify_all()
+                    continue
+                self._cond.wait(max(self.FRAME_SEC, hold_ms / 1000.0))
+
+
+# ==================== Pixel Formats ====================
+def _pack_rgb444(pixels) -> bytes:
+    """Pack big-endian RGB565 pixels as RGB444, two pixels per three bytes.
+
+    ``pixels`` is an RGB565 byte buffer or a '>u2' array of any shape. An
+    odd trailing pixel is sent as two bytes with the low nibble unused.
+    """
+    if isinstance(pixels, np.ndarray):
+        values = pixels.reshape(-1).astype(np.uint16)
+    else:
+        values = np.frombuffer(pixels, dtype=">u2").astype(np.uint16)
+    count = values.size
+    if count % 2:
+        values = np.append(values, np.uint16(0))
+    rgb = ((values >> 4) & 0xF00) | ((values >> 3) & 0x0F0) | ((values >> 1) & 0x00F)
+    first = rgb[0::2]
+    second = rgb[1::2]
+    packed = np.empty((first.size, 3), dtype=np.uint8)
+    packed[:, 0] = first >> 4
+    packed[:, 1] = ((first & 0xF) << 4) | (second >> 8)
+    packed[:, 2] = second & 0xFF
+    if count % 2:
+        return packed.tobytes()[:-1]
+    return packed.tobytes()
+
+
+def _rgb_array(source):
+    """(height, width, 3 or 4) uint8 view of a PIL image or array."""
+    if isinstance(source, np.ndarray):
+        return source
+    if source.mode not in ("RGB", "RGBA", "RGBX"):
+        source = source.convert("RGB")
+    return np.asarray(source)
+
+
+def rgb888_to_rgb565(source, out=None, scratch=None):
+    """Convert RGB888 pixels to big-endian RGB565 in one vectorized pass.
+
+    ``source`` is a PIL image or a (height, width, 3|4) uint8 array; the
+    result is written into ``out``, a (height, width) '>u2' array such as a
+    Canvas region, or a new array when None. ``scratch`` is an optional
+    (2, height, width) uint16 work area to reuse between calls.
+    """
+    rgb = _rgb_array(source)
+    height, width = rgb.shape[:2]
+    if out is None:
+        out = np.empty((height, width), dtype=">u2")
+    if scratch is None:
+        scratch = np.empty((2, height, width), dtype=np.uint16)
+    high, low = scratch[0], scratch[1]
+    np.left_shift(rgb[..., 0], 8, out=high, dtype=np.uint16)
+    np.bitwise_and(high, 0xF800, out=high)
+    np.left_shift(rgb[..., 1], 3, out=low, dtype=np.uint16)
+    np.bitwise_and(low, 0x07E0, out=low)
+    np.bitwise_or(high, low, out=high)
+    np.right_shift(rgb[..., 2], 3, out=low, dtype=np.uint16)
+    # The last step stores straight into the (byte-swapped) target.
+    np.bitwise_or(high, low, out=out)
+    return out
+
+
+# ==================== Shadow Framebuffer ====================
+class ShadowFramebuffer:
+    """Retained-mode RGB565 framebuffer kept next to the panel.
+
+    Drawing happens on a big-endian uint16 NumPy array at memory speed;
+    flush() uploads only the bounding box damaged since the last flush.
+    Colors are RGB565 integers, as with WhisplayBoard.draw_pixel.
+    """
+
+    def __init__(self, board):
+        if np is None:
+            raise RuntimeError(
+                "NumPy is required for the shadow framebuffer: "
+                "sudo apt install python3-numpy"
+            )
+        self.board = board
+        self.width = board.LCD_WIDTH
+        self.height = board.LCD_HEIGHT
+        self.pixels = np.zeros((self.height, self.width), dtype=">u2")
+        if board.previous_frame is not None:
+            self.pixels.reshape(-1).view(np.uint8)[:] = np.frombuffer(
+                board.previous_frame, dtype=np.uint8
+            )
+        self._damage = None
+
+    def _mark(self, x0, y0, x1, y1):
+        """Grow the damage box by an inclusive rectangle (already clipped)."""
+        if self._damage is None:
+            self._damage = [x0, y0, x1, y1]
+            return
+        damage = self._damage
+        damage[0] = min(damage[0], x0)
+        damage[1] = min(damage[1], y0)
+        damage[2] = max(damage[2], x1)
+        damage[3] = max(damage[3], y1)
+
+    def _clip(self, x0, y0, x1, y1):
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1 = min(self.width - 1, int(x1))
+        y1 = min(self.height - 1, int(y1))
+        if x1 < x0 or y1 < y0:
+            return None
+        return x0, y0, x1, y1
+
+    def fill(self, color=0):
+        self.pixels[:, :] = color
+        self._mark(0, 0, self.width - 1, self.height - 1)
+
+    def pixel(self, x, y, color):
+        """Set one pixel, or many when x/y (and optionally color) are arrays."""
+        xs = np.asarray(x, dtype=np.intp).ravel()
+        ys = np.asarray(y, dtype=np.intp).ravel()
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if not inside.any():
+            return
+        colors = np.asarray(color)
+        if colors.ndim:
+            colors = colors.ravel()[inside]
+        xs, ys = xs[inside], ys[inside]
+        self.pixels[ys, xs] = colors
+        self._mark(int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+
+    def line(self, x0, y0, x1, y1, color):
+        count = max(abs(x1 - x0), abs(y1 - y0)) + 1
+        xs = np.rint(np.linspace(x0, x1, count)).astype(np.intp)
+        ys = np.rint(np.linspace(y0, y1, count)).astype(np.intp)
+        self.pixel(xs, ys, color)
+
+    def rect(self, x, y, width, height, color, fill=True):
+        clipped = self._clip(x, y, x + width - 1, y + height - 1)
+        if clipped is None:
+            return
+        if fill:
+            x0, y0, x1, y1 = clipped
+            self.pixels[y0:y1 + 1, x0:x1 + 1] = color
+            self._mark(*clipped)
+            return
+        right, bottom = x + width - 1, y + height - 1
+        self.line(x, y, right, y, color)
+        self.line(x, bottom, right, bottom, color)
+        self.line(x, y, x, bottom, color)
+        self.line(right, y, right, bottom, color)
+
+    def circle(self, cx, cy, radius, color, fill=True):
+        clipped = self._clip(cx - radius, cy - radius, cx + radius, cy + radius)
+        if clipped is None:
+            return
+        x0, y0, x1, y1 = clipped
+        yy, xx = np.ogrid[y0:y1 + 1, x0:x1 + 1]
+        dist2 = (xx - cx) ** 2 + (yy - cy) ** 2
+        mask = dist2 <= radius * radius + radius
+        if not fill and radius > 0:
+            inner = radius - 1
+            mask &= dist2 > inner * inner + inner
+        self.pixels[y0:y1 + 1, x0:x1 + 1][mask] = color
+        self._mark(*clipped)
+
+    def blit(self, x, y, data, width=None, height=None):
+        """Copy a block of pixels into the buffer.
+
+        ``data`` is either a 2-D uint16 array of RGB565 values or big-endian
+        RGB565 bytes (bytes/bytearray/memoryview) of ``width`` x ``height``.
+        """
+        if isinstance(data, np.ndarray) and data.ndim == 2:
+            block = data
+        else:
+            if width is None or height is None:
+                raise ValueError("width and height are required for raw pixel data")
+            block = np.frombuffer(data, dtype=">u2").reshape(height, width)
+        rows, cols = block.shape
+        clipped = self._clip(x, y, x + cols - 1, y + rows - 1)
+        if clipped is None:
+            return
+        x0, y0, x1, y1 = clipped
+        self.pixels[y0:y1 + 1, x0:x1 + 1] = block[y0 - y:y1 - y + 1, x0 - x:x1 - x + 1]
+        self._mark(*clipped)
+
+    def flush(self):
+        """Upload the damaged bounding box to the panel."""
+        if self._damage is None:
+            return
+        x0, y0, x1, y1 = self._damage
+        self._damage = None
+        self.board.update_regions(self.pixels, [(x0, y0, x1 - x0 + 1, y1 - y0 + 1)])
+
+    # ----- Canvas surface -----
+    def array(self):
+        return self.pixels
+
+    def begin_write(self):
+        pass
+
+    def end_write(self):
+        pass
+
+    def add_damage(self, x, y, width, height):
+        clipped = self._clip(x, y, x + width - 1, y + height - 1)
+        if clipped is not None:
+            self._mark(*clipped)
+
+
+# ==================== Canvas ====================
+class Canvas:
+    """NumPy drawing surface over the buffer the panel is fed from.
+
+    ``pixels`` is a writable (height, width) big-endian uint16 view of the
+    ShadowFramebuffer on a WhisplayBoard, or of the shared framebuffer
+    mapping under WhisplayDaemonProxy, so drawing into it is the whole
+    upload path and ``present()`` publishes the result. ``draw()``
+    converts PIL images or RGB888 arrays in place and records damage;
+    after writing ``pixels`` yourself, call ``mark()`` for the area
+    touched, or nothing to present the whole frame.
+
+    Use ``with canvas as pixels:`` around direct writes so the daemon
+    never reads a half-drawn frame. A daemon view moves when a swap chain
+    flips and dies with focus, so fetch ``pixels`` per frame and do not
+    keep it past ``present()``.
+    """
+
+    def __init__(self, surface, present):
+        if np is None:
+            raise RuntimeError(
+                "NumPy is required for the canvas: "
+                "sudo apt install python3-numpy"
+            )
+        self._surface = surface
+        self._present = present
+        self._scratch = None
+        self._marked = False
+
+    @property
+    def pixels(self):
+        pixels = self._surface.array()
+        if pixels is None:
+            raise RuntimeError("no framebuffer attached")
+        return pixels
+
+    @property
+    def width(self) -> int:
+        return self._surface.width
+
+    @property
+    def height(self) -> int:
+        return self._surface.height
+
+    def __enter__(self):
+        self._surface.begin_write()
+        return self.pixels
+
+    def __exit__(self, *exc_info):
+        self._surface.end_write()
+
+    def mark(self, x=0, y=0, width=None, height=None):
+        """Record that a rectangle (default: everything) changed."""
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+        self._surface.add_damage(x, y, width, height)
+        self._marked = True
+
+    def fill(self, color):
+        with self as pixels:
+            pixels[:, :] = color
+        self.mark()
+
+    def draw(self, source, x=0, y=0):
+        """Draw a PIL image, a (h, w, 3|4) uint8 RGB array or a (h, w)
+        RGB565 array with its top-left corner at (x, y), clipped to the
+        canvas."""
+        if not isinstance(source, np.ndarray):
+            source = _rgb_array(source)
+        rows, cols = source.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width, x + cols), min(self.height, y + rows)
+        if x1 <= x0 or y1 <= y0:
+            return
+        block = source[y0 - y:y1 - y, x0 - x:x1 - x]
+        with self as pixels:
+            target = pixels[y0:y1, x0:x1]
+            if block.ndim == 2:
+                target[...] = block
+            else:
+                if self._scratch is None:
+                    self._scratch = np.empty((2, self.height, self.width), dtype=np.uint16)
+                scratch = self._scratch[:, :y1 - y0, :x1 - x0]
+                rgb888_to_rgb565(block, target, scratch)
+        self.mark(x0, y0, x1 - x0, y1 - y0)
+
+    def present(self):
+        """Publish the frame; returns what the backend's present returns
+        (a coroutine under AsyncWhisplayDaemonProxy)."""
+        if not self._marked:
+            self._surface.add_damage(0, 0, self.width, self.height)
+        self._marked = False
+        return self._present()
+
+
 class WhisplayBoard:
     # LCD parameters
     LCD_WIDTH = 240
     LCD_HEIGHT = 280
     BUTTON_POLL_INTERVAL_SEC = 0.005
+    BUTTON_DEBOUNCE_SEC = 0.01
+    BUTTON_EVENT_IDLE_TIMEOUT_SEC = 1.0
     CornerHeight = 20  # Rounded corner height in pixels
 
+    # Partial update cost model, expressed in equivalent SPI payload bytes.
+    # A window setup costs three commands plus GPIO toggles; every separate
+    # data write costs one spidev syscall.
+    WINDOW_COST_BYTES = 512
+    ROW_WRITE_COST_BYTES = 64
+    MAX_DIRTY_RECTS = 8
+
+    # ST7789 frame memory is 240x320; the 280-row panel starts 20 rows in.
+    GRAM_ROWS = 320
+    PANEL_ROW_OFFSET = 20
+
     # Physical pin definitions (BOARD mode - shared by both platforms)
     DC_PIN = 13
     RST_PIN = 7
@@ -245,14 +1019,22 @@ class WhisplayBoard:
     # Button pin
     BUTTON_PIN = 11
 
-    def __init__(self):
+    def __init__(self, async_flush: bool = False, warm_attach: bool = True):
         self.platform = PLATFORM
         self.backlight_pwm = None
+        self.backlight_level = None
+        self.sleeping = False
+        # LED color to restore on wake; any LED call made while asleep
+        # supersedes it.
+        self._sleep_rgb = None
         self._current_r = 0
         self._current_g = 0
         self._current_b = 0
+        self._led = LEDAnimator(self._apply_rgb)
         self.button_press_callback = None
         self.button_release_callback = None
+        # Callbacks registered with_timestamp=True, by button level.
+        self._button_timestamped = {0: False, 1: False}
 
         # Select pin map and SPI config based on platform
         if self.platform == "rpi":
@@ -282,13 +1064,62 @@ class WhisplayBoard:
         self._init_spi()
 
         self.previous_frame = None
+        self._framebuffer = None
+        self._canvas = None
+        self._command_queue: list[tuple[int | None, bytes]] = []
+        self._dc_level = None
+        self._invalidate_window()
+        self._spi_lock = threading.RLock()
+        self._flush_cond = threading.Condition()
+        self._flush_thread = None
+        self._flush_running = False
+        self._back_buffer = None
+        self._front_buffer = None
+        self._back_pending = False
+        self._back_damage = None
+        # Spans where the idle back buffer differs from the front buffer,
+        # None when unknown.
+        self._back_stale = None
+        self._flush_busy = False
+        self.frames_submitted = 0
+        self.frames_flushed = 0
+        self.frames_dropped = 0
+        # Smoothed wall time of one SPI frame push; 0.0 until measured.
+        self.push_time = 0.0
+        self._scroll_top = 0
+        self._scroll_height = self.LCD_HEIGHT
+        self._scroll_offset = 0
+        self.color_bits = 16
         # Detect hardware version and set backlight mode
         self._detect_hardware_version()
-        self._detect_wm8960()
-        self.set_backlight(0)
-        self._reset_lcd()
-        self._init_display()
-        self.fill_screen(0)
+        panel_config = self._panel_config()
+        self._madctl = panel_config["madctl"]
+        panel_state = self._load_panel_state() if warm_attach else None
+        self.warm_attached = (
+            panel_state is not None and panel_state.get("config") == panel_config
+        )
+        if self.warm_attached:
+            # Panel is already configured: keep the last frame on screen.
+            self.sound_card_detected = bool(panel_state.get("sound_card"))
+            # A previous process may have left the panel scrolled, in
+            # 12-bit mode or asleep.
+            self.reset_scroll()
+            self._send_command(0x3A, panel_config["colmod"])
+            if panel_state.get("sleeping"):
+                self._send_command(0x11)
+                time.sleep(0.12)
+                self._send_command(0x29)
+                self._save_panel_state(sleeping=False)
+            print("Warm attach: panel already initialized, skipping reset.")
+        else:
+            self.sound_card_detected = self._detect_wm8960()
+            self.set_backlight(0)
+            self._reset_lcd()
+            self._init_display(panel_config)
+            self.fill_screen(0)
+            self._save_panel_state(panel_config, sleeping=False)
+        if async_flush:
+            self.set_async_flush(True)
 
     # ==================== GPIO Initialization (gpiod, unified) ====================
     def _init_gpio(self):
@@ -307,36 +1138,52 @@ class WhisplayBoard:
             if chip_num not in self._gpio_chips:
                 self._gpio_chips[chip_num] = gpiod.Chip(f'/dev/gpiochip{chip_num}')
 
-        # Request output pins
-        output_pins = [self.DC_PIN, self.RST_PIN, self.LED_PIN,
-                       self.RED_PIN, self.GREEN_PIN, self.BLUE_PIN]
-        for pin in output_pins:
+        # Request output pins. The PWM-driven lines (backlight + RGB) are
+        # requested per chip as one bank so coinciding edges share a write.
+        # RST is requested HIGH so that attaching does not reset the panel.
+        for pin, value in ((self.DC_PIN, 0), (self.RST_PIN, 1)):
             chip_num, line_offset = self._pin_map[pin]
             chip = self._gpio_chips[chip_num]
-            self._gpio_lines[pin] = _request_output(chip, line_offset)
+            self._gpio_lines[pin] = _request_output(chip, line_offset, value=value)
+        self._gpio_banks = []
+        pwm_pins_by_chip = {}
+        for pin in (self.LED_PIN, self.RED_PIN, self.GREEN_PIN, self.BLUE_PIN):
+            chip_num, line_offset = self._pin_map[pin]
+            pwm_pins_by_chip.setdefault(chip_num, []).append((pin, line_offset))
+        for chip_num, entries in pwm_pins_by_chip.items():
+            bank, handles = _request_outputs(
+                self._gpio_chips[chip_num], [offset for _, offset in entries]
+            )
+            self._gpio_banks.append(bank)
+            for pin, line_offset in entries:
+                self._gpio_lines[pin] = handles[line_offset]
 
         # Enable backlight (LOW = on)
         self._gpio_lines[self.LED_PIN].set_value(0)
 
-        # Initialize RGB LED (using software PWM)
-        red_line = self._gpio_lines[self.RED_PIN]
-        green_line = self._gpio_lines[self.GREEN_PIN]
-        blue_line = self._gpio_lines[self.BLUE_PIN]
-        self.red_pwm = SoftPWM(red_line.set_value, 100, stop_value=1)
-        self.green_pwm = SoftPWM(green_line.set_value, 100, stop_value=1)
-        self.blue_pwm = SoftPWM(blue_line.set_value, 100, stop_value=1)
+        # Initialize RGB LED (software PWM, all channels on one scheduler thread)
+        self._pwm = PWMScheduler()
+        self.red_pwm = self._pwm.add_channel(self._gpio_lines[self.RED_PIN], 100, stop_value=1)
+        self.green_pwm = self._pwm.add_channel(self._gpio_lines[self.GREEN_PIN], 100, stop_value=1)
+        self.blue_pwm = self._pwm.add_channel(self._gpio_lines[self.BLUE_PIN], 100, stop_value=1)
         self.red_pwm.start(0)
         self.green_pwm.start(0)
         self.blue_pwm.start(0)
 
-        # Initialize button (input, polled for state changes)
+        # Initialize button (input with edge events, polling as a fallback)
         # The WhisPlay HAT has an external pull-down resistor on the button line.
         # Button pressed = HIGH, released = LOW.  No internal pull needed.
         chip_num, line_offset = self._pin_map[self.BUTTON_PIN]
         chip = self._gpio_chips[chip_num]
-        self._gpio_lines[self.BUTTON_PIN] = _request_input(chip, line_offset)
+        try:
+            self._gpio_lines[self.BUTTON_PIN] = _request_input(chip, line_offset, edge_events=True)
+            self._button_edge_events = True
+        except Exception as e:
+            print(f"Button edge events unavailable, polling instead: {e}")
+            self._gpio_lines[self.BUTTON_PIN] = _request_input(chip, line_offset)
+            self._button_edge_events = False
 
-        # Start button event listener thread (polling)
+        # Start button event listener thread
         self._btn_thread_running = True
         self._btn_thread = threading.Thread(target=self._button_monitor, daemon=True)
         self._btn_thread.start()
@@ -349,11 +1196,55 @@ class WhisplayBoard:
         self.spi.mode = 0b00
 
     def _button_monitor(self):
-        """Button state polling thread.
+        """Button listener thread.
         HIGH (1) = pressed, LOW (0) = released.
-        Poll interval is configurable; shorter values improve responsiveness.
+        Blocks on kernel edge events when available, otherwise polls.
         """
         btn_line = self._gpio_lines[self.BUTTON_PIN]
+        if self._button_edge_events:
+            try:
+                self._button_event_loop(btn_line)
+                return
+            except Exception as e:
+                if not self._btn_thread_running:
+                    return
+                print(f"Button edge events failed, polling instead: {e}")
+        self._button_poll_loop(btn_line)
+
+    def _button_event_loop(self, btn_line):
+        """Debounced edge-event loop.
+
+        An edge is accepted when it changes the logical state and arrives at
+        least BUTTON_DEBOUNCE_SEC after the previously accepted one. Once the
+        bounces settle the line level is re-read, so a real transition hidden
+        inside the debounce window is still reported.
+        """
+        debounce_ns = int(self.BUTTON_DEBOUNCE_SEC * 1_000_000_000)
+        state = btn_line.get_value()
+        last_change_ns = 0
+        settle_pending = False
+        while self._btn_thread_running:
+            timeout = self.BUTTON_DEBOUNCE_SEC if settle_pending else self.BUTTON_EVENT_IDLE_TIMEOUT_SEC
+            events = btn_line.wait_edge_events(timeout)
+            if not events:
+                if settle_pending:
+                    settle_pending = False
+                    level = btn_line.get_value()
+                    if level != state:
+                        state = level
+                        last_change_ns = time.monotonic_ns()
+                        self._emit_button(level, last_change_ns)
+                continue
+            for rising, timestamp_ns in events:
+                level = 1 if rising else 0
+                settle_pending = True
+                if level == state or timestamp_ns - last_change_ns < debounce_ns:
+                    continue
+                state = level
+                last_change_ns = timestamp_ns
+                self._emit_button(level, timestamp_ns)
+
+    def _button_poll_loop(self, btn_line):
         last_state = btn_line.get_value()
         poll_interval = self.BUTTON_POLL_INTERVAL_SEC
         while self._btn_thread_running:
@@ -361,17 +1252,26 @@ class WhisplayBoard:
                 state = btn_line.get_value()
                 if state != last_state:
                     last_state = state
-                    if state == 1:
-                        if self.button_press_callback:
-                            self.button_press_callback()
-                    else:
-                        if self.button_release_callback:
-                            self.button_release_callback()
+                    self._emit_button(state, time.monotonic_ns())
             except Exception:
                 if self._btn_thread_running:
                     pass
             time.sleep(poll_interval)
 
+    def _emit_button(self, state, timestamp_ns):
+        """Invoke the press/release callback, with the event time if it was
+        registered with_timestamp."""
+        callback = self.button_press_callback if state == 1 else self.button_release_callback
+        if not callback:
+            return
+        try:
+            if self._button_timestamped[1 if state == 1 else 0]:
+                callback(timestamp_ns / 1_000_000_000)
+            else:
+                callback()
+        except Exception as e:
+            print(f"Button callback error: {e}")
+
     # ==================== GPIO Helpers ====================
     def _gpio_output(self, pin, value):
         """Set GPIO pin output value"""
@@ -422,10 +1322,16 @@ class WhisplayBoard:
 
     # ========== Backlight Control ==========
     def set_backlight(self, brightness):
+        """Set the brightness (0-100); while asleep it applies on wake."""
+        self.backlight_level = brightness
+        if not self.sleeping:
+            self._apply_backlight(brightness)
+
+    def _apply_backlight(self, brightness):
         if self.backlight_mode:  # PWM mode
             if self.backlight_pwm is None:
                 led_line = self._gpio_lines[self.LED_PIN]
-                self.backlight_pwm = SoftPWM(led_line.set_value, 1000, stop_value=1)
+                self.backlight_pwm = self._pwm.add_channel(led_line, 1000, stop_value=1)
                 self.backlight_pwm.start(100)
             if 0 <= brightness <= 100:
                 duty_cycle = 100 - brightness
@@ -446,11 +1352,11 @@ class WhisplayBoard:
 
         if mode:  # Switch to PWM mode
             led_line = self._gpio_lines[self.LED_PIN]
-            self.backlight_pwm = SoftPWM(led_line.set_value, 1000, stop_value=1)
+            self.backlight_pwm = self._pwm.add_channel(led_line, 1000, stop_value=1)
             self.backlight_pwm.start(100)
         else:  # Switch to simple on/off mode
             if self.backlight_pwm is not None:
-                self.backlight_pwm.stop()
+                self._pwm.remove_channel(self.backlight_pwm)
                 self.backlight_pwm = None
             self._gpio_output(self.LED_PIN, 1)  # Ensure backlight is on
         self.backlight_mode = mode
@@ -462,79 +1368,127 @@ class WhisplayBoard:
         time.sleep(0.1)
         self._gpio_output(self.RST_PIN, 1)
         time.sleep(0.12)
+        self._invalidate_window()
 
-    def _init_display(self):
-        self._send_command(0x11)
-        time.sleep(0.12)
+    def _panel_config(self) -> dict:
+        """ST7789 init parameters; recorded for warm attach."""
         USE_HORIZONTAL = 1
         direction = {0: 0x00, 1: 0xC0, 2: 0x70,
                      3: 0xA0}.get(USE_HORIZONTAL, 0x00)
-        self._send_command(0x36, direction)
-        self._send_command(0x3A, 0x05)
-        self._send_command(0xB2, 0x0C, 0x0C, 0x00, 0x33, 0x33)
-        self._send_command(0xB7, 0x35)
-        self._send_command(0xBB, 0x32)
-        self._send_command(0xC2, 0x01)
-        self._send_command(0xC3, 0x15)
-        self._send_command(0xC4, 0x20)
-        self._send_command(0xC6, 0x0F)
-        self._send_command(0xD0, 0xA4, 0xA1)
-        self._send_command(
-            0xE0,
-            0xD0,
-            0x08,
-            0x0E,
-            0x09,
-            0x09,
-            0x05,
-            0x31,
-            0x33,
-            0x48,
-            0x17,
-            0x14,
-            0x15,
-            0x31,
-            0x34,
-        )
-        self._send_command(
-            0xE1,
-            0xD0,
-            0x08,
-            0x0E,
-            0x09,
-            0x09,
-            0x15,
-            0x31,
-            0x33,
-            0x48,
-            0x17,
-            0x14,
-            0x15,
-            0x31,
-            0x34,
-        )
-        self._send_command(0x21)
-        self._send_command(0x29)
+        return {
+            "madctl": direction,
+            "colmod": 0x05,
+            "porch": [0x0C, 0x0C, 0x00, 0x33, 0x33],
+            "gate": 0x35,
+            "vcom": 0x32,
+            "vdv_vrh_enable": 0x01,
+            "vrh": 0x15,
+            "vdv": 0x20,
+            "frame_rate": 0x0F,
+            "power": [0xA4, 0xA1],
+            "gamma_positive": [
+                0xD0, 0x08, 0x0E, 0x09, 0x09, 0x05, 0x31,
+                0x33, 0x48, 0x17, 0x14, 0x15, 0x31, 0x34,
+            ],
+            "gamma_negative": [
+                0xD0, 0x08, 0x0E, 0x09, 0x09, 0x15, 0x31,
+                0x33, 0x48, 0x17, 0x14, 0x15, 0x31, 0x34,
+            ],
+            "spi": [self._spi_bus, self._spi_cs],
+        }
+
+    def _init_display(self, config=None):
+        config = config or self._panel_config()
+        self._invalidate_window()
+        self._queue_command(0x11)
+        self._flush_commands()
+        time.sleep(0.12)
+        self._queue_command(0x36, config["madctl"])
+        self._queue_command(0x3A, config["colmod"])
+        self._queue_command(0xB2, *config["porch"])
+        self._queue_command(0xB7, config["gate"])
+        self._queue_command(0xBB, config["vcom"])
+        self._queue_command(0xC2, config["vdv_vrh_enable"])
+        self._queue_command(0xC3, config["vrh"])
+        self._queue_command(0xC4, config["vdv"])
+        self._queue_command(0xC6, config["frame_rate"])
+        self._queue_command(0xD0, *config["power"])
+        self._queue_command(0xE0, *config["gamma_positive"])
+        self._queue_command(0xE1, *config["gamma_negative"])
+        self._queue_command(0x21)
+        self._queue_command(0x29)
+        self._flush_commands()
+
+    def _load_panel_state(self) -> dict | None:
+        """Return the recorded panel state if it belongs to this boot."""
+        try:
+            with open(PANEL_STATE_PATH, "r") as f:
+                state = json.load(f)
+        except Exception:
+            return None
+        if not isinstance(state, dict) or state.get("boot_id") != _read_boot_id():
+            return None
+        return state
+
+    def _save_panel_state(self, config=None, **extra):
+        """Record the applied panel configuration (best effort)."""
+        state = self._load_panel_state() or {}
+        if config is not None:
+            state["config"] = config
+        state["boot_id"] = _read_boot_id()
+        state["sound_card"] = self.sound_card_detected
+        state.update(extra)
+        try:
+            os.makedirs(os.path.dirname(PANEL_STATE_PATH), exist_ok=True)
+            tmp_path = f"{PANEL_STATE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, PANEL_STATE_PATH)
+        except Exception as e:
+            print(f"Could not record panel state for warm attach: {e}")
 
-    def _send_command(self, cmd, *args):
-        self._gpio_output(self.DC_PIN, 0)
-        self.spi.xfer2([cmd])
-        if args:
-            self._gpio_output(self.DC_PIN, 1)
-            self._send_data(list(args))
+    # ==================== Command Transport ====================
+    def _queue_command(self, cmd, *args):
+        """Queue an opcode (sent with DC low) and its parameters (DC high)."""
+        self._command_queue.append((cmd, bytes(args)))
 
-    def _send_data(self, data):
-        self._gpio_output(self.DC_PIN, 1)
-        try:
-            self.spi.writebytes2(data)
-        except AttributeError:
-            max_chunk = 4096
-            for i in range(0, len(data), max_chunk):
-                self.spi.writebytes(data[i : i + max_chunk])
+    def _queue_data(self, data: bytes):
+        """Queue a small data payload (DC high) behind the pending commands."""
+        self._command_queue.append((None, bytes(data)))
 
-    def _send_data_bytes(self, data: bytes | bytearray):
-        """Fast path for bytes/bytearray — avoids Python list overhead."""
-        self._gpio_output(self.DC_PIN, 1)
+    def _flush_commands(self):
+        """Send the queued command list with the fewest DC toggles and writes.
+
+        Adjacent bytes that share a DC level are coalesced into one SPI write:
+        parameterless opcodes run together with the next opcode, and trailing
+        parameters run together with any queued pixel data.
+        """
+        queue = self._command_queue
+        if not queue:
+            return
+        self._command_queue = []
+        segments: list[list] = []
+        for cmd, payload in queue:
+            if cmd is not None:
+                if segments and segments[-1][0] == 0:
+                    segments[-1][1].append(cmd)
+                else:
+                    segments.append([0, bytearray((cmd,))])
+            if payload:
+                if segments and segments[-1][0] == 1:
+                    segments[-1][1] += payload
+                else:
+                    segments.append([1, bytearray(payload)])
+        for level, data in segments:
+            self._set_dc(level)
+            self._spi_write(data)
+
+    def _set_dc(self, level):
+        if self._dc_level != level:
+            self._gpio_output(self.DC_PIN, level)
+            self._dc_level = level
+
+    def _spi_write(self, data):
         try:
             self.spi.writebytes2(data)
         except AttributeError:
@@ -542,64 +1496,738 @@ class WhisplayBoard:
             for i in range(0, len(data), max_chunk):
                 self.spi.writebytes(list(data[i : i + max_chunk]))
 
-    def set_window(self, x0, y0, x1, y1, use_horizontal=0):
-        if use_horizontal in (0, 1):
-            self._send_command(0x2A, x0 >> 8, x0 & 0xFF, x1 >> 8, x1 & 0xFF)
-            self._send_command(
-                0x2B, (y0 + 20) >> 8, (y0 + 20) & 0xFF, (y1 +
-                                                         20) >> 8, (y1 + 20) & 0xFF
-            )
-        elif use_horizontal in (2, 3):
-            self._send_command(
-                0x2A, (x0 + 20) >> 8, (x0 + 20) & 0xFF, (x1 +
-                                                         20) >> 8, (x1 + 20) & 0xFF
+    def _invalidate_window(self):
+        """Forget the cached CASET/RASET state (after reset or re-init)."""
+        self._column_window = None
+        self._row_window = None
+
+    def _send_command(self, cmd, *args):
+        self._queue_command(cmd, *args)
+        self._flush_commands()
+
+    def _send_data(self, data):
+        self._flush_commands()
+        self._set_dc(1)
+        self._spi_write(data)
+
+    def _send_data_bytes(self, data: bytes | bytearray | memoryview):
+        """Fast path for bytes/bytearray/memoryview — avoids Python list overhead."""
+        self._flush_commands()
+        self._set_dc(1)
+        self._spi_write(data)
+
+    def _send_pixels(self, data):
+        """Send RGB565 pixel data in the current color mode."""
+        if self.color_bits == 12:
+            data = _pack_rgb444(data)
+        self._send_data_bytes(data)
+
+    def _solid_pixels(self, color, count) -> bytes:
+        """Encode ``count`` pixels of one RGB565 color in the current mode."""
+        if self.color_bits == 12:
+            r, g, b = (color >> 12) & 0xF, (color >> 7) & 0xF, (color >> 1) & 0xF
+            pair = bytes(((r << 4) | g, (b << 4) | r, (g << 4) | b))
+            data = pair * (count // 2)
+            if count % 2:
+                data += bytes((pair[0], b << 4))
+            return data
+        return bytes(((color >> 8) & 0xFF, color & 0xFF)) * count
+
+    def set_color_mode(self, bits: int):
+        """Select 16-bit RGB565 or 12-bit RGB444 panel transfers.
+
+        Callers keep passing RGB565 data; in 12-bit mode it is packed two
+        pixels per three bytes before going over SPI, cutting transfer time
+        by a quarter at the cost of color depth. Needs NumPy.
+        """
+        bits = int(bits)
+        if bits not in (12, 16):
+            raise ValueError("Color mode must be 12 or 16 bits")
+        if bits == 12 and np is None:
+            raise RuntimeError(
+                "NumPy is required for 12-bit color mode: "
+                "sudo apt install python3-numpy"
             )
-            self._send_command(0x2B, y0 >> 8, y0 & 0xFF, y1 >> 8, y1 & 0xFF)
-        self._send_command(0x2C)
+        with self._spi_lock:
+            if bits == self.color_bits:
+                return
+            self._send_command(0x3A, 0x03 if bits == 12 else 0x05)
+            self.color_bits = bits
+
+    def set_window(self, x0, y0, x1, y1, use_horizontal=0):
+        self._queue_window(x0, y0, x1, y1, use_horizontal)
+        self._flush_commands()
+
+    def _queue_window(self, x0, y0, x1, y1, use_horizontal=0):
+        """Queue CASET/RASET/RAMWR, skipping address commands whose
+        parameters match what the controller already holds."""
+        if use_horizontal in (2, 3):
+            x0, x1 = x0 + 20, x1 + 20
+        else:
+            y0, y1 = y0 + 20, y1 + 20
+        columns = (x0 >> 8, x0 & 0xFF, x1 >> 8, x1 & 0xFF)
+        rows = (y0 >> 8, y0 & 0xFF, y1 >> 8, y1 & 0xFF)
+        if columns != self._column_window:
+            self._queue_command(0x2A, *columns)
+            self._column_window = columns
+        if rows != self._row_window:
+            self._queue_command(0x2B, *rows)
+            self._row_window = rows
+        self._queue_command(0x2C)
 
     def draw_pixel(self, x, y, color):
         if x >= self.LCD_WIDTH or y >= self.LCD_HEIGHT:
             return
-        self.set_window(x, y, x, y)
-        self._send_data([(color >> 8) & 0xFF, color & 0xFF])
+        with self._spi_lock:
+            _, _, row = next(self._row_segments(y, y))
+            self._queue_window(x, row, x, row)
+            self._queue_data(self._solid_pixels(color, 1))
+            self._flush_commands()
+            self.previous_frame = None
 
     def draw_line(self, x0, y0, x1, y1, color):
+        """Draw a Bresenham line as horizontal/vertical runs, one window per run."""
+        with self._spi_lock:
+            for rx0, ry0, rx1, ry1 in self._line_runs(x0, y0, x1, y1):
+                rx0, ry0 = max(0, rx0), max(0, ry0)
+                rx1, ry1 = min(self.LCD_WIDTH - 1, rx1), min(self.LCD_HEIGHT - 1, ry1)
+                if rx1 < rx0 or ry1 < ry0:
+                    continue
+                for sy0, sy1, row in self._row_segments(ry0, ry1):
+                    self._queue_window(rx0, row, rx1, row + sy1 - sy0)
+                    self._queue_data(self._solid_pixels(color, (rx1 - rx0 + 1) * (sy1 - sy0 + 1)))
+            self._flush_commands()
+            self.previous_frame = None
+
+    @staticmethod
+    def _line_runs(x0, y0, x1, y1):
+        """Yield inclusive ``(x0, y0, x1, y1)`` runs covering a Bresenham line.
+
+        Shallow lines are split into horizontal runs and steep lines into
+        vertical runs, so each run is a single 1-pixel-thick window.
+        """
         dx = abs(x1 - x0)
         dy = abs(y1 - y0)
         sx = 1 if x0 < x1 else -1
         sy = 1 if y0 < y1 else -1
         err = dx - dy
-
+        horizontal = dx >= dy
+        run_x, run_y = x0, y0
         while True:
-            self.draw_pixel(x0, y0, color)
             if x0 == x1 and y0 == y1:
                 break
             e2 = 2 * err
+            nx, ny = x0, y0
             if e2 > -dy:
                 err -= dy
-                x0 += sx
+                nx += sx
             if e2 < dx:
                 err += dx
-                y0 += sy
+                ny += sy
+            if (horizontal and ny != y0) or (not horizontal and nx != x0):
+                yield min(run_x, x0), min(run_y, y0), max(run_x, x0), max(run_y, y0)
+                run_x, run_y = nx, ny
+            x0, y0 = nx, ny
+        yield min(run_x, x0), min(run_y, y0), max(run_x, x0), max(run_y, y0)
 
     def fill_screen(self, color):
-        self.set_window(0, 0, self.LCD_WIDTH - 1, self.LCD_HEIGHT - 1)
         high = (color >> 8) & 0xFF
         low = color & 0xFF
         buffer = bytes([high, low]) * (self.LCD_WIDTH * self.LCD_HEIGHT)
-        self._send_data_bytes(buffer)
+        if self._flush_running:
+            with self._flush_cond:
+                self._begin_back_frame(full=True)[:] = buffer
+                self._submit_back_frame()
+            return
+        with self._spi_lock:
+            self.set_window(0, 0, self.LCD_WIDTH - 1, self.LCD_HEIGHT - 1)
+            self._send_pixels(buffer)
+            self._store_frame(memoryview(buffer))
 
     def draw_image(self, x, y, width, height, pixel_data):
         if (x + width > self.LCD_WIDTH) or (y + height > self.LCD_HEIGHT):
             raise ValueError("Image dimensions exceed screen bounds")
-        self.set_window(x, y, x + width - 1, y + height - 1)
-        if isinstance(pixel_data, (bytes, bytearray)):
-            self._send_data_bytes(pixel_data)
+        is_buffer = isinstance(pixel_data, (bytes, bytearray, memoryview))
+        if is_buffer and self._flush_running:
+            view = memoryview(pixel_data).cast("B")
+            if view.nbytes != width * height * 2:
+                raise ValueError("Pixel data size does not match image dimensions")
+            full = x == 0 and y == 0 and width == self.LCD_WIDTH and height == self.LCD_HEIGHT
+            with self._flush_cond:
+                self._copy_region(self._begin_back_frame(full), x, y, width, height, view)
+                self._submit_back_frame(None if full else [(x, y, x + width - 1, y + height - 1)])
+            return
+        if not is_buffer and (self._scroll_offset or self.color_bits == 12):
+            pixel_data, is_buffer = bytes(pixel_data), True
+        with self._spi_lock:
+            if not is_buffer:
+                self.set_window(x, y, x + width - 1, y + height - 1)
+                self._send_data(pixel_data)
+                self.previous_frame = None
+                return
+            view = memoryview(pixel_data).cast("B")
+            segments = list(self._row_segments(y, y + height - 1))
+            if len(segments) == 1:
+                row = segments[0][2]
+                self.set_window(x, row, x + width - 1, row + height - 1)
+                self._send_pixels(view)
+            else:
+                row_bytes = width * 2
+                for sy0, sy1, row in segments:
+                    self.set_window(x, row, x + width - 1, row + sy1 - sy0)
+                    self._send_pixels(view[(sy0 - y) * row_bytes:(sy1 - y + 1) * row_bytes])
+            self._patch_frame(x, y, width, height, view)
+
+    # ========== Partial Updates ==========
+    def present(self, frame):
+        """Show a full-screen RGB565 frame, sending only what changed.
+
+        The frame is diffed row by row against the last frame pushed to the
+        panel; changed spans are merged into a few rectangles using the
+        window/syscall cost model and written straight out of ``frame``.
+        """
+        view = self._frame_view(frame)
+        if self._flush_running:
+            with self._flush_cond:
+                self._begin_back_frame(full=True)[:] = view
+                self._submit_back_frame()
+            return
+        with self._spi_lock:
+            started = time.perf_counter()
+            self._present_now(view)
+            self._note_push(started)
+
+    def update_regions(self, frame, rects):
+        """Push only ``rects`` (``(x, y, width, height)`` tuples) of a
+        full-screen RGB565 frame. The caller guarantees nothing outside
+        those rectangles changed since the previous frame."""
+        view = self._frame_view(frame)
+        spans = self._clip_rects(rects)
+        if not spans:
+            return
+        if self._flush_running:
+            with self._flush_cond:
+                back = self._begin_back_frame(full=False)
+                for x0, y0, x1, y1 in spans:
+                    self._copy_rect(back, view, x0, y0, x1, y1)
+                self._submit_back_frame(spans)
+            return
+        with self._spi_lock:
+            if self.previous_frame is None:
+                self._send_rect(view, 0, 0, self.LCD_WIDTH - 1, self.LCD_HEIGHT - 1)
+                self._store_frame(view)
+                return
+            spans.sort(key=lambda rect: (rect[1], rect[0]))
+            for rect in self._merge_rects(spans):
+                self._send_rect(view, *rect)
+                self._copy_rect(self.previous_frame, view, *rect)
+
+    def present_direct(self, frame, rects=None):
+        """Push a full-screen RGB565 frame before returning, reading the
+        pixels straight from ``frame`` even in async mode.
+
+        Meant for buffers that stay unchanged until this returns, such as a
+        mapped swap-chain buffer: nothing is staged in the back buffer. Only
+        the diff state is updated from it. ``rects`` limits the push as in
+        update_regions, otherwise the frame is diffed as in present(). A
+        frame still queued for the flush thread goes out first.
+        """
+        view = self._frame_view(frame)
+        spans = None if rects is None else self._clip_rects(rects)
+        self.wait_for_flush()
+        with self._spi_lock:
+            started = time.perf_counter()
+            self._present_now(view, spans)
+            self._note_push(started)
+            self._sync_front_buffer()
+
+    def _clip_rects(self, rects) -> list[tuple[int, int, int, int]]:
+        """Clip ``(x, y, width, height)`` rectangles to the screen as
+        inclusive ``(x0, y0, x1, y1)`` spans, dropping empty ones."""
+        spans = []
+        for x, y, width, height in rects:
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1 = min(self.LCD_WIDTH, int(x) + int(width)) - 1
+            y1 = min(self.LCD_HEIGHT, int(y) + int(height)) - 1
+            if x1 < x0 or y1 < y0:
+                continue
+            spans.append((x0, y0, x1, y1))
+        return spans
+
+    def _present_now(self, view: memoryview, damage=None):
+        """Push ``view``; ``damage`` (``(x0, y0, x1, y1)`` spans known to
+        cover every change) skips the row diff."""
+        if self.previous_frame is None:
+            self._send_rect(view, 0, 0, self.LCD_WIDTH - 1, self.LCD_HEIGHT - 1)
+            self._store_frame(view)
+            return
+        if damage is not None:
+            for rect in self._merge_rects(sorted(damage, key=lambda rect: (rect[1], rect[0]))):
+                self._send_rect(view, *rect)
+                self._copy_rect(self.previous_frame, view, *rect)
+            return
+        rects = self._merge_rects(self._diff_spans(view))
+        if not rects:
+            return
+        for rect in rects:
+            self._send_rect(view, *rect)
+        self.previous_frame[:] = view
+
+    def _frame_view(self, frame) -> memoryview:
+        view = memoryview(frame).cast("B")
+        if view.nbytes != self.LCD_WIDTH * self.LCD_HEIGHT * 2:
+            raise ValueError("Frame must be a full-screen RGB565 buffer")
+        return view
+
+    def _store_frame(self, view: memoryview):
+        if self.previous_frame is None:
+            self.previous_frame = bytearray(view)
+        else:
+            self.previous_frame[:] = view
+
+    def _patch_frame(self, x, y, width, height, view: memoryview):
+        """Mirror a draw_image payload into the previous frame."""
+        if self.previous_frame is None:
+            if x == 0 and y == 0 and width == self.LCD_WIDTH and height == self.LCD_HEIGHT:
+                self._store_frame(view)
+            return
+        if view.nbytes != width * height * 2:
+            self.previous_frame = None
+            return
+        self._copy_region(self.previous_frame, x, y, width, height, view)
+
+    def _copy_region(self, target: bytearray, x, y, width, height, view: memoryview):
+        """Copy a packed ``width`` x ``height`` block into a full-frame buffer."""
+        stride = self.LCD_WIDTH * 2
+        row_bytes = width * 2
+        if x == 0 and width == self.LCD_WIDTH:
+            target[y * stride:y * stride + view.nbytes] = view
+            return
+        for row in range(height):
+            dst = (y + row) * stride + x * 2
+            src = row * row_bytes
+            target[dst:dst + row_bytes] = view[src:src + row_bytes]
+
+    def _copy_rect(self, target: bytearray, view: memoryview, x0, y0, x1, y1):
+        """Copy a rectangle between two full-frame buffers."""
+        stride = self.LCD_WIDTH * 2
+        if x0 == 0 and x1 == self.LCD_WIDTH - 1:
+            target[y0 * stride:(y1 + 1) * stride] = view[y0 * stride:(y1 + 1) * stride]
+            return
+        start = x0 * 2
+        end = (x1 + 1) * 2
+        for y in range(y0, y1 + 1):
+            offset = y * stride
+            target[offset + start:offset + end] = view[offset + start:offset + end]
+
+    def _diff_spans(self, view: memoryview) -> list[tuple[int, int, int, int]]:
+        """Return one ``(x0, y, x1, y)`` span per changed row."""
+        previous = memoryview(self.previous_frame)
+        stride = self.LCD_WIDTH * 2
+        spans = []
+        for y in range(self.LCD_HEIGHT):
+            start = y * stride
+            end = start + stride
+            if previous[start:end] == view[start:end]:
+                continue
+            # Binary search the first and last differing pixel; each probe is
+            # a C-level slice compare, so a row costs ~log2(width) compares.
+            lo, hi = 0, self.LCD_WIDTH
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if previous[start:start + mid * 2] == view[start:start + mid * 2]:
+                    lo = mid
+                else:
+                    hi = mid
+            first = lo
+            lo, hi = 0, self.LCD_WIDTH - first
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if previous[end - mid * 2:end] == view[end - mid * 2:end]:
+                    lo = mid
+                else:
+                    hi = mid
+            spans.append((first, y, self.LCD_WIDTH - 1 - lo, y))
+        return spans
+
+    def _rect_cost(self, x0, y0, x1, y1) -> int:
+        rows = y1 - y0 + 1
+        full_width = rows * self.LCD_WIDTH * 2
+        if x0 == 0 and x1 == self.LCD_WIDTH - 1:
+            return self.WINDOW_COST_BYTES + full_width
+        strided = rows * ((x1 - x0 + 1) * 2 + self.ROW_WRITE_COST_BYTES)
+        return self.WINDOW_COST_BYTES + min(strided, full_width)
+
+    def _merge_rects(self, spans) -> list[tuple[int, int, int, int]]:
+        """Greedily merge y-sorted rectangles while the union is no more
+        expensive than sending them separately."""
+        rects: list[tuple[int, int, int, int]] = []
+        for rect in spans:
+            if rects:
+                prev = rects[-1]
+                merged = (
+                    min(prev[0], rect[0]),
+                    min(prev[1], rect[1]),
+                    max(prev[2], rect[2]),
+                    max(prev[3], rect[3]),
+                )
+                if self._rect_cost(*merged) <= self._rect_cost(*prev) + self._rect_cost(*rect):
+                    rects[-1] = merged
+                    continue
+            rects.append(rect)
+        while len(rects) > self.MAX_DIRTY_RECTS:
+            best_index, best_rect, best_penalty = 0, None, None
+            for index in range(len(rects) - 1):
+                a, b = rects[index], rects[index + 1]
+                merged = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                penalty = self._rect_cost(*merged) - self._rect_cost(*a) - self._rect_cost(*b)
+                if best_penalty is None or penalty < best_penalty:
+                    best_index, best_rect, best_penalty = index, merged, penalty
+            rects[best_index:best_index + 2] = [best_rect]
+        full = (0, 0, self.LCD_WIDTH - 1, self.LCD_HEIGHT - 1)
+        if sum(self._rect_cost(*rect) for rect in rects) >= self._rect_cost(*full):
+            return [full]
+        return [self._widen_rect(*rect) for rect in rects]
+
+    def _widen_rect(self, x0, y0, x1, y1) -> tuple[int, int, int, int]:
+        """Widen to full rows when one contiguous write beats per-row writes."""
+        rows = y1 - y0 + 1
+        strided = rows * ((x1 - x0 + 1) * 2 + self.ROW_WRITE_COST_BYTES)
+        if strided >= rows * self.LCD_WIDTH * 2:
+            return 0, y0, self.LCD_WIDTH - 1, y1
+        return x0, y0, x1, y1
+
+    def _send_rect(self, view: memoryview, x0, y0, x1, y1):
+        """Send a sub-rectangle of a full frame as zero-copy memoryview slices."""
+        stride = self.LCD_WIDTH * 2
+        start = x0 * 2
+        length = (x1 - x0 + 1) * 2
+        for sy0, sy1, row in self._row_segments(y0, y1):
+            self.set_window(x0, row, x1, row + sy1 - sy0)
+            if x0 == 0 and x1 == self.LCD_WIDTH - 1:
+                self._send_pixels(view[sy0 * stride:(sy1 + 1) * stride])
+                continue
+            if self.color_bits == 12:
+                # Packed pixels straddle byte boundaries, so the rows of a
+                # window must go out as one continuous stream.
+                rows = np.frombuffer(view, dtype=">u2").reshape(self.LCD_HEIGHT, self.LCD_WIDTH)
+                self._send_data_bytes(_pack_rgb444(rows[sy0:sy1 + 1, x0:x1 + 1]))
+                continue
+            for y in range(sy0, sy1 + 1):
+                offset = y * stride + start
+                self._send_data_bytes(view[offset:offset + length])
+
+    # ========== Hardware Scrolling ==========
+    def set_scroll_area(self, top, height):
+        """Make screen rows ``[top, top + height)`` the hardware scroll area.
+
+        Rows outside the area stay fixed. Naming the current area again is a
+        no-op that keeps the accumulated offset, so back-to-back animations
+        continue from what the panel shows. Moving to a different area resets
+        the offset, which rotates what a scrolled area shows until the next
+        ``present``.
+        """
+        top, height = int(top), int(height)
+        if top < 0 or height < 1 or top + height > self.LCD_HEIGHT:
+            raise ValueError("Scroll area exceeds screen bounds")
+        with self._spi_lock:
+            if (top, height) == (self._scroll_top, self._scroll_height):
+                return
+            self._define_scroll_area(top, height)
+
+    def reset_scroll(self):
+        """Restore the unscrolled full-screen panel, whatever state the
+        controller was left in."""
+        with self._spi_lock:
+            self._define_scroll_area(0, self.LCD_HEIGHT)
+
+    def _define_scroll_area(self, top, height):
+        """Send VSCRDEF/VSCSAD for a new area at offset 0; caller holds
+        ``_spi_lock``."""
+        self._roll_previous(-self._scroll_offset)
+        self._scroll_top = top
+        self._scroll_height = height
+        self._scroll_offset = 0
+        tfa = self._scroll_fixed_top()
+        bfa = self.GRAM_ROWS - tfa - height
+        self._queue_command(0x33, tfa >> 8, tfa & 0xFF, height >> 8, height & 0xFF, bfa >> 8, bfa & 0xFF)
+        self._queue_scroll_start()
+        self._flush_commands()
+        self._sync_front_buffer()
+
+    def scroll(self, delta, frame=None):
+        """Shift the scroll area content up by ``delta`` rows (down if negative).
+
+        Only the two-byte scroll start address is sent; the rows that wrap
+        around keep their old content. Pass the full-screen ``frame`` that
+        should be visible after the shift and it is presented right away, so
+        just the newly exposed rows (plus anything else that changed) are
+        uploaded.
+        """
+        with self._spi_lock:
+            delta = int(delta) % self._scroll_height
+            if delta:
+                self._roll_previous(delta)
+                self._scroll_offset = (self._scroll_offset + delta) % self._scroll_height
+                self._queue_scroll_start()
+                self._flush_commands()
+            if frame is not None:
+                self._present_now(self._frame_view(frame))
+            self._sync_front_buffer()
+
+    def _scroll_fixed_top(self) -> int:
+        """Frame memory rows above the scroll area (VSCRDEF TFA)."""
+        if self._madctl & 0x80:
+            # MY set: screen rows run bottom-up through frame memory.
+            return self.GRAM_ROWS - self.PANEL_ROW_OFFSET - self._scroll_top - self._scroll_height
+        return self.PANEL_ROW_OFFSET + self._scroll_top
+
+    def _queue_scroll_start(self):
+        height = self._scroll_height
+        if self._madctl & 0x80:
+            start = (-self._scroll_offset) % height
         else:
-            self._send_data(pixel_data)
+            start = self._scroll_offset
+        vsp = self._scroll_fixed_top() + start
+        self._queue_command(0x37, vsp >> 8, vsp & 0xFF)
+
+    def _row_segments(self, y0, y1):
+        """Map screen rows ``y0..y1`` to frame memory rows.
+
+        Yields ``(screen_y0, screen_y1, memory_y0)`` runs that are contiguous
+        in memory; a run inside the scroll area is split where it wraps.
+        """
+        if self._scroll_offset == 0:
+            yield y0, y1, y0
+            return
+        top = self._scroll_top
+        bottom = top + self._scroll_height
+        y = y0
+        while y <= y1:
+            if y < top or y >= bottom:
+                end = min(y1, top - 1) if y < top else y1
+                yield y, end, y
+            else:
+                row = top + (y - top + self._scroll_offset) % self._scroll_height
+                end = min(y1, bottom - 1, y + bottom - 1 - row)
+                yield y, end, row
+            y = end + 1
+
+    def _roll_previous(self, delta):
+        """Rotate the scroll area rows of the previous frame so it keeps
+        matching the panel after the scroll offset moves by ``delta``."""
+        if self.previous_frame is None or not delta % self._scroll_height:
+            return
+        stride = self.LCD_WIDTH * 2
+        start = self._scroll_top * stride
+        end = start + self._scroll_height * stride
+        shift = (delta % self._scroll_height) * stride
+        area = self.previous_frame[start:end]
+        self.previous_frame[start:end] = area[shift:] + area[:shift]
+
+    def _sync_front_buffer(self):
+        """After a synchronous panel change, base later async partial writes
+        on what is actually shown."""
+        if not self._flush_running or self.previous_frame is None:
+            return
+        with self._flush_cond:
+            # A frame already taken by the flush thread is presented next
+            # and diffed against previous_frame, so leave it alone.
+            if not self._flush_busy:
+                self._front_buffer[:] = self.previous_frame
+                self._back_stale = None
+            # Pending damage predates the change; fall back to a full diff.
+            self._back_damage = None
+
+    # ========== Shadow Framebuffer ==========
+    @property
+    def framebuffer(self) -> ShadowFramebuffer:
+        """Retained-mode shadow framebuffer (created on first use, needs NumPy)."""
+        if self._framebuffer is None:
+            self._framebuffer = ShadowFramebuffer(self)
+        return self._framebuffer
+
+    @property
+    def canvas(self) -> Canvas:
+        """NumPy canvas over the shadow framebuffer; present() flushes it."""
+        if self._canvas is None:
+            framebuffer = self.framebuffer
+            self._canvas = Canvas(framebuffer, framebuffer.flush)
+        return self._canvas
+
+    # ========== Async Flush ==========
+    def set_async_flush(self, enabled: bool):
+        """Enable or disable the background SPI flush thread.
+
+        In async mode draw_image/fill_screen/present copy into a back buffer
+        and return immediately; the flush thread pushes the newest pending
+        frame, so frames submitted faster than the panel can take them are
+        coalesced (latest wins) instead of queued.
+        """
+        if enabled == self._flush_running:
+            return
+        if enabled:
+            frame_bytes = self.LCD_WIDTH * self.LCD_HEIGHT * 2
+            with self._spi_lock:
+                front = bytearray(self.previous_frame) if self.previous_frame is not None else bytearray(frame_bytes)
+            self._front_buffer = front
+            self._back_buffer = bytearray(frame_bytes)
+            self._back_pending = False
+            self._back_stale = None
+            self._flush_running = True
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+            return
+        with self._flush_cond:
+            self._flush_running = False
+            self._flush_cond.notify_all()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=2)
+        self._flush_thread = None
+        self._back_buffer = None
+        self._front_buffer = None
+
+    def wait_for_flush(self, timeout=None) -> bool:
+        """Block until every submitted frame has reached the panel."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._flush_cond:
+            while self._back_pending or self._flush_busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._flush_cond.wait(remaining)
+        return True
+
+    def flush_stats(self) -> dict:
+        with self._flush_cond:
+            return {
+                "async": self._flush_running,
+                "submitted": self.frames_submitted,
+                "flushed": self.frames_flushed,
+                "dropped": self.frames_dropped,
+                "pending": self._back_pending,
+                "push_ms": round(self.push_time * 1000.0, 2),
+            }
+
+    def _note_push(self, started: float):
+        elapsed = time.perf_counter() - started
+        self.push_time = elapsed if not self.push_time else self.push_time * 0.8 + elapsed * 0.2
+
+    def _begin_back_frame(self, full: bool) -> bytearray:
+        """Return the back buffer ready for writing; caller holds _flush_cond.
+
+        A partial write on an idle back buffer starts from the latest
+        submitted frame so regions outside the write are preserved. Only the
+        spans that frame changed are copied over when they are known.
+        """
+        if not self._back_pending and not full:
+            stale = self._back_stale
+            if stale is None or self._rects_area(stale) * 2 >= self.LCD_WIDTH * self.LCD_HEIGHT:
+                self._back_buffer[:] = self._front_buffer
+            else:
+                front = memoryview(self._front_buffer)
+                for rect in stale:
+                    self._copy_rect(self._back_buffer, front, *rect)
+            self._back_stale = []
+        return self._back_buffer
+
+    @staticmethod
+    def _rects_area(rects) -> int:
+        return sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in rects)
+
+    def _submit_back_frame(self, damage=None):
+        """Queue the back buffer; ``damage`` lists the ``(x0, y0, x1, y1)``
+        spans changed since the last submitted frame, None means unknown."""
+        self.frames_submitted += 1
+        if self._back_pending:
+            self.frames_dropped += 1
+            if self._back_damage is not None and damage is not None:
+                damage = self._back_damage + list(damage)
+            else:
+                damage = None
+        self._back_damage = list(damage) if damage is not None else None
+        self._back_pending = True
+        self._flush_cond.notify_all()
+
+    def _flush_loop(self):
+        while True:
+            with self._flush_cond:
+                while self._flush_running and not self._back_pending:
+                    self._flush_cond.wait()
+                if not self._back_pending:
+                    return
+                self._back_buffer, self._front_buffer = self._front_buffer, self._back_buffer
+                self._back_pending = False
+                self._flush_busy = True
+                front = self._front_buffer
+                damage, self._back_damage = self._back_damage, None
+                # The new back buffer is the previous frame, so it differs
+                # from the new front exactly where this frame is damaged.
+                self._back_stale = damage
+            try:
+                with self._spi_lock:
+                    started = time.perf_counter()
+                    self._present_now(memoryview(front), damage)
+                    self._note_push(started)
+            except Exception as e:
+                print(f"Async flush failed: {e}")
+            with self._flush_cond:
+                self._flush_busy = False
+                self.frames_flushed += 1
+                self._flush_cond.notify_all()
+
+    # ========== Sleep ==========
+    def sleep(self, led_off: bool = True):
+        """Blank the panel (DISPOFF + SLPIN) and turn off the backlight and,
+        unless ``led_off`` is False, the RGB LED.
+
+        Frame memory survives sleep, so wake() brings back the last frame.
+        With every PWM channel static the PWM thread blocks until wake.
+        """
+        if self.sleeping:
+            return
+        self.wait_for_flush()
+        if led_off:
+            self._led.cancel()
+            self._sleep_rgb = (self._current_r, self._current_g, self._current_b)
+            self._apply_rgb(0, 0, 0)
+        self._apply_backlight(0)
+        with self._spi_lock:
+            self._queue_command(0x28)
+            self._queue_command(0x10)
+            self._flush_commands()
+            self.sleeping = True
+        self._save_panel_state(sleeping=True)
+
+    def wake(self):
+        """Leave sleep mode and restore the backlight and LED color.
+
+        Blocks for the SLPOUT settle time, without holding the SPI lock, so
+        frames can still be written to frame memory meanwhile.
+        """
+        if not self.sleeping:
+            return
+        with self._spi_lock:
+            self._send_command(0x11)
+        time.sleep(0.12)
+        with self._spi_lock:
+            self._send_command(0x29)
+            self.sleeping = False
+        if self.backlight_level is not None:
+            self._apply_backlight(self.backlight_level)
+        if self._sleep_rgb is not None:
+            self._apply_rgb(*self._sleep_rgb)
+            self._sleep_rgb = None
+        self._save_panel_state(sleeping=False)
 
     # ========== RGB LED & Button ==========
     def set_rgb(self, r, g, b):
+        """Set the LED color, cancelling any running effect."""
+        self._led.cancel()
+        self._sleep_rgb = None
+        self._apply_rgb(r, g, b)
+
+    def _apply_rgb(self, r, g, b):
         self.red_pwm.ChangeDutyCycle(100 - (r / 255 * 100))
         self.green_pwm.ChangeDutyCycle(100 - (g / 255 * 100))
         self.blue_pwm.ChangeDutyCycle(100 - (b / 255 * 100))
@@ -607,45 +2235,56 @@ class WhisplayBoard:
         self._current_g = g
         self._current_b = b
 
-    def set_rgb_fade(self, r_target, g_target, b_target, duration_ms=100):
-        steps = 20  # Adjust steps to control fade smoothness
-        delay_ms = duration_ms / steps
-
-        r_step = (r_target - self._current_r) / steps
-        g_step = (g_target - self._current_g) / steps
-        b_step = (b_target - self._current_b) / steps
-
-        for _ in range(steps + 1):
-            r_interim = int(self._current_r + _ * r_step)
-            g_interim = int(self._current_g + _ * g_step)
-            b_interim = int(self._current_b + _ * b_step)
-            self.set_rgb(
-                max(0, min(255, r_interim)),
-                max(0, min(255, g_interim)),
-                max(0, min(255, b_interim)),
-            )
-            time.sleep(delay_ms / 1000.0)
+    def set_rgb_fade(self, r_target, g_target, b_target, duration_ms=100, wait=True):
+        """Fade to a color on the LED timer thread; with ``wait=False``
+        return immediately and let later LED calls preempt the fade."""
+        self._sleep_rgb = None
+        generation = self._led.play(
+            LEDEffect.fade((r_target, g_target, b_target), duration_ms),
+            (self._current_r, self._current_g, self._current_b),
+        )
+        if wait:
+            self._led.wait(generation)
+
+    def play_led_effect(self, effect):
+        """Start an LEDEffect (or its ``from_spec`` dict) in the background,
+        replacing the running effect."""
+        if isinstance(effect, dict):
+            effect = LEDEffect.from_spec(effect)
+        self._sleep_rgb = None
+        self._led.play(effect, (self._current_r, self._current_g, self._current_b))
+
+    def stop_led_effect(self):
+        self._led.cancel()
 
     def button_pressed(self):
         return self._gpio_input(self.BUTTON_PIN) == 1
 
-    def on_button_press(self, callback):
+    def on_button_press(self, callback, with_timestamp: bool = False):
+        """``with_timestamp`` passes the edge time in seconds on the
+        time.monotonic() clock to ``callback``."""
         self.button_press_callback = callback
+        self._button_timestamped[1] = bool(with_timestamp)
 
-    def on_button_release(self, callback):
+    def on_button_release(self, callback, with_timestamp: bool = False):
         self.button_release_callback = callback
+        self._button_timestamped[0] = bool(with_timestamp)
 
     # ========== Cleanup ==========
     def cleanup(self):
+        # Push any pending frame and stop the flush thread
+        self.set_async_flush(False)
         # Stop backlight PWM
         if self.backlight_pwm is not None:
             self.backlight_pwm.stop()
         # Close SPI
         self.spi.close()
-        # Stop RGB LED PWM
+        # Stop LED effects and RGB LED PWM
+        self._led.stop()
         self.red_pwm.stop()
         self.green_pwm.stop()
         self.blue_pwm.stop()
+        self._pwm.stop()
 
         # Stop button listener thread
         self._btn_thread_running = False
@@ -657,6 +2296,8 @@ class WhisplayBoard:
                 line.release()
             except Exception:
                 pass
+        for bank in self._gpio_banks:
+            bank.release()
         for chip in self._gpio_chips.values():
             try:
                 chip.close()
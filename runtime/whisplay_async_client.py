@@ -0,0 +1,513 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from whisplay import Canvas, LEDEffect
+from whisplay_client import (
+    DEFAULT_APP_DISPLAY_NAME,
+    DEFAULT_APP_ICON,
+    DEFAULT_APP_ID,
+    DEFAULT_DAEMON_SOCKET_PATH,
+    DEFAULT_EXIT_GESTURE,
+    DEFAULT_FRAMEBUFFER_BUFFERS,
+    DEFAULT_PRIORITY,
+    DEFAULT_REQUEST_TIMEOUT_SEC,
+    DEFAULT_USE_DAEMON_DEFAULT_LOG,
+    SWAP_POLL_SEC,
+    SharedFramebuffer,
+    encode_proxy_request,
+    focus_acquire_payload,
+    register_payload,
+    request_framebuffer,
+)
+from whisplay_protocol import (
+    KIND_EVENT,
+    KIND_RESPONSE,
+    PROTOCOL_VERSION,
+    decode_event,
+    decode_response,
+    read_frame_async,
+    topic_matches,
+    upgrade_request,
+)
+
+DEFAULT_EVENT_QUEUE_SIZE = 64
+# asyncio's default 64 KiB line limit is too small for large app.list replies.
+STREAM_LIMIT = 1 << 20
+
+
+class AsyncWhisplayDaemonProxy:
+    """asyncio counterpart of WhisplayDaemonProxy.
+
+    Commands share one pipelined connection opened with
+    ``asyncio.open_unix_connection``; every call is awaitable and
+    ``wait=False`` sends a noreply request that only waits for the socket
+    buffer to drain. Drawing writes the shared framebuffer synchronously,
+    exactly like the threaded proxy, and ``present`` yields to the loop while
+    a swap chain has no free buffer. Events can be consumed with
+    ``async for event in proxy.events()`` or through the same ``on_*``
+    callbacks (plain functions or coroutine functions). ``event_topics``
+    limits the subscription to those event names (a trailing ``*`` matches
+    a prefix); ``None`` receives every event.
+    """
+
+    LCD_WIDTH = 240
+    LCD_HEIGHT = 280
+    CornerHeight = 20
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_DAEMON_SOCKET_PATH,
+        app_id: str = DEFAULT_APP_ID,
+        display_name: str = DEFAULT_APP_DISPLAY_NAME,
+        icon: str = DEFAULT_APP_ICON,
+        launch_command: str | None = None,
+        launch_cwd: str | None = None,
+        persist: bool = True,
+        exit_gesture: str = DEFAULT_EXIT_GESTURE,
+        priority: int = DEFAULT_PRIORITY,
+        use_daemon_default_log: bool = DEFAULT_USE_DAEMON_DEFAULT_LOG,
+        framebuffer_buffers: int = DEFAULT_FRAMEBUFFER_BUFFERS,
+        target_fps: float | None = None,
+        event_queue_size: int = DEFAULT_EVENT_QUEUE_SIZE,
+        event_topics: list[str] | None = None,
+        protocol_version: int = PROTOCOL_VERSION,
+    ):
+        self.socket_path = socket_path
+        self.protocol_version = int(protocol_version)
+        self.event_topics = list(event_topics) if event_topics is not None else None
+        self.button_press_callback = None
+        self.button_release_callback = None
+        self.exit_request_callback = None
+        self.focus_revoked_callback = None
+        self._button_down = False
+        self._running = False
+        self._session_token = None
+        self._app_id = app_id
+        self._display_name = display_name
+        self._icon = icon
+        self._launch_command = launch_command
+        self._launch_cwd = launch_cwd
+        self._persist = persist
+        self._exit_gesture = str(exit_gesture or DEFAULT_EXIT_GESTURE)
+        self._priority = int(priority)
+        self._use_daemon_default_log = bool(use_daemon_default_log)
+        self._framebuffer = SharedFramebuffer(self.LCD_WIDTH, self.LCD_HEIGHT)
+        self._fb_buffers = max(1, int(framebuffer_buffers))
+        self._target_fps = target_fps
+        self._rpc_lock = None
+        self._rpc_writer = None
+        self._rpc_framed = False
+        self._rpc_reader_task = None
+        self._rpc_pending: dict[int, asyncio.Future] = {}
+        self._rpc_next_id = 1
+        self._event_task = None
+        self._focus_grant: asyncio.Future | None = None
+        self._canvas = None
+        self._events: asyncio.Queue = asyncio.Queue(maxsize=max(1, int(event_queue_size)))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.cleanup()
+
+    # ----- commands -----
+    async def _send_request(self, cmd: str, payload: dict | None = None, wait: bool = True) -> dict | None:
+        """Send a command over the shared connection; see
+        WhisplayDaemonProxy._send_request."""
+        if self._rpc_lock is None:
+            self._rpc_lock = asyncio.Lock()
+        future = asyncio.get_running_loop().create_future() if wait else None
+        request_id = 0
+        async with self._rpc_lock:
+            if wait:
+                request_id = self._rpc_next_id
+                self._rpc_next_id += 1
+            for attempt in range(2):
+                try:
+                    writer = await self._rpc_connection()
+                    wire = encode_proxy_request(cmd, payload, request_id, wait, self._rpc_framed)
+                    if future is not None:
+                        self._rpc_pending[request_id] = future
+                    writer.write(wire)
+                    # Drain so a stalled daemon slows the app down instead
+                    # of growing the write buffer.
+                    await writer.drain()
+                    break
+                except OSError:
+                    if future is not None:
+                        self._rpc_pending.pop(request_id, None)
+                    self._close_rpc()
+                    if attempt:
+                        raise
+        if future is None:
+            return None
+        try:
+            response = await asyncio.wait_for(future, DEFAULT_REQUEST_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            self._rpc_pending.pop(request_id, None)
+            raise RuntimeError(f"whisplay-daemon did not answer {cmd}")
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "whisplay-daemon request failed"))
+        return response
+
+    async def _open_connection(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        """Connect and negotiate protocol v2 when enabled; the flag says
+        whether the connection is framed."""
+        reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=STREAM_LIMIT)
+        if self.protocol_version < 2:
+            return reader, writer, False
+        try:
+            writer.write(upgrade_request())
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("connection closed during protocol upgrade")
+            return reader, writer, bool(json.loads(line).get("ok"))
+        except BaseException:
+            writer.close()
+            raise
+
+    @staticmethod
+    async def _read_message(reader: asyncio.StreamReader, framed: bool) -> dict | None:
+        """Next response or event as a v1 dict; None at end of stream."""
+        while True:
+            if not framed:
+                line = await reader.readline()
+                if not line:
+                    return None
+                if line.strip():
+                    return json.loads(line)
+                continue
+            frame = await read_frame_async(reader)
+            if frame is None:
+                return None
+            kind, opcode, _, request_id, body = frame
+            if kind == KIND_EVENT:
+                return decode_event(opcode, body)
+            if kind == KIND_RESPONSE:
+                return decode_response(opcode, body, request_id)
+
+    async def _rpc_connection(self) -> asyncio.StreamWriter:
+        """Return the command connection, connecting if needed; caller holds _rpc_lock."""
+        if self._rpc_writer is None:
+            reader, writer, framed = await self._open_connection()
+            self._rpc_writer = writer
+            self._rpc_framed = framed
+            self._rpc_reader_task = asyncio.create_task(self._rpc_read_loop(reader, writer, framed))
+        return self._rpc_writer
+
+    async def _rpc_read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, framed: bool):
+        try:
+            while True:
+                response = await self._read_message(reader, framed)
+                if response is None:
+                    break
+                future = self._rpc_pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (OSError, ValueError):
+            pass
+        if self._rpc_writer is writer:
+            self._close_rpc(cancel_reader=False)
+
+    def _close_rpc(self, cancel_reader: bool = True):
+        """Drop the command connection and fail its pending requests."""
+        if self._rpc_writer is not None:
+            self._rpc_writer.close()
+            self._rpc_writer = None
+        if cancel_reader and self._rpc_reader_task is not None:
+            self._rpc_reader_task.cancel()
+        self._rpc_reader_task = None
+        pending, self._rpc_pending = self._rpc_pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("connection to whisplay-daemon lost"))
+
+    async def batch(self, commands, wait: bool = True) -> list[dict] | None:
+        """Run several ``(cmd, payload)`` commands in one round trip."""
+        entries = [{"cmd": cmd, "payload": payload or {}} for cmd, payload in commands]
+        response = await self._send_request("batch", {"commands": entries}, wait=wait)
+        if response is None:
+            return None
+        return response["payload"]["results"]
+
+    async def ping(self) -> bool:
+        try:
+            response = await self._send_request("health.ping")
+            return bool(response.get("ok"))
+        except Exception:
+            return False
+
+    async def register(self):
+        payload = register_payload(
+            self._app_id,
+            self._display_name,
+            self._icon,
+            self._persist,
+            self._launch_command,
+            self._launch_cwd,
+            self._exit_gesture,
+            self._priority,
+            self._use_daemon_default_log,
+            self._target_fps,
+        )
+        await self._send_request("app.register", payload)
+
+    async def acquire_foreground(self, timeout_sec: float = 5.0):
+        """Take the foreground; see WhisplayDaemonProxy.acquire_foreground."""
+        self.start_event_listener()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_sec
+        last_error = None
+        while loop.time() < deadline:
+            self._focus_grant = loop.create_future()
+            try:
+                response = await self._send_request(
+                    "app.focus.acquire",
+                    focus_acquire_payload(self._app_id, self._fb_buffers, deadline - loop.time()),
+                )
+                grant = response["payload"]
+                if grant.get("queued"):
+                    try:
+                        grant = await asyncio.wait_for(self._focus_grant, max(0.0, deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        await self._send_request("app.focus.release", {"app_id": self._app_id}, wait=False)
+                        raise RuntimeError("timed out waiting for focus")
+                await self._attach_grant(grant)
+                return
+            except Exception as exc:
+                last_error = exc
+                if loop.time() < deadline:
+                    await asyncio.sleep(0.2)
+            finally:
+                self._focus_grant = None
+        raise RuntimeError(f"failed to acquire foreground: {last_error}")
+
+    async def _attach_grant(self, grant: dict):
+        self._session_token = grant["session_token"]
+        fb = grant.get("framebuffer")
+        fd = None
+        if fb is None or fb.get("buffer_fd"):
+            # Receiving a descriptor needs recvmsg, so this one-shot
+            # request runs in the default executor.
+            fb, fd = await asyncio.get_running_loop().run_in_executor(
+                None,
+                request_framebuffer,
+                self.socket_path,
+                {"app_id": self._app_id, "session_token": self._session_token, "buffers": self._fb_buffers},
+            )
+        self._framebuffer.attach(fb["buffer_handle"], int(fb["stride"]), int(fb.get("buffers", 1)), fd)
+
+    async def release_focus(self):
+        if self._session_token:
+            try:
+                await self._send_request(
+                    "app.focus.release",
+                    {"app_id": self._app_id, "session_token": self._session_token},
+                )
+            except Exception:
+                pass
+        self._session_token = None
+        self._framebuffer.detach()
+
+    async def prepare_exit(self):
+        await self.release_focus()
+
+    async def set_backlight(self, brightness, wait=True):
+        await self._send_request("backlight.set", {"brightness": int(brightness)}, wait=wait)
+
+    async def set_color_mode(self, bits, wait=True):
+        await self._send_request(
+            "display.color_mode",
+            {"app_id": self._app_id, "session_token": self._session_token, "bits": int(bits)},
+            wait=wait,
+        )
+
+    async def set_rgb(self, r, g, b, wait=True):
+        await self._send_request("led.set", {"r": int(r), "g": int(g), "b": int(b)}, wait=wait)
+
+    async def set_rgb_fade(self, r_target, g_target, b_target, duration_ms=100, wait=True):
+        await self._send_request(
+            "led.fade",
+            {
+                "r": int(r_target),
+                "g": int(g_target),
+                "b": int(b_target),
+                "duration_ms": int(duration_ms),
+            },
+            wait=wait,
+        )
+        if wait:
+            await asyncio.sleep(int(duration_ms) / 1000.0)
+
+    async def play_led_effect(self, effect, wait=True):
+        if isinstance(effect, LEDEffect):
+            effect = effect.to_spec()
+        await self._send_request("led.effect", {"effect": effect}, wait=wait)
+
+    async def stop_led_effect(self, wait=True):
+        await self._send_request("led.effect", {"effect": None}, wait=wait)
+
+    # ----- framebuffer -----
+    @property
+    def canvas(self) -> Canvas:
+        """NumPy canvas over the shared framebuffer; ``await
+        canvas.present()`` presents it."""
+        if self._canvas is None:
+            self._canvas = Canvas(self._framebuffer, self.present)
+        return self._canvas
+
+    def draw_image(self, x, y, width, height, pixel_data):
+        self._framebuffer.draw_image(x, y, width, height, pixel_data)
+
+    def add_damage(self, x, y, width, height):
+        self._framebuffer.add_damage(x, y, width, height)
+
+    def fill_screen(self, color):
+        self._framebuffer.fill_screen(color)
+
+    async def present(self, frame=None, wait=False):
+        """Hand the finished framebuffer to the daemon; see
+        WhisplayDaemonProxy.present. Waiting for a free swap-chain buffer
+        yields to the event loop, which throttles a render loop to what the
+        daemon can scan out."""
+        if frame is not None:
+            self.draw_image(0, 0, self.LCD_WIDTH, self.LCD_HEIGHT, frame)
+        if not self._session_token:
+            return
+        frame_number = self._framebuffer.commit()
+        if frame_number is None:
+            return
+        await self._send_request(
+            "framebuffer.present",
+            {"app_id": self._app_id, "session_token": self._session_token, "frame": frame_number},
+            wait=wait,
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + DEFAULT_REQUEST_TIMEOUT_SEC
+        while not self._framebuffer.next_back_buffer():
+            if loop.time() > deadline:
+                raise RuntimeError("daemon did not release a framebuffer")
+            await asyncio.sleep(SWAP_POLL_SEC)
+
+    # ----- events -----
+    def button_pressed(self):
+        return self._button_down
+
+    def on_button_press(self, callback):
+        self.button_press_callback = callback
+
+    def on_button_release(self, callback):
+        self.button_release_callback = callback
+
+    def on_exit_request(self, callback):
+        self.exit_request_callback = callback
+
+    def on_focus_revoked(self, callback):
+        self.focus_revoked_callback = callback
+
+    def start_event_listener(self):
+        if self._event_task is not None:
+            return
+        self._running = True
+        self._event_task = asyncio.create_task(self._event_loop())
+
+    async def events(self):
+        """Yield daemon events as ``{"event": ..., "payload": ...}`` dicts.
+
+        Starts the listener if needed. The queue is bounded; when the
+        consumer falls behind the oldest events are dropped.
+        """
+        self.start_event_listener()
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+    async def _event_loop(self):
+        while self._running:
+            writer = None
+            try:
+                reader, writer, framed = await self._open_connection()
+                payload = {"app_id": self._app_id}
+                if self.event_topics is not None:
+                    # Focus grants are needed by acquire_foreground.
+                    payload["topics"] = self.event_topics + ["app_foreground_acquired"]
+                writer.write(encode_proxy_request("events.subscribe", payload, 1, True, framed))
+                await writer.drain()
+                ack = await self._read_message(reader, framed)
+                if not ack or not ack.get("ok"):
+                    raise RuntimeError("subscription ack missing")
+                while self._running:
+                    event = await self._read_message(reader, framed)
+                    if event is None:
+                        break
+                    await self._dispatch_event(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(0.5)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    async def _dispatch_event(self, event: dict):
+        name = event.get("event")
+        payload = event.get("payload", {}) or {}
+        callback = None
+        args = ()
+        if name == "button_pressed":
+            self._button_down = True
+            callback = self.button_press_callback
+        elif name == "button_released":
+            self._button_down = False
+            callback = self.button_release_callback
+        elif name == "app_exit_requested":
+            callback = self.exit_request_callback
+        elif name == "app_focus_revoked":
+            self._session_token = None
+            self._framebuffer.detach()
+            callback = self.focus_revoked_callback
+            args = (payload,)
+        elif name == "app_foreground_acquired":
+            grant = self._focus_grant
+            if grant is not None and not grant.done():
+                grant.set_result(payload)
+            elif payload.get("session_token") not in (None, self._session_token):
+                # acquire_foreground already gave up; hand the focus back.
+                try:
+                    await self._send_request(
+                        "app.focus.release",
+                        {"app_id": self._app_id, "session_token": payload["session_token"]},
+                        wait=False,
+                    )
+                except Exception:
+                    pass
+            if not topic_matches(self.event_topics, name):
+                return
+        if callback is not None:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                await result
+        if self._events.full():
+            self._events.get_nowait()
+        self._events.put_nowait({"event": name, "payload": payload})
+
+    async def cleanup(self):
+        self._running = False
+        if self._event_task is not None:
+            self._event_task.cancel()
+            try:
+                await self._event_task
+            except asyncio.CancelledError:
+                pass
+            self._event_task = None
+        if self._events.full():
+            self._events.get_nowait()
+        self._events.put_nowait(None)
+        await self.release_focus()
+        self._close_rpc()
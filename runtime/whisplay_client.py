@@ -2,11 +2,29 @@ from __future__ import annotations
 
 import json
 import mmap
+import os
 import socket
 import threading
 import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
 
-from whisplay import WhisplayBoard
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from whisplay import Canvas, LEDEffect, WhisplayBoard
+from whisplay_ipc import MAX_DAMAGE_RECTS, FrameHeader, merge_damage, recv_line_with_fds
+from whisplay_protocol import (
+    KIND_EVENT,
+    KIND_RESPONSE,
+    PROTOCOL_VERSION,
+    decode_event,
+    decode_response,
+    encode_request,
+    read_frame,
+    upgrade_socket,
+)
 
 
 DEFAULT_DAEMON_SOCKET_PATH = "/tmp/whisplay-daemon.sock"
@@ -16,6 +34,320 @@ DEFAULT_APP_ICON = "AI"
 DEFAULT_EXIT_GESTURE = "quad_click"
 DEFAULT_PRIORITY = 0
 DEFAULT_USE_DAEMON_DEFAULT_LOG = False
+DEFAULT_REQUEST_TIMEOUT_SEC = 5.0
+DEFAULT_FRAMEBUFFER_BUFFERS = 1
+SWAP_POLL_SEC = 0.001
+CAN_PASS_FD = hasattr(socket, "recv_fds")
+# The events the proxies act on; subscribing to just these keeps other
+# broadcasts off the app's socket.
+PROXY_EVENT_TOPICS = [
+    "button_pressed",
+    "button_released",
+    "app_exit_requested",
+    "app_focus_revoked",
+    "app_foreground_acquired",
+]
+
+
+def request_framebuffer(socket_path: str, payload: dict) -> tuple[dict, int | None]:
+    """Run framebuffer.acquire on a one-shot connection.
+
+    Where the platform supports SCM_RIGHTS the daemon's memfd arrives with
+    the response and is returned as a descriptor; otherwise the descriptor
+    is None and the payload's ``buffer_handle`` path is used. A dedicated
+    connection is needed because buffered readers drop ancillary data.
+    """
+    pass_fd = CAN_PASS_FD
+    body = {"version": 1, "cmd": "framebuffer.acquire", "payload": dict(payload, pass_fd=pass_fd)}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(DEFAULT_REQUEST_TIMEOUT_SEC)
+        client.connect(socket_path)
+        client.sendall((json.dumps(body) + "\n").encode("utf-8"))
+        if pass_fd:
+            line, fds = recv_line_with_fds(client)
+        else:
+            line, fds = client.makefile("rb").readline(), []
+    fd = fds[0] if fds else None
+    for extra in fds[1:]:
+        os.close(extra)
+    response = json.loads(line) if line.strip() else {}
+    fb = response.get("payload") or {}
+    if fd is not None and not (response.get("ok") and fb.get("buffer_fd")):
+        os.close(fd)
+        fd = None
+    if not response.get("ok"):
+        raise RuntimeError(response.get("error", "whisplay-daemon request failed"))
+    return fb, fd
+
+
+def register_payload(
+    app_id: str,
+    display_name: str,
+    icon: str,
+    persist: bool,
+    launch_command: str | None,
+    launch_cwd: str | None,
+    exit_gesture: str,
+    priority: int,
+    use_daemon_default_log: bool,
+    target_fps: float | None,
+) -> dict:
+    """app.register payload; unset optional fields are left out."""
+    payload = {
+        "app_id": app_id,
+        "display_name": display_name,
+        "icon": icon,
+        "persist": persist,
+    }
+    if launch_command is not None:
+        payload["launch_command"] = launch_command
+    if launch_cwd is not None:
+        payload["cwd"] = launch_cwd
+    payload["exit_gesture"] = exit_gesture
+    payload["priority"] = priority
+    payload["use_daemon_default_log"] = use_daemon_default_log
+    if target_fps is not None:
+        payload["target_fps"] = target_fps
+    return payload
+
+
+def encode_proxy_request(cmd: str, payload: dict | None, request_id: int, wait: bool, framed: bool) -> bytes:
+    """Encode a command for the proxies' shared connection, as a protocol v2
+    frame or a JSON line. Without ``wait`` it is sent as noreply."""
+    if framed:
+        return encode_request(cmd, payload, request_id, noreply=not wait)
+    body = {"version": 1, "cmd": cmd, "payload": payload or {}}
+    if wait:
+        body["id"] = request_id
+    else:
+        body["noreply"] = True
+    return (json.dumps(body) + "\n").encode("utf-8")
+
+
+def focus_acquire_payload(app_id: str, buffers: int, timeout_sec: float) -> dict:
+    """app.focus.acquire payload that queues in the daemon until focus is
+    free and allocates the framebuffer the proxy will map."""
+    return {
+        "app_id": app_id,
+        "wait": True,
+        "timeout_ms": int(max(0.0, timeout_sec) * 1000),
+        "buffers": buffers,
+        "pass_fd": CAN_PASS_FD,
+    }
+
+
+class SharedFramebuffer:
+    """App side of a daemon framebuffer mapping.
+
+    Handles drawing into the current back buffer, damage tracking and the
+    commit/flip half of the whisplay_ipc protocol; the proxies only add the
+    framebuffer.present request. Without a mapping every call is a no-op.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.stride = width * 2
+        self.mmap = None
+        self.header = None
+        self.path = None
+        self._file = None
+        self._back = 0
+        self._base = 0
+        self._flipped = False
+        self._in_flight: dict[int, int] = {}
+        # Rectangles drawn since the last present; None once the whole
+        # frame may have changed.
+        self._dirty: list | None = []
+        self._damage: dict[int, list | None] = {}
+
+    def attach(self, buffer_handle: str, stride: int, buffers: int = 1, fd: int | None = None):
+        self.detach()
+        self.path = buffer_handle
+        self.stride = stride
+        if fd is not None:
+            # mmap keeps its own reference to the memfd.
+            try:
+                self.mmap = mmap.mmap(fd, 0)
+            finally:
+                os.close(fd)
+        else:
+            self._file = open(buffer_handle, "r+b")
+            self.mmap = mmap.mmap(self._file.fileno(), 0)
+        self.header = FrameHeader.attach(self.mmap, stride * self.height, buffers)
+        self._in_flight = {}
+        self._dirty = None
+        self._damage = {}
+        self._flipped = False
+        self._back = 0
+        if self.header is not None and self.header.buffer_count > 1:
+            self._back = self.header.free_buffers(self._in_flight)[0]
+        self._base = self._back * stride * self.height
+
+    def detach(self):
+        self.header = None
+        self._base = 0
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except Exception:
+                pass
+            self.mmap = None
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+        self.path = None
+
+    def draw_image(self, x, y, width, height, pixel_data):
+        if self.mmap is None:
+            return
+        source = self.pixel_view(pixel_data)
+        row_bytes = width * 2
+        if source.nbytes < row_bytes * height:
+            raise ValueError("Pixel data size does not match image dimensions")
+        header = self.header
+        if header is None:
+            self._copy_image(x, y, width, height, source)
+            return
+        header.begin_write()
+        try:
+            self._copy_image(x, y, width, height, source)
+        finally:
+            header.end_write()
+        self.add_damage(x, y, width, height)
+
+    def add_damage(self, x, y, width, height):
+        if self._dirty is None:
+            return
+        if x == 0 and y == 0 and width >= self.width and height >= self.height:
+            self._dirty = None
+            return
+        self._dirty.append((int(x), int(y), int(width), int(height)))
+        if len(self._dirty) > 4 * MAX_DAMAGE_RECTS:
+            self._dirty = merge_damage(self._dirty)
+
+    def _copy_image(self, x, y, width, height, source):
+        row_bytes = width * 2
+        stride = self.stride
+        base = self._base
+        if x == 0 and row_bytes == stride:
+            # Full-width rows are contiguous in the framebuffer: one memmove.
+            start = base + y * stride
+            self.mmap[start:start + row_bytes * height] = source[:row_bytes * height]
+            return
+        if np is not None:
+            # One strided copy; the temporary array releases the mmap export.
+            target = np.frombuffer(
+                self.mmap, dtype=np.uint8, count=stride * self.height, offset=base
+            ).reshape(self.height, stride)
+            rows = np.frombuffer(source, dtype=np.uint8, count=row_bytes * height)
+            target[y:y + height, x * 2:x * 2 + row_bytes] = rows.reshape(height, row_bytes)
+            return
+        for row in range(height):
+            src = row * row_bytes
+            dst = base + (y + row) * stride + x * 2
+            self.mmap[dst:dst + row_bytes] = source[src:src + row_bytes]
+
+    @staticmethod
+    def pixel_view(pixel_data) -> memoryview:
+        """Flat byte view of RGB565 pixel data, copying only when the source
+        is not a contiguous buffer (e.g. a list or a strided NumPy slice)."""
+        if isinstance(pixel_data, (list, tuple)):
+            return memoryview(bytes(pixel_data))
+        if np is not None and isinstance(pixel_data, np.ndarray):
+            pixel_data = np.ascontiguousarray(pixel_data)
+        view = memoryview(pixel_data)
+        if not view.c_contiguous:
+            view = memoryview(view.tobytes())
+        return view.cast("B")
+
+    def array(self):
+        """Writable (height, width) '>u2' view of the back buffer, or None.
+        The view pins the mapping, so drop it before the buffer detaches."""
+        if self.mmap is None or np is None:
+            return None
+        return np.ndarray(
+            (self.height, self.width), dtype=">u2", buffer=self.mmap,
+            offset=self._base, strides=(self.stride, 2),
+        )
+
+    def begin_write(self):
+        if self.header is not None:
+            self.header.begin_write()
+
+    def end_write(self):
+        if self.header is not None:
+            self.header.end_write()
+
+    def fill_screen(self, color):
+        if self.mmap is None:
+            return
+        high = (int(color) >> 8) & 0xFF
+        low = int(color) & 0xFF
+        header = self.header
+        if header is not None:
+            header.begin_write()
+        self.mmap.seek(self._base)
+        self.mmap.write(bytes([high, low]) * (self.width * self.height))
+        self.mmap.seek(0)
+        if header is not None:
+            header.end_write()
+        self._dirty = None
+
+    def commit(self) -> int | None:
+        """Publish damage and commit (or flip) the back buffer.
+
+        Returns the frame number to send with framebuffer.present, or None
+        when the mapping has no header.
+        """
+        header = self.header
+        if header is None:
+            return None
+        header.write_damage(self._pending_damage(header))
+        if header.buffer_count == 1:
+            return header.commit()
+        frame_number = header.flip(self._back)
+        self._in_flight[frame_number] = self._back
+        self._flipped = True
+        return frame_number
+
+    def _pending_damage(self, header: FrameHeader):
+        """Damage of every frame the daemon has not taken yet, this one
+        included, since the daemon may skip frames. A present with no
+        recorded draws reports the whole frame, as the app may have
+        written the mapping directly."""
+        acked = header.acked
+        for frame in [frame for frame in self._damage if frame <= acked]:
+            del self._damage[frame]
+        self._damage[(header.frame + 1) & 0xFFFFFFFF] = self._dirty or None
+        self._dirty = []
+        rects = []
+        for frame_rects in self._damage.values():
+            if frame_rects is None:
+                return None
+            rects.extend(frame_rects)
+        return rects
+
+    def next_back_buffer(self) -> bool:
+        """After a flip, move drawing to a free buffer seeded with the
+        flipped frame. Returns False while the daemon still holds every
+        other buffer; True once drawing can continue (or there is nothing
+        to wait for)."""
+        header = self.header
+        if header is None or not self._flipped:
+            return True
+        free = header.free_buffers(self._in_flight)
+        if not free:
+            return False
+        self._flipped = False
+        previous = self._base
+        self._back = free[0]
+        self._base = header.buffer_offset(self._back)
+        self.mmap.move(self._base, previous, header.pixel_size)
+        return True
 
 
 class WhisplayDaemonProxy:
@@ -35,8 +367,12 @@ class WhisplayDaemonProxy:
         exit_gesture: str = DEFAULT_EXIT_GESTURE,
         priority: int = DEFAULT_PRIORITY,
         use_daemon_default_log: bool = DEFAULT_USE_DAEMON_DEFAULT_LOG,
+        framebuffer_buffers: int = DEFAULT_FRAMEBUFFER_BUFFERS,
+        target_fps: float | None = None,
+        protocol_version: int = PROTOCOL_VERSION,
     ):
         self.socket_path = socket_path
+        self.protocol_version = int(protocol_version)
         self.button_press_callback = None
         self.button_release_callback = None
         self.exit_request_callback = None
@@ -44,10 +380,10 @@ class WhisplayDaemonProxy:
         self._button_down = False
         self._subscriber = None
         self._running = False
-        self._mmap = None
-        self._fb_file = None
-        self._fb_stride = self.LCD_WIDTH * 2
-        self._fb_path = None
+        self._focus_grant: Future | None = None
+        self._framebuffer = SharedFramebuffer(self.LCD_WIDTH, self.LCD_HEIGHT)
+        self._fb_buffers = max(1, int(framebuffer_buffers))
+        self._target_fps = target_fps
         self._session_token = None
         self._app_id = app_id
         self._display_name = display_name
@@ -58,19 +394,135 @@ class WhisplayDaemonProxy:
         self._exit_gesture = str(exit_gesture or DEFAULT_EXIT_GESTURE)
         self._priority = int(priority)
         self._use_daemon_default_log = bool(use_daemon_default_log)
+        self._rpc_lock = threading.Lock()
+        # Guards only the pending map, so the reader never waits on a sender.
+        self._rpc_pending_lock = threading.Lock()
+        self._rpc_socket = None
+        self._rpc_framed = False
+        self._rpc_pending: dict[int, Future] = {}
+        self._rpc_next_id = 1
+        self._canvas = None
+
+    @property
+    def canvas(self) -> Canvas:
+        """NumPy canvas over the shared framebuffer; present() presents it."""
+        if self._canvas is None:
+            self._canvas = Canvas(self._framebuffer, self.present)
+        return self._canvas
 
-    def _send_request(self, cmd: str, payload: dict | None = None) -> dict:
-        body = {"version": 1, "cmd": cmd, "payload": payload or {}}
-        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
-            client.connect(self.socket_path)
-            client.sendall((json.dumps(body) + "\n").encode("utf-8"))
-            line = client.makefile("r").readline().strip()
-            if not line:
-                raise RuntimeError("empty response from whisplay-daemon")
-            response = json.loads(line)
-            if not response.get("ok"):
-                raise RuntimeError(response.get("error", "whisplay-daemon request failed"))
-            return response
+    def _send_request(self, cmd: str, payload: dict | None = None, wait: bool = True) -> dict | None:
+        """Send a command over the shared connection.
+
+        Requests are pipelined: each carries an id and the reader thread
+        resolves the matching future. With ``wait=False`` the daemon sends no
+        response and the call returns as soon as the request is written.
+        """
+        future = Future() if wait else None
+        request_id = 0
+        with self._rpc_lock:
+            if wait:
+                request_id = self._rpc_next_id
+                self._rpc_next_id += 1
+            # The daemon may have restarted, so retry once on a new connection.
+            for attempt in range(2):
+                try:
+                    connection = self._rpc_connection()
+                    wire = encode_proxy_request(cmd, payload, request_id, wait, self._rpc_framed)
+                    if future is not None:
+                        with self._rpc_pending_lock:
+                            self._rpc_pending[request_id] = future
+                    connection.sendall(wire)
+                    break
+                except OSError:
+                    if future is not None:
+                        with self._rpc_pending_lock:
+                            self._rpc_pending.pop(request_id, None)
+                    self._close_rpc()
+                    if attempt:
+                        raise
+        if future is None:
+            return None
+        try:
+            response = future.result(timeout=DEFAULT_REQUEST_TIMEOUT_SEC)
+        except FutureTimeoutError:
+            with self._rpc_pending_lock:
+                self._rpc_pending.pop(request_id, None)
+            raise RuntimeError(f"whisplay-daemon did not answer {cmd}")
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "whisplay-daemon request failed"))
+        return response
+
+    def _rpc_connection(self) -> socket.socket:
+        """Return the command connection, connecting if needed; caller holds _rpc_lock."""
+        if self._rpc_socket is None:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.connect(self.socket_path)
+                framed = self.protocol_version >= 2 and upgrade_socket(client)
+            except (OSError, ValueError):
+                client.close()
+                raise
+            self._rpc_socket = client
+            self._rpc_framed = framed
+            threading.Thread(target=self._rpc_read_loop, args=(client, framed), daemon=True).start()
+        return self._rpc_socket
+
+    def _rpc_read_loop(self, client: socket.socket, framed: bool):
+        try:
+            for response in self._read_messages(client, framed):
+                with self._rpc_pending_lock:
+                    future = self._rpc_pending.pop(response.get("id"), None)
+                if future is not None:
+                    future.set_result(response)
+        except Exception:
+            pass
+        with self._rpc_lock:
+            if self._rpc_socket is client:
+                self._close_rpc()
+
+    @staticmethod
+    def _read_messages(client: socket.socket, framed: bool):
+        """Yield responses and events from either framing as v1 dicts."""
+        reader = client.makefile("rb")
+        if not framed:
+            for line in reader:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        while True:
+            frame = read_frame(reader)
+            if frame is None:
+                return
+            kind, opcode, _, request_id, body = frame
+            if kind == KIND_EVENT:
+                yield decode_event(opcode, body)
+            elif kind == KIND_RESPONSE:
+                yield decode_response(opcode, body, request_id)
+
+    def _close_rpc(self):
+        """Drop the command connection and fail its pending requests; caller holds _rpc_lock."""
+        if self._rpc_socket is not None:
+            try:
+                self._rpc_socket.close()
+            except Exception:
+                pass
+            self._rpc_socket = None
+        with self._rpc_pending_lock:
+            pending, self._rpc_pending = self._rpc_pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("connection to whisplay-daemon lost"))
+
+    def batch(self, commands, wait: bool = True) -> list[dict] | None:
+        """Run several ``(cmd, payload)`` commands in one round trip.
+
+        Returns one response dict per command; a failing command does not
+        stop the others.
+        """
+        entries = [{"cmd": cmd, "payload": payload or {}} for cmd, payload in commands]
+        response = self._send_request("batch", {"commands": entries}, wait=wait)
+        if response is None:
+            return None
+        return response["payload"]["results"]
 
     def ping(self) -> bool:
         try:
@@ -80,60 +532,68 @@ class WhisplayDaemonProxy:
             return False
 
     def register(self):
-        payload = {
-            "app_id": self._app_id,
-            "display_name": self._display_name,
-            "icon": self._icon,
-            "persist": self._persist,
-        }
-        if self._launch_command is not None:
-            payload["launch_command"] = self._launch_command
-        if self._launch_cwd is not None:
-            payload["cwd"] = self._launch_cwd
-        payload["exit_gesture"] = self._exit_gesture
-        payload["priority"] = self._priority
-        payload["use_daemon_default_log"] = self._use_daemon_default_log
+        payload = register_payload(
+            self._app_id,
+            self._display_name,
+            self._icon,
+            self._persist,
+            self._launch_command,
+            self._launch_cwd,
+            self._exit_gesture,
+            self._priority,
+            self._use_daemon_default_log,
+            self._target_fps,
+        )
         self._send_request("app.register", payload)
 
     def acquire_foreground(self, timeout_sec: float = 5.0):
+        """Take the foreground, waiting in the daemon's focus queue while
+        another app holds it; the grant arrives as app_foreground_acquired.
+        Daemons without the queue are polled instead."""
+        self.start_event_listener()
         deadline = time.time() + timeout_sec
         last_error = None
         while time.time() < deadline:
+            # Created before the request so an early grant is not missed.
+            self._focus_grant = Future()
             try:
-                response = self._send_request("app.focus.acquire", {"app_id": self._app_id})
-                self._session_token = response["payload"]["session_token"]
-                fb = self._send_request(
-                    "framebuffer.acquire",
-                    {"app_id": self._app_id, "session_token": self._session_token},
-                )["payload"]
-                self._attach_framebuffer(fb["buffer_handle"], int(fb["stride"]))
+                response = self._send_request(
+                    "app.focus.acquire",
+                    focus_acquire_payload(self._app_id, self._fb_buffers, deadline - time.time()),
+                )
+                grant = response["payload"]
+                if grant.get("queued"):
+                    try:
+                        grant = self._focus_grant.result(timeout=max(0.0, deadline - time.time()))
+                    except FutureTimeoutError:
+                        if not self._focus_grant.cancel():
+                            # Granted just as the wait ran out.
+                            grant = self._focus_grant.result()
+                        else:
+                            self._send_request("app.focus.release", {"app_id": self._app_id}, wait=False)
+                            raise RuntimeError("timed out waiting for focus")
+                self._attach_grant(grant)
                 return
             except Exception as exc:
                 last_error = exc
-                time.sleep(0.2)
+                if time.time() < deadline:
+                    time.sleep(0.2)
+            finally:
+                self._focus_grant = None
         raise RuntimeError(f"failed to acquire foreground: {last_error}")
 
-    def _attach_framebuffer(self, buffer_handle: str, stride: int):
-        self._detach_framebuffer()
-        self._fb_path = buffer_handle
-        self._fb_stride = stride
-        self._fb_file = open(buffer_handle, "r+b")
-        self._mmap = mmap.mmap(self._fb_file.fileno(), 0)
-
-    def _detach_framebuffer(self):
-        if self._mmap is not None:
-            try:
-                self._mmap.close()
-            except Exception:
-                pass
-            self._mmap = None
-        if self._fb_file is not None:
-            try:
-                self._fb_file.close()
-            except Exception:
-                pass
-            self._fb_file = None
-        self._fb_path = None
+    def _attach_grant(self, grant: dict):
+        """Map the framebuffer of a focus grant. A grant event already
+        describes it; a descriptor still needs framebuffer.acquire."""
+        self._session_token = grant["session_token"]
+        fb = grant.get("framebuffer")
+        fd = None
+        if fb is None or fb.get("buffer_fd"):
+            fb, fd = request_framebuffer(
+                self.socket_path,
+                {"app_id": self._app_id, "session_token": self._session_token, "buffers": self._fb_buffers},
+            )
+        self._framebuffer.attach(fb["buffer_handle"], int(fb["stride"]), int(fb.get("buffers", 1)), fd)
 
     def release_focus(self):
         if self._session_token:
@@ -145,18 +605,25 @@ class WhisplayDaemonProxy:
             except Exception:
                 pass
         self._session_token = None
-        self._detach_framebuffer()
+        self._framebuffer.detach()
 
     def prepare_exit(self):
         self.release_focus()
 
-    def set_backlight(self, brightness):
-        self._send_request("backlight.set", {"brightness": int(brightness)})
+    def set_backlight(self, brightness, wait=True):
+        self._send_request("backlight.set", {"brightness": int(brightness)}, wait=wait)
+
+    def set_color_mode(self, bits, wait=True):
+        self._send_request(
+            "display.color_mode",
+            {"app_id": self._app_id, "session_token": self._session_token, "bits": int(bits)},
+            wait=wait,
+        )
 
-    def set_rgb(self, r, g, b):
-        self._send_request("led.set", {"r": int(r), "g": int(g), "b": int(b)})
+    def set_rgb(self, r, g, b, wait=True):
+        self._send_request("led.set", {"r": int(r), "g": int(g), "b": int(b)}, wait=wait)
 
-    def set_rgb_fade(self, r_target, g_target, b_target, duration_ms=100):
+    def set_rgb_fade(self, r_target, g_target, b_target, duration_ms=100, wait=True):
         self._send_request(
             "led.fade",
             {
@@ -165,26 +632,66 @@ class WhisplayDaemonProxy:
                 "b": int(b_target),
                 "duration_ms": int(duration_ms),
             },
+            wait=wait,
         )
+        if wait:
+            # The daemon fades in the background; keep the blocking semantics.
+            time.sleep(int(duration_ms) / 1000.0)
+
+    def play_led_effect(self, effect, wait=True):
+        if isinstance(effect, LEDEffect):
+            effect = effect.to_spec()
+        self._send_request("led.effect", {"effect": effect}, wait=wait)
+
+    def stop_led_effect(self, wait=True):
+        self._send_request("led.effect", {"effect": None}, wait=wait)
+
+    @property
+    def _mmap(self):
+        # Kept for apps that wrote the mapping directly before present().
+        return self._framebuffer.mmap
 
     def draw_image(self, x, y, width, height, pixel_data):
-        if self._mmap is None:
-            return
-        frame_bytes = bytes(pixel_data if not isinstance(pixel_data, bytes) else pixel_data)
-        row_bytes = width * 2
-        for row in range(height):
-            src = row * row_bytes
-            dst = ((y + row) * self._fb_stride) + (x * 2)
-            self._mmap[dst:dst + row_bytes] = frame_bytes[src:src + row_bytes]
+        self._framebuffer.draw_image(x, y, width, height, pixel_data)
+
+    def add_damage(self, x, y, width, height):
+        """Report a region changed by writing the mapped framebuffer
+        directly; draw_image and fill_screen report their own."""
+        self._framebuffer.add_damage(x, y, width, height)
 
     def fill_screen(self, color):
-        if self._mmap is None:
+        self._framebuffer.fill_screen(color)
+
+    def present(self, frame=None, wait=False):
+        """Hand the finished framebuffer to the daemon.
+
+        ``frame`` optionally draws a full-screen RGB565 frame first, like
+        ``WhisplayBoard.present``. Once an app presents, the daemon stops
+        polling its framebuffer and only scans it out after each present.
+        Daemons without frame headers keep polling, so this is a no-op there.
+
+        With a swap chain the current back buffer is flipped to the daemon
+        and drawing continues in a free buffer, seeded with the flipped
+        frame so partial redraws keep working. This blocks only while every
+        other buffer is still in use by the daemon.
+        """
+        if frame is not None:
+            self.draw_image(0, 0, self.LCD_WIDTH, self.LCD_HEIGHT, frame)
+        if not self._session_token:
             return
-        high = (int(color) >> 8) & 0xFF
-        low = int(color) & 0xFF
-        self._mmap.seek(0)
-        self._mmap.write(bytes([high, low]) * (self.LCD_WIDTH * self.LCD_HEIGHT))
-        self._mmap.seek(0)
+        frame_number = self._framebuffer.commit()
+        if frame_number is None:
+            return
+        self._send_request(
+            "framebuffer.present",
+            {"app_id": self._app_id, "session_token": self._session_token, "frame": frame_number},
+            wait=wait,
+        )
+        deadline = time.monotonic() + DEFAULT_REQUEST_TIMEOUT_SEC
+        while not self._framebuffer.next_back_buffer():
+            if time.monotonic() > deadline:
+                raise RuntimeError("daemon did not release a framebuffer")
+            time.sleep(SWAP_POLL_SEC)
 
     def button_pressed(self):
         return self._button_down
@@ -213,19 +720,16 @@ class WhisplayDaemonProxy:
             try:
                 with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
                     client.connect(self.socket_path)
-                    body = {"version": 1, "cmd": "events.subscribe", "payload": {"app_id": self._app_id}}
-                    client.sendall((json.dumps(body) + "\n").encode("utf-8"))
-                    reader = client.makefile("r")
-                    ack = reader.readline().strip()
-                    if not ack:
+                    framed = self.protocol_version >= 2 and upgrade_socket(client)
+                    payload = {"app_id": self._app_id, "topics": PROXY_EVENT_TOPICS}
+                    client.sendall(encode_proxy_request("events.subscribe", payload, 1, True, framed))
+                    messages = self._read_messages(client, framed)
+                    ack = next(messages, None)
+                    if not ack or not ack.get("ok"):
                         raise RuntimeError("subscription ack missing")
-                    for line in reader:
+                    for event in messages:
                         if not self._running:
                             return
-                        line = line.strip()
-                        if not line:
-                            continue
-                        event = json.loads(line)
                         name = event.get("event")
                         payload = event.get("payload", {}) or {}
                         if name == "button_pressed":
@@ -241,15 +745,45 @@ class WhisplayDaemonProxy:
                                 self.exit_request_callback()
                         elif name == "app_focus_revoked":
                             self._session_token = None
-                            self._detach_framebuffer()
+                            self._framebuffer.detach()
                             if self.focus_revoked_callback:
                                 self.focus_revoked_callback(payload)
+                        elif name == "app_foreground_acquired":
+                            if not self._deliver_grant(payload):
+                                self._return_grant(payload)
             except Exception:
                 time.sleep(0.5)
 
+    def _deliver_grant(self, grant: dict) -> bool:
+        """Hand a focus grant to a waiting acquire_foreground."""
+        future = self._focus_grant
+        if future is None:
+            return False
+        try:
+            future.set_result(grant)
+        except InvalidStateError:
+            return False
+        return True
+
+    def _return_grant(self, grant: dict):
+        """Release a grant that arrived after acquire_foreground gave up,
+        so the daemon does not keep an app that will never draw."""
+        session_token = grant.get("session_token")
+        if session_token and session_token != self._session_token:
+            try:
+                self._send_request(
+                    "app.focus.release",
+                    {"app_id": self._app_id, "session_token": session_token},
+                    wait=False,
+                )
+            except Exception:
+                pass
+
     def cleanup(self):
         self._running = False
         self.release_focus()
+        with self._rpc_lock:
+            self._close_rpc()
 
 
 def create_whisplay_hardware(
@@ -262,6 +796,8 @@ def create_whisplay_hardware(
     exit_gesture: str = DEFAULT_EXIT_GESTURE,
     priority: int = DEFAULT_PRIORITY,
     use_daemon_default_log: bool = DEFAULT_USE_DAEMON_DEFAULT_LOG,
+    framebuffer_buffers: int = DEFAULT_FRAMEBUFFER_BUFFERS,
+    target_fps: float | None = None,
 ):
     daemon = WhisplayDaemonProxy(
         socket_path=DEFAULT_DAEMON_SOCKET_PATH,
@@ -274,6 +810,8 @@ def create_whisplay_hardware(
         exit_gesture=exit_gesture,
         priority=priority,
         use_daemon_default_log=use_daemon_default_log,
+        framebuffer_buffers=framebuffer_buffers,
+        target_fps=target_fps,
     )
     if daemon.ping():
         daemon.register()
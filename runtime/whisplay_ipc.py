@@ -0,0 +1,337 @@
+"""Shared-memory framebuffer layout used by whisplay-daemon and its clients.
+
+A framebuffer mapping starts with ``buffer_count`` RGB565 buffers back to
+back, so clients that only know the v1 layout keep working with buffer 0,
+and is followed by a small header:
+
+    offset  size  field
+    0       4     magic ("WPFB")
+    4       4     header version
+    8       4     seq     - seqlock counter, odd while pixels are being written
+    12      4     frame   - incremented by every commit (present)
+    16      4     flags   - FLAG_COMMIT once the app presents explicitly
+    20      4     buffers - number of buffers in the swap chain
+    24      4     flip    - buffer the app committed last (app-owned)
+    28      4     scanout - buffer the daemon scans out (daemon-owned)
+    32      4     acked   - last frame the daemon took (daemon-owned)
+    36      4     dseq    - damage seqlock counter, odd while damage is written
+    40      4     dcount  - damage rectangles, DAMAGE_FULL when unknown
+    44      64    damage  - up to MAX_DAMAGE_RECTS (x, y, width, height) uint16
+
+All fields are little-endian uint32. The writer bumps ``seq`` to an odd
+value before touching pixels and back to even afterwards; a reader copies
+the pixels only between two identical even ``seq`` reads, so it never sees
+a half-written frame.
+
+With more than one buffer the app never writes the buffer being scanned
+out: it renders into a back buffer, stores its index in ``flip`` and then
+bumps ``frame``. The daemon takes the flipped buffer by writing ``scanout``
+before ``acked``. A buffer is free again once it is not ``scanout`` and
+every frame it was flipped in is ``<= acked``.
+
+Apps that set FLAG_DAMAGE also publish the rectangles changed since the
+last frame the daemon acknowledged, so the daemon can push just those
+instead of diffing the whole frame. Damage only ever grows until it is
+acknowledged, so a reader that sees newer damage than pixels still covers
+every change; a torn damage read falls back to a full diff.
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import socket
+import struct
+import time
+
+FRAME_HEADER_MAGIC = 0x42465057  # b"WPFB" little-endian
+FRAME_HEADER_VERSION = 2
+FRAME_HEADER_SIZE = 128
+
+FLAG_COMMIT = 0x1
+FLAG_DAMAGE = 0x2
+
+MAX_DAMAGE_RECTS = 8
+DAMAGE_FULL = 0xFFFFFFFF
+
+_MAGIC_OFFSET = 0
+_VERSION_OFFSET = 4
+_SEQ_OFFSET = 8
+_FRAME_OFFSET = 12
+_FLAGS_OFFSET = 16
+_BUFFERS_OFFSET = 20
+_FLIP_OFFSET = 24
+_SCANOUT_OFFSET = 28
+_ACKED_OFFSET = 32
+_DAMAGE_SEQ_OFFSET = 36
+_DAMAGE_COUNT_OFFSET = 40
+_DAMAGE_RECTS_OFFSET = 44
+_U32 = struct.Struct("<I")
+_RECT = struct.Struct("<4H")
+
+
+def mapping_size(pixel_size: int, buffer_count: int = 1) -> int:
+    """Bytes needed for ``buffer_count`` buffers plus the header."""
+    return pixel_size * buffer_count + FRAME_HEADER_SIZE
+
+
+def create_memfd(name: str, size: int) -> int | None:
+    """Anonymous shared memory of ``size`` bytes, sealed against resizing.
+
+    Returns None where memfd is unavailable so callers can fall back to a
+    file. The pages start zeroed and never touch the filesystem.
+    """
+    if not hasattr(os, "memfd_create"):
+        return None
+    try:
+        fd = os.memfd_create(name, os.MFD_CLOEXEC | getattr(os, "MFD_ALLOW_SEALING", 0))
+    except OSError:
+        return None
+    try:
+        os.ftruncate(fd, size)
+    except OSError:
+        os.close(fd)
+        return None
+    seals = 0
+    for seal in ("F_SEAL_SHRINK", "F_SEAL_GROW", "F_SEAL_SEAL"):
+        seals |= getattr(fcntl, seal, 0)
+    if seals and hasattr(fcntl, "F_ADD_SEALS"):
+        try:
+            fcntl.fcntl(fd, fcntl.F_ADD_SEALS, seals)
+        except OSError:
+            pass
+    return fd
+
+
+def send_with_fds(conn: socket.socket, data: bytes, fds=()):
+    """Send ``data`` with ``fds`` attached (SCM_RIGHTS) to its first byte."""
+    if not fds:
+        conn.sendall(data)
+        return
+    sent = socket.send_fds(conn, [data], list(fds))
+    if sent < len(data):
+        conn.sendall(data[sent:])
+
+
+def recv_line_with_fds(conn: socket.socket, max_fds: int = 1) -> tuple[bytes, list[int]]:
+    """Read one newline-terminated message and any descriptors sent with it."""
+    data = b""
+    fds = []
+    while not data.endswith(b"\n"):
+        chunk, received, _, _ = socket.recv_fds(conn, 65536, max_fds)
+        fds.extend(received)
+        if not chunk:
+            break
+        data += chunk
+    return data, fds
+
+
+def merge_damage(rects, limit: int = MAX_DAMAGE_RECTS) -> list[tuple[int, int, int, int]]:
+    """Merge overlapping ``(x, y, width, height)`` rectangles and keep at
+    most ``limit`` by repeatedly joining the pair whose bounding box adds
+    the least area."""
+    boxes = [(x, y, x + width, y + height) for x, y, width, height in rects if width > 0 and height > 0]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    boxes[i] = _union(a, b)
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    while len(boxes) > limit:
+        best = None
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                joined = _union(boxes[i], boxes[j])
+                growth = _area(joined) - _area(boxes[i]) - _area(boxes[j])
+                if best is None or growth < best[0]:
+                    best = (growth, i, j, joined)
+        _, i, j, joined = best
+        boxes[i] = joined
+        del boxes[j]
+    return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in boxes]
+
+
+def _union(a, b):
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _area(box) -> int:
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+class FrameHeader:
+    """Accessor for the header that follows ``buffer_count`` buffers of
+    ``pixel_size`` bytes each."""
+
+    READ_ATTEMPTS = 5
+    READ_RETRY_SEC = 0.0005
+
+    def __init__(self, buffer, pixel_size: int, buffer_count: int = 1):
+        self._buffer = buffer
+        self._offset = pixel_size * buffer_count
+        self.pixel_size = pixel_size
+        self.buffer_count = buffer_count
+
+    @classmethod
+    def create(cls, buffer, pixel_size: int, buffer_count: int = 1) -> FrameHeader:
+        """Write a fresh header into a newly allocated mapping."""
+        header = cls(buffer, pixel_size, buffer_count)
+        offset = header._offset
+        buffer[offset:offset + FRAME_HEADER_SIZE] = bytes(FRAME_HEADER_SIZE)
+        header._store(_MAGIC_OFFSET, FRAME_HEADER_MAGIC)
+        header._store(_VERSION_OFFSET, FRAME_HEADER_VERSION)
+        header._store(_BUFFERS_OFFSET, buffer_count)
+        return header
+
+    @classmethod
+    def attach(cls, buffer, pixel_size: int, buffer_count: int = 1) -> FrameHeader | None:
+        """Return the header of a mapping, or None if it has none."""
+        if len(buffer) < mapping_size(pixel_size, buffer_count):
+            return None
+        header = cls(buffer, pixel_size, buffer_count)
+        if header._load(_MAGIC_OFFSET) != FRAME_HEADER_MAGIC:
+            return None
+        if buffer_count > 1 and header._load(_BUFFERS_OFFSET) != buffer_count:
+            return None
+        return header
+
+    def _load(self, field: int) -> int:
+        return _U32.unpack_from(self._buffer, self._offset + field)[0]
+
+    def _store(self, field: int, value: int):
+        _U32.pack_into(self._buffer, self._offset + field, value & 0xFFFFFFFF)
+
+    @property
+    def seq(self) -> int:
+        return self._load(_SEQ_OFFSET)
+
+    @property
+    def frame(self) -> int:
+        return self._load(_FRAME_OFFSET)
+
+    @property
+    def flags(self) -> int:
+        return self._load(_FLAGS_OFFSET)
+
+    @property
+    def flip_index(self) -> int:
+        return self._load(_FLIP_OFFSET)
+
+    @property
+    def scanout(self) -> int:
+        return self._load(_SCANOUT_OFFSET)
+
+    @property
+    def acked(self) -> int:
+        return self._load(_ACKED_OFFSET)
+
+    def buffer_offset(self, index: int) -> int:
+        return index * self.pixel_size
+
+    def buffer_view(self, index: int) -> memoryview:
+        """Zero-copy view of one buffer; release it before the mapping closes."""
+        start = self.buffer_offset(index)
+        with memoryview(self._buffer) as whole:
+            return whole[start:start + self.pixel_size]
+
+    # ----- writer side (app) -----
+    def begin_write(self):
+        self._store(_SEQ_OFFSET, self.seq | 1)
+
+    def end_write(self):
+        self._store(_SEQ_OFFSET, (self.seq | 1) + 1)
+
+    def commit(self) -> int:
+        """Mark the current pixels as a finished frame; returns its number."""
+        self._store(_FLAGS_OFFSET, self.flags | FLAG_COMMIT)
+        frame = (self.frame + 1) & 0xFFFFFFFF
+        self._store(_FRAME_OFFSET, frame)
+        return frame
+
+    def flip(self, index: int) -> int:
+        """Commit buffer ``index`` as the next frame; returns its number."""
+        self._store(_FLIP_OFFSET, index)
+        return self.commit()
+
+    def write_damage(self, rects):
+        """Publish the damage for the next commit; None means the whole
+        frame. More than MAX_DAMAGE_RECTS rectangles are merged first."""
+        self._store(_DAMAGE_SEQ_OFFSET, self._load(_DAMAGE_SEQ_OFFSET) | 1)
+        if rects is None:
+            self._store(_DAMAGE_COUNT_OFFSET, DAMAGE_FULL)
+        else:
+            rects = merge_damage(rects)
+            for slot, rect in enumerate(rects):
+                _RECT.pack_into(self._buffer, self._offset + _DAMAGE_RECTS_OFFSET + slot * _RECT.size, *rect)
+            self._store(_DAMAGE_COUNT_OFFSET, len(rects))
+        self._store(_DAMAGE_SEQ_OFFSET, self._load(_DAMAGE_SEQ_OFFSET) + 1)
+        self._store(_FLAGS_OFFSET, self.flags | FLAG_DAMAGE)
+
+    def free_buffers(self, in_flight: dict[int, int]) -> list[int]:
+        """Buffers the app may render into.
+
+        ``in_flight`` maps frame numbers the app flipped to buffer indexes;
+        frames the daemon has acknowledged are dropped from it.
+        """
+        acked = self.acked
+        for frame in [frame for frame in in_flight if frame <= acked]:
+            del in_flight[frame]
+        busy = set(in_flight.values())
+        busy.add(self.scanout)
+        return [index for index in range(self.buffer_count) if index not in busy]
+
+    # ----- reader side (daemon) -----
+    def take(self) -> tuple[int, int, list | None]:
+        """Claim the last flipped buffer for scanout; returns
+        ``(frame, index, damage)``."""
+        frame = self.frame
+        index = self.flip_index
+        if index >= self.buffer_count:
+            index = self.scanout
+        damage = self.read_damage()
+        self._store(_SCANOUT_OFFSET, index)
+        self._store(_ACKED_OFFSET, frame)
+        return frame, index, damage
+
+    def acknowledge(self, frame: int):
+        """Record that ``frame`` reached the panel, retiring its damage."""
+        self._store(_ACKED_OFFSET, frame)
+
+    def read_damage(self) -> list[tuple[int, int, int, int]] | None:
+        """Rectangles changed since the last acknowledged frame, or None
+        when unknown (no damage reported, whole frame, or a torn read)."""
+        if not self.flags & FLAG_DAMAGE:
+            return None
+        seq = self._load(_DAMAGE_SEQ_OFFSET)
+        if seq & 1:
+            return None
+        count = self._load(_DAMAGE_COUNT_OFFSET)
+        if count > MAX_DAMAGE_RECTS:
+            return None
+        base = self._offset + _DAMAGE_RECTS_OFFSET
+        rects = [_RECT.unpack_from(self._buffer, base + slot * _RECT.size) for slot in range(count)]
+        if self._load(_DAMAGE_SEQ_OFFSET) != seq:
+            return None
+        return rects
+
+    def read_pixels(self) -> tuple[bytes | None, int]:
+        """Copy the pixels while no write is in progress.
+
+        Returns ``(pixels, seq)``; ``pixels`` is None if the writer kept the
+        buffer busy for every attempt.
+        """
+        seq = self.seq
+        for _ in range(self.READ_ATTEMPTS):
+            seq = self.seq
+            if not seq & 1:
+                pixels = self._buffer[:self.pixel_size]
+                if self.seq == seq:
+                    return pixels, seq
+            time.sleep(self.READ_RETRY_SEC)
+        return None, seq
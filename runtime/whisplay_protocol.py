@@ -0,0 +1,263 @@
+"""Wire format of protocol v2 on the whisplay-daemon socket.
+
+Every connection starts in v1: one JSON object per line. A client sends
+
+    {"version": 2, "cmd": "protocol.upgrade"}
+
+and, once the daemon answers ``ok`` (still as a JSON line), both sides
+switch to length-prefixed frames. A daemon that only speaks v1 answers
+``unsupported version: 2`` and the client simply stays on JSON lines.
+
+A frame is a 12-byte header followed by the body:
+
+    offset  size  field
+    0       4     length  - bytes after this field (8 + body)
+    4       1     kind    - KIND_REQUEST, KIND_RESPONSE or KIND_EVENT
+    5       1     opcode  - OP_JSON or one of the fixed layouts below
+    6       2     flags   - FLAG_NOREPLY on requests
+    8       4     id      - request id, echoed in the response (0 = none)
+
+All integers are little-endian. An OP_JSON body is the UTF-8 JSON a v1
+line would carry (``{"cmd", "payload"}`` for a request, the response or
+``{"event", "payload"}`` object otherwise), so every command works over
+v2. The high-frequency messages have fixed layouts instead: their
+integer fields are packed with ``struct`` and their string fields follow
+as a length byte plus UTF-8. A message whose payload does not match its
+layout exactly (extra keys, out-of-range values) is sent as OP_JSON.
+"""
+from __future__ import annotations
+
+import json
+import socket
+import struct
+
+PROTOCOL_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+UPGRADE_COMMAND = "protocol.upgrade"
+
+KIND_REQUEST = 0
+KIND_RESPONSE = 1
+KIND_EVENT = 2
+
+FLAG_NOREPLY = 0x1
+
+OP_JSON = 0
+
+FRAME_HEADER = struct.Struct("<IBBHI")
+MAX_FRAME_SIZE = 16 << 20
+_LENGTH_SIZE = 4
+_STRING_MAX = 255
+
+
+class _Layout:
+    """Fixed encoding of a payload with known integer and string fields."""
+
+    def __init__(self, opcode: int, fmt: str = "<", ints=(), strings=()):
+        self.opcode = opcode
+        self.struct = struct.Struct(fmt)
+        self.ints = tuple(ints)
+        self.strings = tuple(strings)
+        self.keys = frozenset(self.ints + self.strings)
+
+    def pack(self, payload: dict) -> bytes | None:
+        if payload.keys() != self.keys:
+            return None
+        values = [payload[name] for name in self.ints]
+        if any(type(value) is not int for value in values):
+            return None
+        try:
+            parts = [self.struct.pack(*values)]
+        except struct.error:
+            return None
+        for name in self.strings:
+            value = payload[name]
+            if not isinstance(value, str):
+                return None
+            data = value.encode("utf-8")
+            if len(data) > _STRING_MAX:
+                return None
+            parts.append(bytes((len(data),)))
+            parts.append(data)
+        return b"".join(parts)
+
+    def unpack(self, body: bytes) -> dict:
+        try:
+            payload = dict(zip(self.ints, self.struct.unpack_from(body)))
+            offset = self.struct.size
+            for name in self.strings:
+                size = body[offset]
+                payload[name] = body[offset + 1:offset + 1 + size].decode("utf-8")
+                offset += 1 + size
+        except (struct.error, IndexError, UnicodeDecodeError) as exc:
+            raise ValueError(f"malformed frame for opcode {self.opcode}") from exc
+        return payload
+
+
+REQUEST_LAYOUTS = {
+    "health.ping": _Layout(1),
+    "button.get_state": _Layout(2),
+    "led.set": _Layout(3, "<BBB", ("r", "g", "b")),
+    "backlight.set": _Layout(4, "<B", ("brightness",)),
+    "framebuffer.present": _Layout(5, "<I", ("frame",), ("app_id", "session_token")),
+}
+EVENT_LAYOUTS = {
+    "button_pressed": _Layout(1, strings=("app_id",)),
+    "button_released": _Layout(2, strings=("app_id",)),
+}
+OP_OK = 1
+
+_REQUESTS_BY_OPCODE = {layout.opcode: (cmd, layout) for cmd, layout in REQUEST_LAYOUTS.items()}
+_EVENTS_BY_OPCODE = {layout.opcode: (event, layout) for event, layout in EVENT_LAYOUTS.items()}
+
+
+def encode_frame(kind: int, opcode: int, body: bytes = b"", request_id: int = 0, flags: int = 0) -> bytes:
+    header = FRAME_HEADER.pack(FRAME_HEADER.size - _LENGTH_SIZE + len(body), kind, opcode, flags, request_id)
+    return header + body
+
+
+def _parse_header(header: bytes) -> tuple[int, int, int, int, int]:
+    length, kind, opcode, flags, request_id = FRAME_HEADER.unpack(header)
+    body_size = length - (FRAME_HEADER.size - _LENGTH_SIZE)
+    if body_size < 0 or body_size > MAX_FRAME_SIZE:
+        raise ValueError(f"invalid frame length: {length}")
+    return body_size, kind, opcode, flags, request_id
+
+
+def read_frame(reader) -> tuple[int, int, int, int, bytes] | None:
+    """Read ``(kind, opcode, flags, id, body)`` from a buffered binary
+    reader; None at end of stream."""
+    header = reader.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    body_size, kind, opcode, flags, request_id = _parse_header(header)
+    body = reader.read(body_size) if body_size else b""
+    if len(body) < body_size:
+        return None
+    return kind, opcode, flags, request_id, body
+
+
+def split_frame(buffer) -> tuple[tuple[int, int, int, int, bytes], int] | None:
+    """Take the first complete frame off a receive buffer; returns
+    ``((kind, opcode, flags, id, body), bytes_used)`` or None while the
+    frame is incomplete."""
+    if len(buffer) < FRAME_HEADER.size:
+        return None
+    body_size, kind, opcode, flags, request_id = _parse_header(bytes(buffer[:FRAME_HEADER.size]))
+    end = FRAME_HEADER.size + body_size
+    if len(buffer) < end:
+        return None
+    return (kind, opcode, flags, request_id, bytes(buffer[FRAME_HEADER.size:end])), end
+
+
+async def read_frame_async(reader) -> tuple[int, int, int, int, bytes] | None:
+    """``read_frame`` for an ``asyncio.StreamReader``."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        body_size, kind, opcode, flags, request_id = _parse_header(header)
+        body = await reader.readexactly(body_size) if body_size else b""
+    except EOFError:
+        return None
+    return kind, opcode, flags, request_id, body
+
+
+def _json_body(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+
+def _json_object(body: bytes) -> dict:
+    message = json.loads(body)
+    if not isinstance(message, dict):
+        raise ValueError("frame body must be an object")
+    return message
+
+
+def encode_request(cmd: str, payload: dict | None = None, request_id: int = 0, noreply: bool = False) -> bytes:
+    payload = payload or {}
+    flags = FLAG_NOREPLY if noreply else 0
+    layout = REQUEST_LAYOUTS.get(cmd)
+    body = layout.pack(payload) if layout is not None else None
+    if body is not None:
+        return encode_frame(KIND_REQUEST, layout.opcode, body, request_id, flags)
+    return encode_frame(KIND_REQUEST, OP_JSON, _json_body({"cmd": cmd, "payload": payload}), request_id, flags)
+
+
+def decode_request(opcode: int, body: bytes) -> tuple[str, dict]:
+    if opcode == OP_JSON:
+        message = _json_object(body)
+        payload = message.get("payload") or {}
+        return str(message.get("cmd", "")), payload if isinstance(payload, dict) else {}
+    entry = _REQUESTS_BY_OPCODE.get(opcode)
+    if entry is None:
+        raise ValueError(f"unknown request opcode: {opcode}")
+    cmd, layout = entry
+    return cmd, layout.unpack(body)
+
+
+def encode_response(response: dict, request_id: int = 0) -> bytes:
+    if response == {"ok": True}:
+        return encode_frame(KIND_RESPONSE, OP_OK, b"", request_id)
+    return encode_frame(KIND_RESPONSE, OP_JSON, _json_body(response), request_id)
+
+
+def decode_response(opcode: int, body: bytes, request_id: int = 0) -> dict:
+    if opcode == OP_OK:
+        response = {"ok": True}
+    elif opcode == OP_JSON:
+        response = _json_object(body)
+    else:
+        raise ValueError(f"unknown response opcode: {opcode}")
+    if request_id:
+        response["id"] = request_id
+    return response
+
+
+def encode_event(event: str, payload: dict | None = None) -> bytes:
+    layout = EVENT_LAYOUTS.get(event)
+    body = layout.pack(payload or {}) if layout is not None else None
+    if body is not None:
+        return encode_frame(KIND_EVENT, layout.opcode, body)
+    message = {"event": event}
+    if payload:
+        message["payload"] = payload
+    return encode_frame(KIND_EVENT, OP_JSON, _json_body(message))
+
+
+def decode_event(opcode: int, body: bytes) -> dict:
+    if opcode == OP_JSON:
+        return _json_object(body)
+    entry = _EVENTS_BY_OPCODE.get(opcode)
+    if entry is None:
+        raise ValueError(f"unknown event opcode: {opcode}")
+    event, layout = entry
+    return {"event": event, "payload": layout.unpack(body)}
+
+
+def topic_matches(topics, event: str) -> bool:
+    """Whether ``event`` passes a subscription filter; None lets every
+    event through and a trailing ``*`` matches a prefix."""
+    if topics is None:
+        return True
+    for topic in topics:
+        if topic == event or (topic.endswith("*") and event.startswith(topic[:-1])):
+            return True
+    return False
+
+
+def upgrade_request() -> bytes:
+    return (json.dumps({"version": PROTOCOL_VERSION, "cmd": UPGRADE_COMMAND}) + "\n").encode("utf-8")
+
+
+def upgrade_socket(conn: socket.socket) -> bool:
+    """Negotiate v2 on a fresh blocking connection; False leaves it on v1.
+
+    The daemon sends nothing else until the next request, so reading up to
+    the first newline cannot swallow frames.
+    """
+    conn.sendall(upgrade_request())
+    line = b""
+    while not line.endswith(b"\n"):
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError("connection closed during protocol upgrade")
+        line += chunk
+    return bool(json.loads(line).get("ok"))